@@ -3,10 +3,21 @@ import os
 from pathlib import Path
 from .config import AgentConfig
 from .slack_handler import SlackHandler
+from .slack_events import EventCursor, SocketModeSource
 from .claude_handler import ClaudeHandler
+from .response_cache import ResponseCache
 from .github_handler import GitHubHandler
+from .clone_strategies import CloneStrategy, path_lock
 from .dashboard_reporter import DashboardReporter
+from .task_scheduler import TaskScheduler, QueueFullError
+from .code_generator import ParallelCodeGenerator
+from .rate_limit import TokenBucket
+from .resilience import ResilientCaller, RetryPolicy, CircuitBreaker
+from .telemetry import Telemetry, labels as call_labels
+from .repo_index import RepoIndex
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import threading
 import time
 
 class CodingAgent:
@@ -34,20 +45,115 @@ class CodingAgent:
             self.name
         )
         
+        # Cache identical Claude requests on disk so retries are near-instant
+        cache = None
+        if self.config.get('claude_cache_enabled', True):
+            cache = ResponseCache(
+                self.config.get('claude_cache_dir', f"state/{self.name.lower()}_claude_cache"),
+                ttl=self.config.get('claude_cache_ttl', 86400),
+                max_bytes=self.config.get('claude_cache_max_mb', 200) * 1024 * 1024,
+                bypass=os.environ.get('LMNH_CLAUDE_CACHE_BYPASS') == '1'
+            )
+        
+        # Every worker shares one handler, so they share its retry budget,
+        # request rate limit and circuit breaker too
+        requests_per_minute = self.config.get('claude_requests_per_minute')
+        resilience = ResilientCaller(
+            RetryPolicy(
+                max_attempts=self.config.get('claude_max_attempts', 5),
+                base_delay=self.config.get('claude_retry_base_delay', 1.0),
+                max_delay=self.config.get('claude_retry_max_delay', 30.0)
+            ),
+            CircuitBreaker(
+                failure_threshold=self.config.get('claude_breaker_threshold', 5),
+                reset_timeout=self.config.get('claude_breaker_reset', 30.0)
+            ),
+            limiter=TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        )
+        
+        # Tokens, cost and latency of every Claude call, by task/stage/model/repo
+        self.telemetry = Telemetry(
+            self.config.get('claude_metrics_file', f"state/{self.name.lower()}_claude_calls.jsonl")
+        )
+        
         self.claude = ClaudeHandler(
-            self.config['claude_api_key']
+            self.config['claude_api_key'],
+            cache=cache,
+            resilience=resilience,
+            telemetry=self.telemetry
         )
         
+        self.clone_strategy = CloneStrategy.from_config(self.config)
+        
         self.github = GitHubHandler(
             self.config['github_token'],
             self.config['github_username'],
-            self.config['workspace_path']
+            self.config['workspace_path'],
+            clone_strategy=self.clone_strategy
         )
         
+        # Stream plans and code instead of waiting for whole completions
+        self.stream_responses = self.config.get('stream_responses', True)
+        
+        # Per-file code generation runs in parallel, under a shared token budget
+        tokens_per_minute = self.config.get('codegen_tokens_per_minute')
+        self.codegen = ParallelCodeGenerator(
+            self.claude,
+            max_concurrency=self.config.get('codegen_concurrency', 4),
+            token_bucket=TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute else None,
+            stream=self.stream_responses,
+            edit_mode=self.config.get('edit_mode', 'diff')
+        )
+        
+        # File/symbol index per repo, fed to planning so plans name real files
+        self.repo_index_dir = None
+        if self.config.get('repo_index_enabled', True):
+            self.repo_index_dir = self.config.get('repo_index_dir', f"state/{self.name.lower()}_repo_index")
+        self.repo_index_chars = self.config.get('repo_index_context_chars', 6000)
+        self._repo_indexes = {}
+        self._repo_indexes_lock = threading.Lock()
+        
+        # Each task gets its own git worktree off one shared clone per repo,
+        # so tasks on the same repo no longer have to run one at a time
+        self.use_worktrees = self.config.get('use_worktrees', True)
+        
+        # Slack cursor, set by run(); finished tasks are reported back to it
+        self.slack_cursor = None
+        
+        # Worker pool
+        self.scheduler = TaskScheduler(
+            self._run_queued_task,
+            num_workers=self.config.get('max_workers', 2),
+            max_queue_size=self.config.get('max_queue_size', 50),
+            serialize_per_repo=self.config.get('serialize_per_repo', not self.use_worktrees)
+        )
+        
+        if self.use_worktrees:
+            self.worker_github = [self.github] * self.scheduler.num_workers
+        else:
+            # Without worktrees each worker needs its own workspace so clones never collide
+            self.worker_github = [
+                GitHubHandler(
+                    self.config['github_token'],
+                    self.config['github_username'],
+                    str(Path(self.config['workspace_path']) / f"worker-{worker_id}"),
+                    clone_strategy=self.clone_strategy
+                )
+                for worker_id in range(self.scheduler.num_workers)
+            ]
+        
         # Initialize dashboard reporter
-        self.dashboard = DashboardReporter()
+        self.dashboard = DashboardReporter(
+            self.config.get('dashboard_url', "http://localhost:8000"),
+            batch_size=self.config.get('dashboard_batch_size', 50),
+            flush_interval=self.config.get('dashboard_flush_interval', 0.5),
+            max_buffer=self.config.get('dashboard_buffer_size', 1000)
+        )
         self.dashboard.add_log("success", f"{self.emoji} {self.name} initialized!")
         
+        # The API server aggregates call metrics for /api/metrics
+        self.telemetry.on_record = self.dashboard.record_usage
+        
         self.logger.info(f"{self.emoji} {self.name} initialized!")
     
     def _setup_logging(self):
@@ -73,10 +179,31 @@ class CodingAgent:
         phrase = self.catchphrases.get(key, key)
         return phrase.format(**kwargs)
     
-    def process_task(self, task_data, thread_ts=None):
+    def _repo_index(self, repo_url):
+        """The (shared) RepoIndex for a repo, or None if indexing is off"""
+        if not self.repo_index_dir or not repo_url:
+            return None
+        with self._repo_indexes_lock:
+            if repo_url not in self._repo_indexes:
+                self._repo_indexes[repo_url] = RepoIndex.for_repo(self.repo_index_dir, repo_url)
+            return self._repo_indexes[repo_url]
+    
+    def _refresh_index(self, index, repo_path):
+        """Re-index the blobs that changed in a fresh clone/pull"""
+        try:
+            with path_lock(repo_path):
+                index.refresh(repo_path)
+        except Exception as e:
+            self.logger.warning(f"Couldn't index {repo_path}: {e}")
+    
+    def process_task(self, task_data, thread_ts=None, github=None):
         """
         Main function to process a task from start to finish
+        
+        github: GitHubHandler to use (defaults to the shared one)
+        Returns: True if the task succeeded
         """
+        github = github or self.github
         task = task_data.get('task', '')
         repo_url = task_data.get('repo', '')
         file_path = task_data.get('file', '')
@@ -93,6 +220,23 @@ class CodingAgent:
         self.dashboard.update_status("working", task, 10)
         self.dashboard.add_log("info", f"🚀 Starting task: {task}")
         
+        # Cloning can start while the plan is still streaming in
+        clone_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clone")
+        clone_future = None
+        worktree_path = None
+        
+        def start_clone(files):
+            """Kick off the clone once the plan has named its files"""
+            nonlocal clone_future
+            if repo_url and clone_future is None:
+                self.dashboard.add_log("info", "📦 Cloning repository while planning...")
+                clone_future = clone_pool.submit(
+                    github.clone_or_pull,
+                    repo_url,
+                    branch,
+                    sparse_paths=files + ([file_path] if file_path else [])
+                )
+        
         try:
             # Step 1: Announce we're starting
             self.slack.send_message(
@@ -111,7 +255,24 @@ class CodingAgent:
                 thread_ts=thread_ts
             )
             
-            plan = self.claude.analyze_task(task)
+            # Plan against what the repo really contains
+            context = ""
+            index = self._repo_index(repo_url)
+            if index is not None:
+                if not index.files:
+                    # First task on this repo - fetch the tree (no checkout) so the
+                    # plan sees it; the checkout still overlaps with planning
+                    self.dashboard.add_log("info", "📦 Indexing repository before planning...")
+                    tree_clone = github.fetch_tree(repo_url, branch)
+                    if tree_clone:
+                        self._refresh_index(index, tree_clone)
+                context = index.context_for(task, self.repo_index_chars)
+            
+            with call_labels(task=task_id, repo=repo_url):
+                if self.stream_responses:
+                    plan = self.claude.analyze_task_streaming(task, context, on_files=start_clone)
+                else:
+                    plan = self.claude.analyze_task(task, context)
             
             if not plan:
                 raise Exception("Failed to create plan")
@@ -132,11 +293,29 @@ class CodingAgent:
                 thread_ts=thread_ts
             )
             
-            repo_path = self.github.clone_or_pull(repo_url, branch)
+            if clone_future:
+                repo_path = clone_future.result()
+            else:
+                repo_path = github.clone_or_pull(
+                    repo_url,
+                    branch,
+                    sparse_paths=plan.get('files_to_modify', []) + ([file_path] if file_path else [])
+                )
             
             if not repo_path:
                 raise Exception("Failed to clone repository")
             
+            if index is not None:
+                # Only blobs changed by the pull are parsed again
+                self._refresh_index(index, repo_path)
+                unknown = [f for f in plan.get('files_to_modify', []) if not index.has_file(f)]
+                if unknown:
+                    self.logger.info(f"Plan names {len(unknown)} file(s) not in the repo, they will be created: {unknown}")
+            
+            if self.use_worktrees:
+                worktree_path = github.worktrees.create(repo_path, task_id, branch)
+                repo_path = worktree_path
+            
             self.dashboard.add_log("success", "✅ Repository ready")
             
             # Step 4: Make code changes
@@ -159,31 +338,23 @@ class CodingAgent:
             if not files_to_modify:
                 raise Exception("No files to modify!")
             
-            # Modify each file
-            for i, file in enumerate(files_to_modify):
-                self.logger.info(f"Modifying: {file}")
-                self.dashboard.add_log("info", f"📝 Modifying {file}")
-                
-                # Read current content
-                current_content = self.github.read_file(repo_path, file)
-                
-                # Generate new code
-                new_code = self.claude.generate_code(
+            # Modify files in parallel, writing each one as it arrives
+            def on_progress(done, total, file, written):
+                if written:
+                    self.dashboard.add_log("info", f"📝 Modified {file} ({done}/{total})")
+                else:
+                    self.dashboard.add_log("warning", f"⚠️ Skipped {file} ({done}/{total})")
+                progress = 60 + (20 * done // total)
+                self.dashboard.update_status("working", task, progress)
+            
+            with call_labels(task=task_id, repo=repo_url):
+                self.codegen.run(
                     task,
-                    file,
-                    current_content or ""
+                    repo_path,
+                    files_to_modify,
+                    github,
+                    on_progress=on_progress
                 )
-                
-                if not new_code:
-                    self.logger.warning(f"No code generated for {file}")
-                    continue
-                
-                # Write new code
-                self.github.write_file(repo_path, file, new_code)
-                
-                # Update progress
-                progress = 60 + (20 * (i + 1) // len(files_to_modify))
-                self.dashboard.update_status("working", task, progress)
             
             # Step 5: Commit and push
             self.dashboard.update_status("working", task, 90)
@@ -196,7 +367,7 @@ class CodingAgent:
             )
             
             commit_message = f"[{self.name}] {task}"
-            success = self.github.commit_and_push(repo_path, commit_message, branch)
+            success = github.commit_and_push(repo_path, commit_message, branch)
             
             if not success:
                 raise Exception("Failed to push changes")
@@ -213,6 +384,7 @@ class CodingAgent:
             )
             
             self.logger.info(f"{self.emoji} Task completed successfully!")
+            return True
             
         except Exception as e:
             # Something went wrong
@@ -227,6 +399,37 @@ class CodingAgent:
                 self.say('error') + f"\n\nError: {str(e)}",
                 thread_ts=thread_ts
             )
+            return False
+        
+        finally:
+            # Never leave a clone running into the next task for this repo
+            clone_pool.shutdown(wait=True)
+            
+            if worktree_path:
+                try:
+                    github.worktrees.remove(worktree_path)
+                except Exception as e:
+                    self.logger.error(f"Error removing worktree: {e}")
+    
+    def _run_queued_task(self, task_data, thread_ts, worker_id):
+        """Run a task from the scheduler on the given worker"""
+        try:
+            result = self.process_task(
+                task_data,
+                thread_ts,
+                github=self.worker_github[worker_id]
+            )
+        finally:
+            # Done either way - a restart shouldn't run it again
+            if self.slack_cursor:
+                self.slack_cursor.finish(thread_ts)
+        self.logger.info(f"Scheduler stats: {self.scheduler.get_stats()}")
+        if self.claude.cache:
+            self.logger.info(f"Claude cache stats: {self.claude.cache.stats()}")
+        self.logger.info(f"Claude API call stats: {self.claude.resilience.stats()}")
+        self.logger.info(f"Claude usage by stage: {self.telemetry.summary()['groups']}")
+        self.logger.info(f"Dashboard reporter stats: {self.dashboard.get_stats()}")
+        return result
     
     def run(self):
         """
@@ -245,18 +448,58 @@ class CodingAgent:
         
         self.logger.info(f"{self.emoji} {self.name} is running...")
         
+        # Start the worker pool
+        self.scheduler.start()
+        
+        # Clean up worktrees left behind by crashed tasks
+        if self.use_worktrees:
+            self.github.worktrees.start_pruner(
+                interval=self.config.get('worktree_prune_interval', 600),
+                max_age=self.config.get('worktree_max_age', 3600)
+            )
+        
         # Listen for mentions
         def task_callback(task_data, thread_ts):
-            """Called when task is received"""
-            self.process_task(task_data, thread_ts)
+            """Called when task is received - queue it so polling never blocks"""
+            try:
+                self.scheduler.submit(task_data, thread_ts)
+            except QueueFullError as e:
+                self.logger.warning(f"Rejected task: {e}")
+                cursor.finish(thread_ts)
+                self.slack.send_message(
+                    channel,
+                    f"😅 Too many tasks queued right now ({self.scheduler.queue_depth()} waiting). Try again in a bit!",
+                    thread_ts=thread_ts
+                )
+        
+        # Socket Mode pushes events to us; otherwise fall back to polling
+        source = None
+        if self.config.get('slack_ingest_mode', 'poll') == 'socket':
+            source = SocketModeSource(
+                self.config['slack_app_token'],
+                web_client=self.slack.client
+            )
+        
+        cursor = self.slack_cursor = EventCursor(
+            self.config.get('slack_cursor_file', f"state/{self.name.lower()}_slack_cursor.json")
+        )
         
         # Start listening (this runs forever)
         try:
-            self.slack.listen_for_mentions(channel, task_callback)
+            self.slack.listen_for_mentions(
+                channel,
+                task_callback,
+                poll_interval=self.config.get('slack_poll_interval', 5),
+                source=source,
+                cursor=cursor
+            )
         except KeyboardInterrupt:
             self.logger.info(f"{self.emoji} {self.name} is shutting down...")
+            self.scheduler.shutdown(wait=False)
+            self.github.worktrees.stop_pruner()
             self.dashboard.update_status("offline", None, 0)
             self.dashboard.add_log("warning", f"🔴 {self.name} is going offline")
+            self.dashboard.close()
             self.slack.send_message(
                 channel,
                 f"🔴 {self.emoji} {self.name} is going offline. Bye mum!"
@@ -1,28 +1,55 @@
 """
 FastAPI server to expose agent status for the dashboard
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import threading
 import time
+import asyncio
+from contextlib import asynccontextmanager
+import hashlib
+import uuid
+from collections import Counter
 from .personality import personality
 from .claude_handler import ClaudeHandler
+from .chat_service import ChatService, ReplyCache, normalize_message
 from .config import AgentConfig
+from .task_store import TaskStore
+from .log_store import LogStore
+from .event_hub import EventHub
+from .state_journal import StateJournal
+from .telemetry import Telemetry, DIMENSIONS
 
 # Load config to get Claude API key
 config_path = Path(__file__).parent.parent / "configs" / "lmnh.json"
 if config_path.exists():
     config = AgentConfig(str(config_path))
     claude = ClaudeHandler(config['claude_api_key'])
+    chat = ChatService(
+        config['claude_api_key'],
+        claude.model,
+        max_concurrency=config.get('chat_max_concurrency', 8),
+        timeout=config.get('chat_timeout', 30),
+        cache=ReplyCache(ttl=config.get('chat_cache_ttl', 60)),
+        on_usage=lambda usage: record_usage(usage)
+    )
 else:
     claude = None
+    chat = None
 
-app = FastAPI(title="LMNH API", description="API for LMNH Dashboard")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Snapshot and flush the state journal on a clean shutdown
+    close_state()
+
+app = FastAPI(title="LMNH API", description="API for LMNH Dashboard", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -39,8 +66,6 @@ agent_state = {
     "current_task": None,
     "progress": 0,
     "start_time": datetime.now(),
-    "tasks": [],
-    "logs": [],
     "stats": {
         "tasks_completed": 0,
         "tasks_failed": 0,
@@ -49,46 +74,164 @@ agent_state = {
     }
 }
 
+# Recent tasks in memory, older ones spilled to disk
+task_store = TaskStore(
+    max_tasks=int(os.environ.get("LMNH_TASK_RETENTION", 500)),
+    spill_path=os.environ.get("LMNH_TASK_SPILL_FILE", "state/api_tasks.jsonl")
+)
+
+# Recent log lines, each with a sequence number for incremental polling
+log_store = LogStore(capacity=int(os.environ.get("LMNH_LOG_RETENTION", 500)))
+
+# State deltas pushed to /api/stream viewers
+event_hub = EventHub(capacity=int(os.environ.get("LMNH_STREAM_BACKLOG", 1000)))
+
+# Claude call tokens, cost and latency - the agent's, reported through
+# /api/ingest, plus the chat endpoint's own
+metrics = Telemetry()
+
+# Seconds between heartbeat frames on an idle stream
+STREAM_HEARTBEAT = 15
+
+# Version counters, bumped on every mutation of the part of the state
+# they cover. The read endpoints derive their ETags from these.
+state_versions = Counter()
+
+# ETags from a previous server run must never match this one
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Serialized bodies for the current versions: key -> (etag, body)
+_response_cache = {}
+RESPONSE_CACHE_SIZE = 256
+
+# Every read-modify-write of agent_state happens under this lock, so a
+# batch from /api/ingest is applied atomically with respect to readers
+state_lock = threading.RLock()
+
+# Biggest batch /api/ingest will take in one request
+MAX_INGEST_EVENTS = 1000
+
+# Fields each ingest event type must carry
+EVENT_FIELDS = {
+    "status": ("status",),
+    "stats": ("stats",),
+    "task_add": ("id", "title"),
+    "task_update": ("id", "status"),
+    "log": ("level", "message"),
+    "update": ("state",),
+    "usage": ("stage", "model"),
+}
+
 def update_agent_state(new_state: Dict[str, Any]):
     """Update the global agent state"""
     global agent_state
+    status_keys = ("status", "current_task", "progress")
+    old_status = {key: agent_state.get(key) for key in status_keys}
+    
     agent_state.update(new_state)
+    
+    # Only push what actually changed
+    new_status = {key: agent_state.get(key) for key in status_keys}
+    if new_status != old_status:
+        state_versions["status"] += 1
+        event_hub.publish("status", new_status)
+    if "stats" in new_state:
+        state_versions["stats"] += 1
+        event_hub.publish("stats", agent_state["stats"])
 
-def add_task(task_id: str, title: str, status: str = "pending"):
+def add_task(task_id: str, title: str, status: str = "pending", when: datetime = None):
     """Add a new task to the queue"""
     global agent_state
+    when = when or datetime.now()
     task = {
         "id": task_id,
         "title": title,
         "status": status,
-        "timestamp": datetime.now().strftime("%I:%M %p"),
+        "timestamp": when.strftime("%I:%M %p"),
     }
-    agent_state["tasks"].append(task)
-    add_log("info", f"New task added: {title}")
+    state_versions["tasks"] += 1
+    event_hub.publish("task", dict(task_store.add(task)))
+    add_log("info", f"New task added: {title}", when)
 
-def update_task_status(task_id: str, status: str):
+def update_task_status(task_id: str, status: str, when: datetime = None):
     """Update task status"""
     global agent_state
-    for task in agent_state["tasks"]:
-        if task["id"] == task_id:
-            task["status"] = status
-            task["timestamp"] = datetime.now().strftime("%I:%M %p")
-            add_log("info", f"Task {task_id} status: {status}")
-            break
-
-def add_log(level: str, message: str):
+    when = when or datetime.now()
+    task = task_store.update(task_id, status=status, timestamp=when.strftime("%I:%M %p"))
+    if task:
+        state_versions["tasks"] += 1
+        event_hub.publish("task", dict(task))
+        add_log("info", f"Task {task_id} status: {status}", when)
+
+def add_log(level: str, message: str, when: datetime = None):
     """Add a log entry"""
     global agent_state
+    when = when or datetime.now()
     log = {
-        "timestamp": datetime.now().strftime("%H:%M:%S"),
+        "timestamp": when.strftime("%H:%M:%S"),
         "level": level,
         "message": message,
     }
-    agent_state["logs"].append(log)
+    log = log_store.append(log)
+    state_versions["logs"] += 1
+    event_hub.publish("log", log)
+    return log
+
+def apply_event(event: Dict[str, Any]):
+    """Apply one event from the agent's batched reporter (state_lock held)"""
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+    
+    event_type = event.get("type")
+    if event_type not in EVENT_FIELDS:
+        raise ValueError(f"Unknown event type: {event_type}")
+    
+    missing = [field for field in EVENT_FIELDS[event_type] if field not in event]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+    
+    # Events are stamped when the agent made them, not when the batch arrived
+    when = datetime.fromtimestamp(event["ts"]) if event.get("ts") else None
     
-    # Keep only last 100 logs
-    if len(agent_state["logs"]) > 100:
-        agent_state["logs"] = agent_state["logs"][-100:]
+    if event_type == "status":
+        update_agent_state({
+            "status": event["status"],
+            "current_task": event.get("current_task"),
+            "progress": event.get("progress", 0),
+        })
+    elif event_type == "stats":
+        update_agent_state({"stats": event["stats"]})
+    elif event_type == "task_add":
+        add_task(event["id"], event["title"], event.get("status", "pending"), when)
+    elif event_type == "task_update":
+        update_task_status(event["id"], event["status"], when)
+    elif event_type == "log":
+        add_log(event["level"], event["message"], when)
+    elif event_type == "update":
+        update_agent_state(event["state"])
+    elif event_type == "usage":
+        metrics.add(event)
+        state_versions["metrics"] += 1
+
+def record_event(event: Dict[str, Any]):
+    """Apply an event and journal it, if state is persistent (state_lock held)"""
+    event.setdefault("ts", time.time())
+    apply_event(event)
+    if journal:
+        journal.append(event)
+
+def record_usage(usage: Dict[str, Any]):
+    """Account for one of our own Claude calls (the chat endpoint's)"""
+    with state_lock:
+        record_event(dict(usage, type="usage"))
+
+def record(event: Dict[str, Any]):
+    """record_event for the single-item endpoints: takes the lock, bad input is a 400"""
+    with state_lock:
+        try:
+            record_event(event)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
 def calculate_uptime() -> str:
     """Calculate agent uptime"""
@@ -97,6 +240,98 @@ def calculate_uptime() -> str:
     minutes = (uptime.seconds % 3600) // 60
     return f"{hours}h {minutes}m"
 
+def conditional_json(key: tuple, sections: tuple, if_none_match: Optional[str], build) -> Response:
+    """
+    JSON response with a strong ETag, or an empty 304 if the client has it
+    
+    key: everything besides state that the body depends on (path, params)
+    sections: which state_versions the body is built from
+    build: called under state_lock to produce the body on a cache miss
+    """
+    with state_lock:
+        versions = tuple(state_versions[section] for section in sections)
+        cache_key = key + versions
+        cached = _response_cache.get(cache_key)
+        
+        if cached is None:
+            digest = hashlib.sha1(repr(cache_key).encode()).hexdigest()[:16]
+            etag = f'"{BOOT_ID}-{digest}"'
+            body = json.dumps(build(), default=str).encode()
+            
+            if len(_response_cache) >= RESPONSE_CACHE_SIZE:
+                _response_cache.clear()
+            _response_cache[cache_key] = cached = (etag, body)
+    
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def build_snapshot() -> Dict[str, Any]:
+    """Everything a new stream viewer needs before it can apply deltas (state_lock held)"""
+    return {
+        "status": agent_state["status"],
+        "current_task": agent_state["current_task"],
+        "progress": agent_state["progress"],
+        "uptime": calculate_uptime(),
+        "tasks": task_store.recent(10),
+        "stats": dict(agent_state["stats"]),
+        "logs": log_store.tail(50),
+    }
+
+def sse_frame(event_type: str, data: Any, seq: Optional[int] = None) -> str:
+    """Format one Server-Sent Events frame"""
+    frame = f"event: {event_type}\n"
+    if seq is not None:
+        frame += f"id: {seq}\n"
+    return frame + f"data: {json.dumps(data, default=str)}\n\n"
+
+async def stream_events(since: Optional[int] = None, heartbeat: float = STREAM_HEARTBEAT):
+    """
+    Yield SSE frames for one viewer: a snapshot (unless resuming), then deltas
+    
+    since: last event id the viewer saw - deltas after it are replayed.
+    If they already fell out of the backlog, a fresh snapshot is sent.
+    """
+    waiter = event_hub.subscribe()
+    try:
+        cursor = since
+        while True:
+            with state_lock:
+                if cursor is not None and cursor <= event_hub.last_seq:
+                    events, missed = event_hub.since(cursor, limit=100)
+                else:
+                    # New viewer, or an id from before a server restart
+                    events, missed = [], True
+                
+                if missed:
+                    cursor = event_hub.last_seq
+                    frame = sse_frame("snapshot", build_snapshot(), cursor)
+            
+            if missed:
+                yield frame
+                continue
+            
+            for event in events:
+                cursor = event["seq"]
+                yield sse_frame(event["type"], event["data"], cursor)
+            
+            if events:
+                continue
+            
+            try:
+                await asyncio.wait_for(waiter.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield sse_frame("heartbeat", {"uptime": calculate_uptime()})
+            waiter.clear()
+    finally:
+        event_hub.unsubscribe(waiter)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -108,70 +343,172 @@ async def root():
     }
 
 @app.get("/api/status")
-async def get_status():
-    """Get current agent status"""
-    return {
-        "status": agent_state["status"],
-        "current_task": agent_state["current_task"],
-        "progress": agent_state["progress"],
-        "uptime": calculate_uptime(),
-        "tasks": agent_state["tasks"][-10:],  # Last 10 tasks
-        "stats": agent_state["stats"],
-    }
+async def get_status(if_none_match: Optional[str] = Header(None)):
+    """Get current agent status (304 if unchanged since the client's ETag)"""
+    uptime = calculate_uptime()
+    return conditional_json(
+        ("status", uptime),
+        ("status", "tasks", "stats"),
+        if_none_match,
+        lambda: {
+            "status": agent_state["status"],
+            "current_task": agent_state["current_task"],
+            "progress": agent_state["progress"],
+            "uptime": uptime,
+            "tasks": task_store.recent(10),  # Last 10 tasks
+            "stats": dict(agent_state["stats"]),
+        }
+    )
 
 @app.get("/api/logs")
-async def get_logs():
-    """Get recent logs"""
-    return {
-        "logs": agent_state["logs"][-50:]  # Last 50 logs
-    }
+async def get_logs(since: Optional[int] = None, limit: int = 200):
+    """
+    Get recent logs
+    
+    Without `since` this returns the last 50 logs. With `since=<seq>` it
+    returns only entries newer than that sequence number; pass back
+    last_seq on the next poll. `missed` counts entries that were already
+    dropped from the buffer, and `reset` is set if the server restarted.
+    """
+    with state_lock:
+        if since is None:
+            return {
+                "logs": log_store.tail(50),  # Last 50 logs
+                "last_seq": log_store.last_seq,
+            }
+        
+        # A cursor from before a server restart would never match again
+        reset = since > log_store.last_seq
+        logs, missed = log_store.since(0 if reset else since, max(1, limit))
+        return {
+            "logs": logs,
+            "last_seq": logs[-1]["seq"] if logs else log_store.last_seq,
+            "missed": missed,
+            "reset": reset,
+        }
+
+@app.get("/api/stream")
+async def stream(since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Push stream of state deltas (Server-Sent Events)
+    
+    Sends a snapshot, then status, task, log and stats events as they
+    happen, with a heartbeat every STREAM_HEARTBEAT seconds when idle.
+    Reconnecting browsers resume from their Last-Event-ID header; other
+    clients can pass ?since=<id>.
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    return StreamingResponse(
+        stream_events(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/tasks")
-async def get_tasks():
-    """Get all tasks"""
-    return {
-        "tasks": agent_state["tasks"]
-    }
+async def get_tasks(cursor: Optional[str] = None, limit: int = 50,
+                    if_none_match: Optional[str] = Header(None)):
+    """
+    Get tasks, newest first, a page at a time
+    
+    Pass next_cursor back as ?cursor= to get the next (older) page.
+    """
+    limit = max(1, min(limit, 200))
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    def build():
+        tasks, next_cursor = task_store.page(cursor, limit)
+        return {
+            "tasks": tasks,
+            "next_cursor": next_cursor,
+            "total": len(task_store),
+        }
+    
+    return conditional_json(("tasks", cursor, limit), ("tasks",), if_none_match, build)
 
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(if_none_match: Optional[str] = Header(None)):
     """Get statistics"""
-    return agent_state["stats"]
+    return conditional_json(("stats",), ("stats",), if_none_match, lambda: agent_state["stats"])
+
+@app.get("/api/metrics")
+async def get_metrics(group_by: str = "stage", if_none_match: Optional[str] = Header(None)):
+    """Claude tokens, cost and latency, grouped by any of task, stage, model and repo"""
+    dimensions = tuple(name.strip() for name in group_by.split(",") if name.strip())
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Can't group by: {', '.join(unknown)}")
+    
+    def build():
+        return dict(metrics.summary(dimensions), group_by=list(dimensions))
+    
+    return conditional_json(("metrics", dimensions), ("metrics",), if_none_match, build)
+
+# The write endpoints are plain functions so FastAPI runs them in its
+# threadpool: they wait on state_lock and the journal, never on the event loop
 
 @app.post("/api/update")
-async def update_status(data: dict):
+def update_status(data: dict):
     """Update agent status (called by agent)"""
-    update_agent_state(data)
+    record({"type": "update", "state": data})
     return {"success": True}
 
 @app.post("/api/task/add")
-async def api_add_task(data: dict):
+def api_add_task(data: dict):
     """Add a new task"""
-    add_task(data["id"], data["title"], data.get("status", "pending"))
+    record(dict(data, type="task_add"))
     return {"success": True}
 
 @app.post("/api/task/update")
-async def api_update_task(data: dict):
+def api_update_task(data: dict):
     """Update task status"""
-    update_task_status(data["id"], data["status"])
+    record(dict(data, type="task_update"))
     return {"success": True}
 
 @app.post("/api/log")
-async def api_add_log(data: dict):
+def api_add_log(data: dict):
     """Add a log entry"""
-    add_log(data["level"], data["message"])
+    record(dict(data, type="log"))
     return {"success": True}
 
-@app.post("/api/chat")
-async def chat_with_lmnh(data: dict):
-    """Chat with LMNH using REAL Claude API!"""
-    user_message = data.get("message", "")
+@app.post("/api/ingest")
+def api_ingest(data: dict):
+    """
+    Apply a batch of mixed events in one request (called by DashboardReporter)
     
-    # If Claude API is available, use it for REAL conversations!
-    if claude:
-        try:
-            # Build context about LMNH's current state
-            context = f"""You are LMNH (Look Mum No Hands!) - an autonomous coding agent with personality!
+    Body: {"events": [{"type": "status" | "stats" | "task_add" | "task_update" | "log", ...}]}
+    Events are applied in order under one lock; a bad event is reported
+    in its result and doesn't stop the rest of the batch.
+    """
+    events = data.get("events")
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="'events' must be a list")
+    if len(events) > MAX_INGEST_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_INGEST_EVENTS} events per batch")
+    
+    results = []
+    with state_lock:
+        for event in events:
+            try:
+                record_event(event)
+                results.append({"ok": True})
+            except Exception as e:
+                results.append({"ok": False, "error": str(e)})
+    
+    applied = sum(1 for result in results if result["ok"])
+    return {
+        "success": applied == len(results),
+        "applied": applied,
+        "failed": len(results) - applied,
+        "results": results,
+    }
+
+# Never changes between messages, so it goes first; the live state follows.
+# At ~200 tokens it is far below the provider's minimum cacheable prompt,
+# so it isn't marked for prompt caching - repeats are served by the reply cache.
+CHAT_PERSONA = """You are LMNH (Look Mum No Hands!) - an autonomous coding agent with personality!
 
 Your personality traits:
 - Overconfident and eager
@@ -183,32 +520,32 @@ Your personality traits:
 - Uses **bold** for emphasis
 - Uses `code` for technical terms
 
-Current status: {agent_state["status"]}
-Current task: {agent_state.get("current_task", "None - waiting for tasks!")}
-Tasks completed today: {agent_state["stats"]["tasks_completed"]}
-Tasks failed: {agent_state["stats"]["tasks_failed"]}
-
 Respond in character as LMNH - be enthusiastic, confident, and fun! Keep responses 1-3 sentences.
 Use your catchphrase "LOOK MUM NO HANDS!" when appropriate.
 Add fun *actions* in asterisks like *revs up virtual engines* or *cracks knuckles (that don't exist)*.
 Use **bold** for emphasis on important words."""
 
-            response = claude.client.messages.create(
-                model=claude.model,
-                max_tokens=200,
-                system=context,
-                messages=[{"role": "user", "content": user_message}]
-            )
-            
-            ai_response = response.content[0].text.strip()
-            return {"response": ai_response, "powered_by": "Claude AI"}
-            
-        except Exception as e:
-            print(f"Claude API error: {e}")
-            # Fallback to personality patterns
-            pass
+def build_chat_context() -> List[Dict[str, Any]]:
+    """System prompt blocks: the persona, then LMNH's current state"""
+    with state_lock:
+        stats = agent_state["stats"]
+        state = f"""Current status: {agent_state["status"]}
+Current task: {agent_state.get("current_task") or "None - waiting for tasks!"}
+Tasks completed today: {stats.get("tasks_completed", 0)}
+Tasks failed: {stats.get("tasks_failed", 0)}"""
     
-    # Fallback: Use personality patterns if Claude API fails or not available
+    return [
+        {"type": "text", "text": CHAT_PERSONA},
+        {"type": "text", "text": state},
+    ]
+
+def chat_cache_key(user_message: str) -> tuple:
+    """Reply cache key: the normalized message plus the version of the state the prompt shows"""
+    with state_lock:
+        return (normalize_message(user_message), state_versions["status"], state_versions["stats"])
+
+def personality_reply(user_message: str) -> str:
+    """Canned in-character reply for when Claude isn't available"""
     user_lower = user_message.lower()
     
     if "status" in user_lower or "how are you" in user_lower:
@@ -229,7 +566,64 @@ Use **bold** for emphasis on important words."""
     else:
         response = personality.get_thought() + " *contemplates existence*"
     
-    return {"response": response, "powered_by": "Personality Patterns"}
+    return response
+
+async def stream_chat_reply(user_message: str):
+    """SSE frames for a streamed chat reply, falling back to personality patterns"""
+    if chat:
+        sent_any = False
+        try:
+            async for chunk in chat.stream(build_chat_context(), user_message, chat_cache_key(user_message)):
+                sent_any = True
+                yield sse_frame("token", {"text": chunk})
+            yield sse_frame("done", {"powered_by": "Claude AI"})
+            return
+        except Exception as e:
+            print(f"Claude API error: {e}")
+            if sent_any:
+                # Too late to switch to a canned reply halfway through
+                yield sse_frame("error", {"error": str(e)})
+                return
+    
+    yield sse_frame("token", {"text": personality_reply(user_message)})
+    yield sse_frame("done", {"powered_by": "Personality Patterns"})
+
+@app.post("/api/chat")
+async def chat_with_lmnh(data: dict):
+    """
+    Chat with LMNH using REAL Claude API!
+    
+    Uses the async client, so other requests keep being served while
+    Claude thinks. With {"stream": true} the reply streams back token by
+    token as Server-Sent Events ("token" frames, then "done").
+    """
+    user_message = data.get("message", "")
+    
+    if data.get("stream"):
+        return StreamingResponse(
+            stream_chat_reply(user_message),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
+    # If Claude API is available, use it for REAL conversations!
+    if chat:
+        try:
+            ai_response = await chat.complete(build_chat_context(), user_message, chat_cache_key(user_message))
+            return {"response": ai_response, "powered_by": "Claude AI"}
+        except Exception as e:
+            print(f"Claude API error: {e}")
+            # Fallback to personality patterns
+    
+    # Fallback: Use personality patterns if Claude API fails or not available
+    return {"response": personality_reply(user_message), "powered_by": "Personality Patterns"}
+
+@app.get("/api/chat/stats")
+async def get_chat_stats():
+    """Chat concurrency and reply cache counters"""
+    if not chat:
+        return {"enabled": False}
+    return dict(chat.stats(), enabled=True)
 
 @app.get("/api/personality/thought")
 async def get_random_thought():
@@ -239,23 +633,107 @@ async def get_random_thought():
 # Initialize with demo data for testing
 def init_demo_data():
     """Initialize with some demo data"""
-    agent_state["status"] = "idle"
-    agent_state["logs"] = [
-        {
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "level": "success",
-            "message": "🚴‍♂️ LMNH API Server started!",
-        },
-        {
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "level": "info",
-            "message": "Waiting for tasks... LOOK MUM NO HANDS!",
-        }
-    ]
+    with state_lock:
+        record_event({"type": "update", "state": {"status": "idle"}})
+        record_event({"type": "log", "level": "success", "message": "🚴‍♂️ LMNH API Server started!"})
+        record_event({"type": "log", "level": "info", "message": "Waiting for tasks... LOOK MUM NO HANDS!"})
     # Force 24-hour format consistently
 
+def capture_state() -> Dict[str, Any]:
+    """
+    Shallow copy of everything the journal has built up (state_lock held)
+    
+    Only containers are copied, so the lock is held briefly; export_state()
+    does the rest afterwards. Metrics are exported in full here because
+    replaying a usage event adds to them again.
+    """
+    return {
+        "agent": {key: value for key, value in agent_state.items() if key != "start_time"},
+        "tasks": task_store.held(),
+        "logs": log_store.tail(log_store.capacity),
+        "log_seq": log_store.last_seq,
+        "event_seq": event_hub.last_seq,
+        "versions": dict(state_versions),
+        "metrics": metrics.export(),
+    }
+
+def export_state(captured: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Snapshot body from a capture_state(), built without state_lock
+    
+    Log entries never change once appended. Tasks are updated in place, so
+    a copied task may already show a later event than the snapshot covers;
+    re-applying that event on replay sets the same fields again.
+    """
+    tasks = captured["tasks"]
+    return dict(captured, tasks=dict(tasks, tasks=[dict(task) for task in tasks["tasks"]]))
+
+def restore_state(snapshot: Dict[str, Any]):
+    """Load an export_state() snapshot (state_lock held)"""
+    agent_state.update(snapshot["agent"])
+    task_store.restore(snapshot["tasks"])
+    log_store.restore(snapshot["logs"], snapshot["log_seq"])
+    event_hub.restore(snapshot["event_seq"])
+    state_versions.update(snapshot["versions"])
+    metrics.restore(snapshot.get("metrics"))
+
+def take_snapshot():
+    """Write a snapshot and let the journal drop the events it covers"""
+    with state_lock:
+        n = journal.rotate()
+        captured = capture_state()
+    journal.write_snapshot(export_state(captured), n)
+
+# "persistent" (default) journals every change under LMNH_STATE_DIR and
+# rebuilds state from it on boot; "memory" keeps state in process only
+STATE_MODE = os.environ.get("LMNH_STATE_MODE", "persistent")
+journal = None
+restore_seconds = 0.0
+
+def init_state():
+    """Rebuild state from the snapshot and journal tail, or start fresh in memory mode"""
+    global journal, restore_seconds
+    
+    if STATE_MODE == "memory":
+        init_demo_data()
+        return
+    
+    journal = StateJournal(
+        os.environ.get("LMNH_STATE_DIR", "state/api"),
+        fsync_interval=float(os.environ.get("LMNH_STATE_FSYNC_INTERVAL", 0.2)),
+        snapshot_every=int(os.environ.get("LMNH_STATE_SNAPSHOT_EVERY", 10000)),
+        on_snapshot=take_snapshot
+    )
+    
+    started = time.time()
+    snapshot, events = journal.load()
+    with state_lock, task_store.replaying():
+        if snapshot:
+            restore_state(snapshot)
+        for event in events:
+            try:
+                apply_event(event)
+            except Exception as e:
+                print(f"Skipping journal event {event.get('type')}: {e}")
+    
+    journal.open()
+    if events:
+        # Compact now so the next restart doesn't replay this tail again
+        take_snapshot()
+    
+    restore_seconds = time.time() - started
+    print(f"🚴‍♂️ State restored in {restore_seconds:.2f}s ({len(events)} events replayed)")
+    init_demo_data()
+
+def close_state():
+    """Snapshot and flush the journal on a clean shutdown"""
+    if journal:
+        if journal.n > journal.snapshot_n:
+            take_snapshot()
+        journal.close()
+
 # Initialize on startup
-init_demo_data()
+init_state()
 
 if __name__ == "__main__":
     import uvicorn
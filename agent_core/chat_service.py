@@ -0,0 +1,201 @@
+"""
+Async Claude chat for the API server - never blocks the event loop
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+import anthropic
+from .telemetry import usage_record
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBusyError(Exception):
+    """Raised when every chat slot stays taken for longer than the queue timeout"""
+
+
+def normalize_message(message):
+    """Fold case, punctuation and spacing so "Hi!" and "hi" share a cache entry"""
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+
+class ReplyCache:
+    """
+    Short-lived cache of whole chat replies
+    
+    Keys are built by the caller from the normalized message and the
+    version of the state the prompt describes, so a cached reply is only
+    reused while what LMNH would be told about itself is unchanged. Entries
+    expire after ttl seconds and the oldest are dropped past max_entries.
+    """
+    
+    def __init__(self, ttl=60, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self._entries[key]
+        self.misses += 1
+        return None
+    
+    def put(self, key, reply):
+        self._entries[key] = (time.monotonic() + self.ttl, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class ChatService:
+    """
+    Streams chat replies from Claude with the async client
+    
+    One AsyncAnthropic client (and so one pooled keep-alive HTTP
+    connection pool) is shared by every request. A semaphore caps how many
+    chats talk to Claude at once, each request has an overall deadline,
+    and cancelling the consuming task (e.g. the browser went away) closes
+    the upstream stream and frees the slot. With a ReplyCache, repeated
+    questions about an unchanged state are answered without calling Claude.
+    on_usage, if given, is called with a telemetry.usage_record() for
+    every reply Claude streamed (or failed to).
+    """
+    
+    def __init__(self, api_key, model, max_concurrency=8, timeout=30, queue_timeout=10, max_tokens=200, cache=None, on_usage=None):
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, timeout=timeout)
+        self.model = model
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.cache = cache
+        self.on_usage = on_usage
+        
+        # Counters
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rejected = 0
+    
+    async def stream(self, system, message, cache_key=None):
+        """
+        Yield the reply text chunk by chunk as Claude produces it
+        
+        With a cache_key, a cached reply is yielded as a single chunk and
+        a freshly streamed one is cached once it has completed.
+        
+        Raises: ChatBusyError if no slot frees up within queue_timeout,
+        asyncio.TimeoutError if the reply takes longer than timeout
+        """
+        if self.cache and cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ChatBusyError(f"All {self.max_concurrency} chat slots are busy")
+        
+        self.active += 1
+        started = time.monotonic()
+        deadline = started + self.timeout
+        first_token = None
+        reply = []
+        try:
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                system=system,
+                messages=[{"role": "user", "content": message}]
+            ) as response:
+                chunks = response.text_stream.__aiter__()
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    if first_token is None:
+                        first_token = time.monotonic() - started
+                    reply.append(chunk)
+                    yield chunk
+                await self._record_usage(response, time.monotonic() - started, first_token)
+            self.completed += 1
+            if self.cache and cache_key is not None:
+                self.cache.put(cache_key, "".join(reply))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._report(None, time.monotonic() - started, first_token, ok=False)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            self._report(None, time.monotonic() - started, first_token, ok=False)
+            raise
+        finally:
+            self.active -= 1
+            self._slots.release()
+    
+    async def _record_usage(self, response, latency, first_token):
+        """Report the finished reply's token usage to on_usage"""
+        try:
+            usage = (await response.get_final_message()).usage
+        except Exception as e:
+            logger.debug(f"No usage for chat reply: {e}")
+            usage = None
+        self._report(usage, latency, first_token)
+    
+    def _report(self, usage, latency, first_token, ok=True):
+        if not self.on_usage:
+            return
+        try:
+            self.on_usage(usage_record(self.model, "chat", usage, latency, ok, first_token))
+        except Exception as e:
+            logger.debug(f"Couldn't record chat usage: {e}")
+    
+    async def complete(self, system, message, cache_key=None):
+        """The whole reply as one string"""
+        chunks = []
+        async for chunk in self.stream(system, message, cache_key):
+            chunks.append(chunk)
+        return "".join(chunks).strip()
+    
+    def stats(self):
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "reply_cache": self.cache.stats() if self.cache else None,
+        }
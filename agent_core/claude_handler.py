@@ -1,25 +1,138 @@
 from anthropic import Anthropic
 import json
 import logging
+import re
+import time
+from .patch_engine import parse_edits
+from .resilience import ResilientCaller
+from .telemetry import Telemetry
 
 logger = logging.getLogger(__name__)
 
-class ClaudeHandler:
-    """Handles communication with Claude API"""
+def strip_code_fences(text):
+    """Remove a markdown code block wrapper if Claude added one anyway"""
+    text = text.strip()
+    if text.startswith('```'):
+        lines = text.split('\n')
+        text = '\n'.join(lines[1:-1])
+    return text
+
+
+def parse_plan(text):
+    """Parse plan JSON from a raw (possibly fenced) completion"""
+    return json.loads(strip_code_fences(text))
+
+
+class CodeStreamCleaner:
+    """
+    Incremental version of strip_code_fences for streamed output
     
-    def __init__(self, api_key):
-        self.client = Anthropic(api_key=api_key)
-        self.model = "claude-sonnet-4-20250514"
+    feed() returns the text that is safe to emit so far; finish() returns
+    the rest. Joined together they equal strip_code_fences(full_text).
+    """
     
-    def analyze_task(self, task_description, context=""):
+    def __init__(self):
+        self._buf = ""
+        self._started = False
+        self._fenced = False
+    
+    def feed(self, chunk):
+        self._buf += chunk
+        
+        if not self._started:
+            self._buf = self._buf.lstrip()
+            if not self._buf:
+                return ""
+            
+            if self._buf.startswith('```'):
+                # Wait for the whole opening fence line, then drop it
+                if '\n' not in self._buf:
+                    return ""
+                self._buf = self._buf.split('\n', 1)[1]
+                self._fenced = True
+            elif '```'.startswith(self._buf):
+                # Could still turn into a fence
+                return ""
+            
+            self._started = True
+        
+        # Hold back the last non-blank line (and the newline before it) -
+        # it may be a closing fence or trailing whitespace we have to strip
+        end = self._buf.rstrip().rfind('\n')
+        if end <= 0:
+            return ""
+        
+        ready, self._buf = self._buf[:end], self._buf[end:]
+        return ready
+    
+    def finish(self):
+        tail = self._buf.rstrip()
+        self._buf = ""
+        
+        if not self._started:
+            # Never saw anything past the (possible) fence opener
+            return strip_code_fences(tail)
+        
+        if self._fenced:
+            # Drop the closing fence line
+            tail = tail[:tail.rfind('\n')] if '\n' in tail else ""
+        
+        return tail
+
+
+class PlanStreamParser:
+    """
+    Watches a streamed plan and reports files_to_modify as soon as the
+    list is complete, before the rest of the JSON has arrived
+    """
+    
+    FILES_PATTERN = re.compile(r'"files_to_modify"\s*:\s*(\[[^\]]*\])')
+    
+    def __init__(self):
+        self.text = ""
+        self.files = None
+    
+    def feed(self, chunk):
         """
-        Ask Claude to analyze a task and create a plan
+        Add a chunk of plan text
         
-        Returns: dict with plan, files to modify, etc.
+        Returns: the file list the first time it can be parsed, else None
         """
-        logger.info(f"Analyzing task: {task_description}")
+        self.text += chunk
+        
+        if self.files is not None:
+            return None
+        
+        match = self.FILES_PATTERN.search(self.text)
+        if not match:
+            return None
         
-        prompt = f"""You are an autonomous coding agent. Analyze this task:
+        try:
+            self.files = json.loads(match.group(1))
+        except ValueError:
+            return None
+        
+        return self.files
+    
+    def finish(self):
+        """Parse the complete plan"""
+        return parse_plan(self.text)
+
+
+class ClaudeHandler:
+    """Handles communication with Claude API"""
+    
+    def __init__(self, api_key, cache=None, resilience=None, base_url=None, telemetry=None):
+        # Retries are ours (see ResilientCaller), so the SDK must not retry as well
+        self.client = Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+        self.model = "claude-sonnet-4-20250514"
+        self.cache = cache  # optional ResponseCache
+        self.resilience = resilience or ResilientCaller()
+        self.telemetry = telemetry or Telemetry()
+    
+    def _plan_prompt(self, task_description, context):
+        """Build the planning prompt"""
+        return f"""You are an autonomous coding agent. Analyze this task:
 
 Task: {task_description}
 
@@ -35,20 +148,163 @@ Provide a detailed plan in JSON format:
 }}
 
 Respond ONLY with valid JSON, no markdown, no explanation."""
+    
+    def _code_prompt(self, task, file_path, current_content):
+        """Build the code generation prompt"""
+        return f"""You are a coding agent. Modify this file to complete the task.
+
+Task: {task}
+
+File: {file_path}
+
+Current content:
+```
+{current_content if current_content else "# Empty file"}
+```
+
+Provide the COMPLETE new file content. 
+- Only output the code
+- No markdown, no explanations, no ```
+- Just the raw code ready to write to file"""
+    
+    def _cache_key(self, prompt, max_tokens):
+        return self.cache.make_key(self.model, prompt, max_tokens=max_tokens)
+    
+    def _complete_text(self, prompt, max_tokens, validate=None, stage=None):
+        """
+        Get the raw text of a completion, from the cache if possible
+        
+        validate: function(text) that raises if the text is unusable -
+        only responses that pass are cached
+        stage: what the call is for ("plan", "codegen", "edits"), for telemetry
+        """
+        key = self._cache_key(prompt, max_tokens) if self.cache else None
         
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("Using cached Claude response")
+                return cached
+        
+        started = time.monotonic()
         try:
-            response = self.client.messages.create(
+            response = self.resilience.call(lambda: self.client.messages.create(
                 model=self.model,
-                max_tokens=4000,
+                max_tokens=max_tokens,
                 messages=[{"role": "user", "content": prompt}]
-            )
-            
-            plan_text = response.content[0].text.strip()
+            ))
+        except Exception:
+            self.telemetry.observe(self.model, stage, latency=time.monotonic() - started, ok=False)
+            raise
+        self.telemetry.observe(self.model, stage, getattr(response, "usage", None), time.monotonic() - started)
+        text = response.content[0].text
+        
+        if key:
+            if validate:
+                validate(text)
+            self.cache.put(key, text)
+        
+        return text
+    
+    def _edit_prompt(self, task, file_path, current_content):
+        """Build the prompt asking for targeted edits instead of a whole file"""
+        return f"""You are a coding agent. Edit this file to complete the task.
+
+Task: {task}
+
+File: {file_path}
+
+Current content:
+```
+{current_content}
+```
+
+Describe your changes as one or more SEARCH/REPLACE blocks:
+
+<<<<<<< SEARCH
+exact lines copied from the current file
+=======
+the lines that replace them
+>>>>>>> REPLACE
+
+- Copy SEARCH lines exactly, including indentation
+- Include just enough lines to make each SEARCH unique in the file
+- Use several small blocks rather than one big one
+- Output only the blocks, no explanations"""
+    
+    def _stream_text(self, prompt, max_tokens, validate=None, stage=None):
+        """Yield the raw text of a completion as it streams in (or from the cache)"""
+        key = self._cache_key(prompt, max_tokens) if self.cache else None
+        
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("Using cached Claude response")
+                yield cached
+                return
+        
+        parts = []
+        attempt = 0
+        started = time.monotonic()
+        first_token = None
+        while True:
+            attempt += 1
+            self.resilience.before_request()
+            try:
+                with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
+                    for text in stream.text_stream:
+                        if first_token is None:
+                            first_token = time.monotonic() - started
+                        parts.append(text)
+                        yield text
+                    usage = self._final_usage(stream)
+                break
+            except Exception as e:
+                try:
+                    # Once chunks have gone out a retry would repeat them, so count it as the last attempt
+                    last = self.resilience.policy.max_attempts if parts else attempt
+                    delay = self.resilience.retry_delay(e, last)
+                except Exception:
+                    self.telemetry.observe(self.model, stage, latency=time.monotonic() - started, ok=False)
+                    raise
+                time.sleep(delay)
+        self.resilience.record_success()
+        self.telemetry.observe(self.model, stage, usage, time.monotonic() - started, first_token=first_token)
+        
+        # Only complete streams make it into the cache
+        if key:
+            text = ''.join(parts)
+            if validate:
+                validate(text)
+            self.cache.put(key, text)
+    
+    def _final_usage(self, stream):
+        """Token usage of a finished stream, if the stream can tell us"""
+        try:
+            return stream.get_final_message().usage
+        except Exception as e:
+            logger.debug(f"No usage for streamed reply: {e}")
+            return None
+    
+    def analyze_task(self, task_description, context=""):
+        """
+        Ask Claude to analyze a task and create a plan
+        
+        Returns: dict with plan, files to modify, etc.
+        """
+        logger.info(f"Analyzing task: {task_description}")
+        
+        prompt = self._plan_prompt(task_description, context)
+        
+        try:
+            response_text = self._complete_text(prompt, 4000, validate=parse_plan, stage="plan")
             
             # Remove markdown code blocks if present
-            if plan_text.startswith('```'):
-                lines = plan_text.split('\n')
-                plan_text = '\n'.join(lines[1:-1])
+            plan_text = strip_code_fences(response_text)
             
             plan = json.loads(plan_text)
             logger.info(f"Plan created: {plan.get('summary', 'No summary')}")
@@ -58,6 +314,44 @@ Respond ONLY with valid JSON, no markdown, no explanation."""
             logger.error(f"Error analyzing task: {e}")
             return None
     
+    def stream_plan(self, task_description, context=""):
+        """
+        Streaming variant of analyze_task
+        
+        Yields: raw plan text chunks as they arrive
+        """
+        logger.info(f"Analyzing task (streaming): {task_description}")
+        
+        yield from self._stream_text(
+            self._plan_prompt(task_description, context),
+            4000,
+            validate=parse_plan,
+            stage="plan"
+        )
+    
+    def analyze_task_streaming(self, task_description, context="", on_files=None):
+        """
+        Stream a plan, calling on_files(files) as soon as files_to_modify
+        is known so callers can start work before the plan is finished
+        
+        Returns: dict with plan, files to modify, etc.
+        """
+        parser = PlanStreamParser()
+        
+        try:
+            for chunk in self.stream_plan(task_description, context):
+                files = parser.feed(chunk)
+                if files is not None and on_files:
+                    on_files(files)
+            
+            plan = parser.finish()
+            logger.info(f"Plan created: {plan.get('summary', 'No summary')}")
+            return plan
+            
+        except Exception as e:
+            logger.error(f"Error analyzing task: {e}")
+            return None
+    
     def generate_code(self, task, file_path, current_content=""):
         """
         Ask Claude to write/modify code
@@ -66,35 +360,13 @@ Respond ONLY with valid JSON, no markdown, no explanation."""
         """
         logger.info(f"Generating code for: {file_path}")
         
-        prompt = f"""You are a coding agent. Modify this file to complete the task.
-
-Task: {task}
-
-File: {file_path}
-
-Current content:
-```
-{current_content if current_content else "# Empty file"}
-```
-
-Provide the COMPLETE new file content. 
-- Only output the code
-- No markdown, no explanations, no ```
-- Just the raw code ready to write to file"""
+        prompt = self._code_prompt(task, file_path, current_content)
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=8000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            code = response.content[0].text.strip()
+            response_text = self._complete_text(prompt, 8000, stage="codegen")
             
             # Remove markdown if Claude added it anyway
-            if code.startswith('```'):
-                lines = code.split('\n')
-                code = '\n'.join(lines[1:-1])
+            code = strip_code_fences(response_text)
             
             logger.info(f"Code generated successfully")
             return code
@@ -102,5 +374,49 @@ Provide the COMPLETE new file content.
         except Exception as e:
             logger.error(f"Error generating code: {e}")
             return None
-
+    
+    def stream_code(self, task, file_path, current_content=""):
+        """
+        Streaming variant of generate_code
+        
+        Yields: chunks of the new file content, with any markdown fence
+        already stripped. Errors are raised to the consumer.
+        """
+        logger.info(f"Generating code (streaming) for: {file_path}")
+        
+        cleaner = CodeStreamCleaner()
+        
+        for chunk in self._stream_text(self._code_prompt(task, file_path, current_content), 8000, stage="codegen"):
+            ready = cleaner.feed(chunk)
+            if ready:
+                yield ready
+        
+        tail = cleaner.finish()
+        if tail:
+            yield tail
+        
+        logger.info("Code generated successfully")
+    
+    def generate_edits(self, task, file_path, current_content):
+        """
+        Ask Claude for targeted edits to an existing file
+        
+        Output tokens scale with the size of the change, not the file.
+        
+        Returns: list of patch_engine.Hunk, or None on failure
+        """
+        logger.info(f"Generating edits for: {file_path}")
+        
+        prompt = self._edit_prompt(task, file_path, current_content)
+        
+        try:
+            response_text = self._complete_text(prompt, 4000, validate=parse_edits, stage="edits")
+            
+            hunks = parse_edits(response_text)
+            logger.info(f"Generated {len(hunks)} edit(s) for {file_path}")
+            return hunks
+            
+        except Exception as e:
+            logger.error(f"Error generating edits: {e}")
+            return None
 
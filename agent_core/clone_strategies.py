@@ -0,0 +1,186 @@
+"""
+How GitHubHandler fetches repositories: shallow, partial, sparse and mirrored clones
+"""
+import git
+import logging
+import threading
+from pathlib import PurePosixPath, Path
+
+logger = logging.getLogger(__name__)
+
+# Mirrors and shared clones are used by every handler in the process,
+# so their locks are global
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def path_lock(path):
+    """Process-wide lock for a repository path"""
+    with _path_locks_guard:
+        return _path_locks.setdefault(str(Path(path).resolve()), threading.RLock())
+
+
+def is_sparse(repo):
+    """True if the clone has a sparse checkout enabled"""
+    try:
+        return repo.git.config('--bool', '--get', 'core.sparseCheckout') == 'true'
+    except git.GitCommandError:
+        return False
+
+
+def is_checked_out(repo):
+    """False for a clone made with checkout=False that nothing has checked out yet"""
+    return (Path(repo.git_dir) / 'index').exists()
+
+
+def sparse_dirs(files):
+    """
+    Directories to check out for a set of files (cone mode)
+    
+    Root-level files are always included in cone mode, so they need no entry.
+    """
+    dirs = set()
+    for file in files or []:
+        parent = PurePosixPath(file.lstrip('/')).parent
+        if str(parent) not in ('', '.'):
+            dirs.add(str(parent))
+    return sorted(dirs)
+
+
+class CloneStrategy:
+    """
+    Options for cloning and updating a repository
+    
+    depth: only fetch this many commits of history (None = full history)
+    blobless: partial clone - fetch file contents lazily (--filter=blob:none)
+    sparse: only check out the directories the plan touches
+    mirror_dir: keep a bare mirror per repo here and borrow objects from it
+    """
+    
+    def __init__(self, depth=None, blobless=False, sparse=False, mirror_dir=None):
+        self.depth = depth
+        self.blobless = blobless
+        self.sparse = sparse
+        self.mirror_dir = Path(mirror_dir) if mirror_dir else None
+    
+    @classmethod
+    def from_config(cls, config):
+        """Build a strategy from the agent's clone_* config keys"""
+        return cls(
+            depth=config.get('clone_depth'),
+            blobless=config.get('clone_blobless', False),
+            sparse=config.get('clone_sparse', False),
+            mirror_dir=config.get('clone_mirror_dir')
+        )
+    
+    def describe(self):
+        parts = []
+        if self.depth:
+            parts.append(f"depth={self.depth}")
+        if self.blobless:
+            parts.append("blobless")
+        if self.sparse:
+            parts.append("sparse")
+        if self.mirror_dir:
+            parts.append("mirror")
+        return ", ".join(parts) or "full"
+    
+    def clone(self, url, repo_path, branch, sparse_paths=None, checkout=True):
+        """
+        Clone url into repo_path using this strategy
+        
+        checkout=False only fetches history and trees - enough for
+        `git ls-tree` - and leaves the checkout to the next pull(), which
+        can then be sparse over the paths a plan names.
+        """
+        kwargs = {'branch': branch}
+        
+        if self.depth:
+            kwargs['depth'] = self.depth
+        if self.blobless:
+            kwargs['filter'] = 'blob:none'
+        
+        mirror = self._usable_mirror(url, Path(repo_path).name)
+        if mirror:
+            kwargs['reference_if_able'] = str(mirror)
+        
+        use_sparse = self.sparse and sparse_paths is not None
+        if use_sparse or not checkout:
+            kwargs['no_checkout'] = True
+        
+        logger.info(f"Clone strategy: {self.describe()}")
+        repo = git.Repo.clone_from(url, repo_path, **kwargs)
+        
+        if checkout and use_sparse:
+            self.checkout(repo, branch, sparse_paths)
+        
+        return repo
+    
+    def checkout(self, repo, branch, sparse_paths=None):
+        """Check out a clone made without one, sparse over sparse_paths if the strategy is sparse"""
+        if self.sparse and sparse_paths is not None:
+            self.set_sparse(repo, sparse_paths)
+        repo.git.checkout(branch)
+    
+    def pull(self, repo, url, branch, sparse_paths=None):
+        """Bring an existing clone up to date"""
+        self._usable_mirror(url, Path(repo.working_dir).name)
+        
+        if not is_checked_out(repo):
+            # Cloned with checkout=False: this is the first checkout, so it
+            # can still be narrowed to the planned paths
+            self.checkout(repo, branch, sparse_paths)
+        elif self.sparse and sparse_paths is not None:
+            self.set_sparse(repo, sparse_paths, add=True)
+        
+        origin = repo.remotes.origin
+        if self.depth:
+            # A shallow fetch cuts the new tip off from local history, so a
+            # pull can't fast-forward - move the branch to the fetched tip
+            origin.fetch(branch, depth=self.depth)
+            repo.git.reset('--keep', f'origin/{branch}')
+        else:
+            origin.pull(branch)
+    
+    def set_sparse(self, repo, sparse_paths, add=False):
+        """Limit the checkout to the directories containing sparse_paths"""
+        dirs = sparse_dirs(sparse_paths)
+        
+        if add:
+            # Only widen an existing sparse checkout
+            if is_sparse(repo) and dirs:
+                repo.git.sparse_checkout('add', *dirs)
+            return
+        
+        repo.git.sparse_checkout('set', '--cone', *dirs)
+        logger.info(f"Sparse checkout: {', '.join(dirs) or '(root files only)'}")
+    
+    def _usable_mirror(self, url, repo_name):
+        """update_mirror, but a broken or unreachable mirror only costs the speedup"""
+        try:
+            return self.update_mirror(url, repo_name)
+        except Exception as e:
+            logger.warning(f"Mirror unavailable, cloning without it: {e}")
+            return None
+    
+    def update_mirror(self, url, repo_name):
+        """
+        Create or refresh the shared bare mirror for a repo
+        
+        Returns: path to the mirror, or None if mirrors are off
+        """
+        if not self.mirror_dir:
+            return None
+        
+        mirror = self.mirror_dir / f"{repo_name}.git"
+        
+        with path_lock(mirror):
+            if mirror.exists():
+                logger.info(f"Refreshing mirror: {mirror.name}")
+                git.Repo(mirror).git.remote('update', '--prune')
+            else:
+                logger.info(f"Creating mirror: {mirror.name}")
+                self.mirror_dir.mkdir(parents=True, exist_ok=True)
+                git.Repo.clone_from(url, mirror, mirror=True)
+        
+        return mirror
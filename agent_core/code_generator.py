@@ -0,0 +1,136 @@
+"""
+Concurrent per-file code generation for a task plan
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .patch_engine import apply_edits, PatchError
+
+logger = logging.getLogger(__name__)
+
+# Rough prompt overhead on top of the file content, in tokens
+PROMPT_OVERHEAD_TOKENS = 300
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text or "") // 4
+
+
+class ParallelCodeGenerator:
+    """
+    Fans out one generate_code call per file under a concurrency limit
+    
+    token_bucket: optional TokenBucket; each call reserves an estimate of
+    its input + output tokens before it is sent, so a big plan can't blow
+    through the org's tokens-per-minute budget.
+    stream: stream each file straight to disk instead of buffering it
+    edit_mode: "diff" asks for targeted edits to existing files and falls
+    back to full regeneration if they don't apply; "full" always
+    regenerates the whole file
+    """
+    
+    def __init__(self, claude, max_concurrency=4, token_bucket=None, stream=False, edit_mode="full"):
+        self.claude = claude
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.token_bucket = token_bucket
+        self.stream = stream
+        self.edit_mode = edit_mode
+    
+    def run(self, task, repo_path, files, github, on_progress=None):
+        """
+        Generate and write new content for every file
+        
+        Each file is written as soon as its result is ready. on_progress is
+        called as on_progress(done, total, file, written) after every file,
+        in completion order, with a count that only ever goes up.
+        
+        Returns: dict of file -> True if written
+        """
+        total = len(files)
+        results = {}
+        done = 0
+        
+        if not files:
+            return results
+        
+        workers = min(self.max_concurrency, total)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="codegen") as pool:
+            # Each file runs in a copy of the caller's context, so its Claude
+            # calls keep the caller's telemetry labels
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._process_file, task, repo_path, file, github): file
+                for file in files
+            }
+            
+            for future in as_completed(futures):
+                file = futures[future]
+                
+                try:
+                    results[file] = future.result()
+                except Exception as e:
+                    logger.error(f"Code generation crashed for {file}: {e}")
+                    results[file] = False
+                
+                done += 1
+                if on_progress:
+                    on_progress(done, total, file, results[file])
+        
+        return results
+    
+    def _process_file(self, task, repo_path, file, github):
+        """
+        Read one file, ask Claude for its new content and write it
+        
+        Returns: True if the file was written
+        """
+        logger.info(f"Modifying: {file}")
+        
+        current_content = github.read_file(repo_path, file) or ""
+        
+        if self.edit_mode == "diff" and current_content.strip():
+            self._reserve(current_content)
+            new_code = self._apply_model_edits(task, file, current_content)
+            if new_code is not None:
+                return github.write_file(repo_path, file, new_code)
+            logger.info(f"Falling back to full regeneration for {file}")
+        
+        # Full regeneration reserves its own budget, also when it follows failed edits
+        self._reserve(current_content)
+        
+        if self.stream:
+            chunks = self.claude.stream_code(task, file, current_content)
+            return github.write_file_stream(repo_path, file, chunks)
+        
+        new_code = self.claude.generate_code(task, file, current_content)
+        
+        if not new_code:
+            logger.warning(f"No code generated for {file}")
+            return False
+        
+        return github.write_file(repo_path, file, new_code)
+    
+    def _reserve(self, current_content):
+        """Wait for the token bucket to cover one call about current_content"""
+        if self.token_bucket:
+            # Input plus a similar-sized output
+            estimate = 2 * estimate_tokens(current_content) + PROMPT_OVERHEAD_TOKENS
+            self.token_bucket.acquire(estimate)
+    
+    def _apply_model_edits(self, task, file, current_content):
+        """
+        Ask for edits and apply them to the current content
+        
+        Returns: the patched content, or None if the edits didn't apply
+        """
+        hunks = self.claude.generate_edits(task, file, current_content)
+        
+        if not hunks:
+            return None
+        
+        try:
+            return apply_edits(current_content, hunks)
+        except PatchError as e:
+            logger.warning(f"Edits for {file} didn't apply: {e}")
+            return None
@@ -2,21 +2,56 @@
 Helper module to report agent status to the API server
 """
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional
+from collections import deque
 import logging
+import threading
+import time
 from .personality import personality
 
 class DashboardReporter:
-    """Reports agent activity to the dashboard API"""
+    """
+    Reports agent activity to the dashboard API
     
-    def __init__(self, api_url: str = "http://localhost:8000"):
+    Calls never block on the network: events go into an in-memory ring
+    buffer and a background thread ships them in batches to /api/ingest
+    over one keep-alive session. Status and stats updates are coalesced
+    so only the latest value is sent. If the buffer fills up the oldest
+    events are dropped and counted.
+    """
+    
+    def __init__(self, api_url: str = "http://localhost:8000", batch_size: int = 50,
+                 flush_interval: float = 0.5, max_buffer: int = 1000):
         self.api_url = api_url
         self.logger = logging.getLogger("DashboardReporter")
         self.enabled = True
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        # One pooled keep-alive connection for everything we send
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        
+        self._events = deque(maxlen=max_buffer)
+        self._status = None
+        self._stats = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._flush_lock = threading.Lock()
+        
+        # Counters
+        self.sent = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.coalesced = 0
         
         # Test connection
         try:
-            response = requests.get(f"{api_url}/", timeout=2)
+            response = self.session.get(f"{api_url}/", timeout=2)
             if response.status_code == 200:
                 self.logger.info("✅ Connected to dashboard API")
             else:
@@ -25,59 +60,59 @@ class DashboardReporter:
         except Exception as e:
             self.logger.warning(f"Dashboard API not available: {e}")
             self.enabled = False
+        
+        if self.enabled:
+            self._thread = threading.Thread(target=self._run, name="dashboard-reporter", daemon=True)
+            self._thread.start()
+    
+    def _enqueue(self, event: dict):
+        """Buffer an event, dropping the oldest one if the buffer is full"""
+        event["ts"] = time.time()
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            if len(self._events) >= self.batch_size:
+                self._cond.notify()
     
     def update_status(self, status: str, current_task: Optional[str] = None, progress: int = 0):
         """Update agent status"""
         if not self.enabled:
             return
         
-        try:
-            requests.post(
-                f"{self.api_url}/api/update",
-                json={
-                    "status": status,
-                    "current_task": current_task,
-                    "progress": progress,
-                },
-                timeout=1
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to update status: {e}")
+        with self._cond:
+            if self._status is not None:
+                self.coalesced += 1
+            self._status = {
+                "type": "status",
+                "status": status,
+                "current_task": current_task,
+                "progress": progress,
+                "ts": time.time(),
+            }
     
     def add_task(self, task_id: str, title: str, status: str = "pending"):
         """Add a new task"""
         if not self.enabled:
             return
         
-        try:
-            requests.post(
-                f"{self.api_url}/api/task/add",
-                json={
-                    "id": task_id,
-                    "title": title,
-                    "status": status,
-                },
-                timeout=1
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to add task: {e}")
+        self._enqueue({
+            "type": "task_add",
+            "id": task_id,
+            "title": title,
+            "status": status,
+        })
     
     def update_task(self, task_id: str, status: str):
         """Update task status"""
         if not self.enabled:
             return
         
-        try:
-            requests.post(
-                f"{self.api_url}/api/task/update",
-                json={
-                    "id": task_id,
-                    "status": status,
-                },
-                timeout=1
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to update task: {e}")
+        self._enqueue({
+            "type": "task_update",
+            "id": task_id,
+            "status": status,
+        })
     
     def add_log(self, level: str, message: str, add_personality: bool = False):
         """Add a log entry"""
@@ -89,29 +124,138 @@ class DashboardReporter:
             # Add a random reaction
             message = f"{message} {personality.get_thought()}"
         
-        try:
-            requests.post(
-                f"{self.api_url}/api/log",
-                json={
-                    "level": level,
-                    "message": message,
-                },
-                timeout=1
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to add log: {e}")
+        self._enqueue({
+            "type": "log",
+            "level": level,
+            "message": message,
+        })
+    
+    def record_usage(self, record: dict):
+        """Forward one Claude call's tokens, cost and latency"""
+        if not self.enabled:
+            return
+        
+        self._enqueue(dict(record, type="usage"))
     
     def update_stats(self, stats: dict):
         """Update statistics"""
         if not self.enabled:
             return
         
-        try:
-            requests.post(
-                f"{self.api_url}/api/update",
-                json={"stats": stats},
-                timeout=1
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to update stats: {e}")
-
+        with self._cond:
+            if self._stats is not None:
+                self.coalesced += 1
+            self._stats = {"type": "stats", "stats": stats, "ts": time.time()}
+    
+    def _take_batch(self):
+        """Pop the next batch, with coalesced status/stats at the end (lock held)"""
+        batch = []
+        while self._events and len(batch) < self.batch_size:
+            batch.append(self._events.popleft())
+        
+        # Latest status goes last so it wins over anything earlier in the batch
+        for pending in (self._stats, self._status):
+            if pending is not None:
+                batch.append(pending)
+        self._stats = None
+        self._status = None
+        return batch
+    
+    def _requeue(self, batch):
+        """Put a failed batch back at the front, unless newer values replaced it (lock held)"""
+        for event in reversed(batch):
+            if event["type"] == "status":
+                if self._status is None:
+                    self._status = event
+            elif event["type"] == "stats":
+                if self._stats is None:
+                    self._stats = event
+            elif len(self._events) < self._events.maxlen:
+                self._events.appendleft(event)
+            else:
+                self.dropped += 1
+    
+    def flush(self) -> bool:
+        """
+        Send everything buffered right now
+        
+        Returns: True if the buffer was fully delivered
+        """
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self) -> bool:
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return True
+            
+            try:
+                response = self.session.post(
+                    f"{self.api_url}/api/ingest",
+                    json={"events": batch},
+                    timeout=2
+                )
+                if 400 <= response.status_code < 500:
+                    # The server will never accept this batch - don't retry it
+                    self.logger.warning(f"Dashboard rejected {len(batch)} events: HTTP {response.status_code}")
+                    with self._cond:
+                        self.dropped += len(batch)
+                    continue
+                response.raise_for_status()
+            except Exception as e:
+                self.logger.debug(f"Failed to send {len(batch)} events: {e}")
+                with self._cond:
+                    self.failed_batches += 1
+                    self._requeue(batch)
+                return False
+            
+            with self._cond:
+                self.batches += 1
+                self.sent += len(batch)
+    
+    def _run(self):
+        """Background loop: flush every flush_interval, or sooner when a batch is full"""
+        backoff = self.flush_interval
+        while True:
+            with self._cond:
+                if not self._closed and len(self._events) < self.batch_size:
+                    self._cond.wait(backoff)
+                closed = self._closed
+            
+            if self.flush():
+                backoff = self.flush_interval
+            else:
+                # Dashboard is down - back off instead of hammering it
+                backoff = min(backoff * 2, 30)
+            
+            if closed:
+                return
+    
+    def get_stats(self) -> dict:
+        """Buffer depth and delivery counters"""
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "queued": len(self._events),
+                "capacity": self._events.maxlen,
+                "pending_status": self._status is not None,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+            }
+    
+    def close(self, timeout: float = 5):
+        """Flush what's left and stop the background thread"""
+        if not self._thread:
+            return
+        
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._thread = None
+        self.session.close()
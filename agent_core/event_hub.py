@@ -0,0 +1,86 @@
+"""
+Fan-out of API server state changes to streaming dashboard clients
+"""
+import asyncio
+import threading
+from .log_store import LogStore
+
+
+class EventHub:
+    """
+    Sequenced history of state deltas plus wake-ups for subscribers
+    
+    Every change is appended once to a ring of recent deltas. Subscribers
+    only hold a cursor and an asyncio.Event that is set when something new
+    arrives, so there is no per-viewer copying or polling - each viewer
+    reads the shared ring from its own cursor. A viewer that falls behind
+    the ring (or reconnects too late) is told it missed events and should
+    start over from a snapshot.
+    """
+    
+    def __init__(self, capacity=1000):
+        self._events = LogStore(capacity)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def last_seq(self):
+        return self._events.last_seq
+    
+    def restore(self, last_seq):
+        """
+        Carry on numbering after a restart
+        
+        The old deltas themselves are gone, so viewers resuming from before
+        the restart are sent a snapshot instead.
+        """
+        self._events.restore([], last_seq)
+    
+    def publish(self, event_type, data):
+        """Record a delta and wake every subscriber"""
+        event = self._events.append({"type": event_type, "data": data})
+        
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        
+        current = _running_loop()
+        for waiter, loop in subscribers:
+            if loop is current:
+                waiter.set()
+            else:
+                try:
+                    loop.call_soon_threadsafe(waiter.set)
+                except RuntimeError:
+                    # The viewer's loop has already shut down
+                    pass
+        return event
+    
+    def since(self, seq, limit=None):
+        """Deltas after seq - see LogStore.since"""
+        return self._events.since(seq, limit)
+    
+    def subscribe(self):
+        """
+        Register the calling coroutine's event loop for wake-ups
+        
+        Returns: an asyncio.Event that is set whenever a delta is published
+        """
+        waiter = asyncio.Event()
+        with self._lock:
+            self._subscribers[waiter] = asyncio.get_running_loop()
+        return waiter
+    
+    def unsubscribe(self, waiter):
+        with self._lock:
+            self._subscribers.pop(waiter, None)
+    
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
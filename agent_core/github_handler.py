@@ -1,47 +1,87 @@
 import git
 import os
 import logging
+import shutil
+import tempfile
 from pathlib import Path
+from .clone_strategies import CloneStrategy, is_sparse, path_lock
+from .worktrees import WorktreeManager
 
 logger = logging.getLogger(__name__)
 
+# Concurrent tasks on one branch can race each other to push
+PUSH_ATTEMPTS = 3
+
 class GitHubHandler:
     """Handles Git/GitHub operations"""
     
-    def __init__(self, github_token, github_username, workspace_path):
+    def __init__(self, github_token, github_username, workspace_path, clone_strategy=None):
         self.token = github_token
         self.username = github_username
         self.workspace = Path(workspace_path)
         self.workspace.mkdir(parents=True, exist_ok=True)
+        self.clone_strategy = clone_strategy or CloneStrategy()
+        self.worktrees = WorktreeManager(self.workspace / ".worktrees")
     
-    def clone_or_pull(self, repo_url, branch="main"):
-        """
-        Clone a repo or pull latest if it exists
-        
-        Returns: path to repo
-        """
+    def _repo_path(self, repo_url):
         # Extract repo name from URL
         repo_name = repo_url.rstrip('/').split('/')[-1].replace('.git', '')
-        repo_path = self.workspace / repo_name
-        
+        return self.workspace / repo_name
+    
+    def _auth_url(self, repo_url):
         # Add authentication to URL
         if 'https://' in repo_url:
-            auth_url = repo_url.replace(
+            return repo_url.replace(
                 'https://', 
                 f'https://{self.username}:{self.token}@'
             )
-        else:
-            auth_url = repo_url
+        return repo_url
+    
+    def fetch_tree(self, repo_url, branch="main"):
+        """
+        Make sure a clone exists, without checking anything out if it's new
+        
+        Enough to list the repo's files (git ls-tree) before planning; the
+        checkout happens in the next clone_or_pull, over the planned paths.
+        
+        Returns: path to repo
+        """
+        repo_path = self._repo_path(repo_url)
         
         try:
-            if repo_path.exists():
-                logger.info(f"Pulling latest changes: {repo_name}")
-                repo = git.Repo(repo_path)
-                origin = repo.remotes.origin
-                origin.pull(branch)
-            else:
-                logger.info(f"Cloning repository: {repo_name}")
-                repo = git.Repo.clone_from(auth_url, repo_path, branch=branch)
+            with path_lock(repo_path):
+                if not repo_path.exists():
+                    logger.info(f"Fetching repository tree: {repo_path.name}")
+                    self.clone_strategy.clone(self._auth_url(repo_url), repo_path, branch, checkout=False)
+            return str(repo_path)
+            
+        except Exception as e:
+            logger.error(f"Git operation failed: {e}")
+            return None
+    
+    def clone_or_pull(self, repo_url, branch="main", sparse_paths=None):
+        """
+        Clone a repo or pull latest if it exists
+        
+        sparse_paths: files the task will touch - used to limit the
+        checkout when the clone strategy is sparse
+        
+        Returns: path to repo
+        """
+        repo_path = self._repo_path(repo_url)
+        repo_name = repo_path.name
+        auth_url = self._auth_url(repo_url)
+        
+        try:
+            # Tasks sharing this clone (via worktrees) must not fetch at once
+            with path_lock(repo_path):
+                if repo_path.exists():
+                    logger.info(f"Pulling latest changes: {repo_name}")
+                    repo = git.Repo(repo_path)
+                    self.clone_strategy.pull(repo, auth_url, branch, sparse_paths)
+                else:
+                    logger.info(f"Cloning repository: {repo_name}")
+                    self.clone_strategy.clone(auth_url, repo_path, branch, sparse_paths)
             
             logger.info(f"Repository ready: {repo_path}")
             return str(repo_path)
@@ -64,16 +104,28 @@ class GitHubHandler:
                 logger.info("No changes to commit")
                 return True
             
-            # Add all changes
-            repo.git.add(A=True)
+            # Add all changes (including new files outside a sparse checkout)
+            if is_sparse(repo):
+                repo.git.add(A=True, sparse=True)
+            else:
+                repo.git.add(A=True)
             
             # Commit
             repo.index.commit(commit_message)
             logger.info(f"Committed: {commit_message}")
             
-            # Push
-            origin = repo.remote(name='origin')
-            origin.push(branch)
+            # Push HEAD so task worktrees (on their own local branch) land on `branch`
+            refspec = f"HEAD:refs/heads/{branch}"
+            for attempt in range(PUSH_ATTEMPTS):
+                try:
+                    repo.git.push('origin', refspec)
+                    break
+                except git.GitCommandError:
+                    if attempt == PUSH_ATTEMPTS - 1:
+                        raise
+                    # Another task pushed to this branch first - replay on top and retry
+                    logger.info(f"Push rejected, rebasing onto origin/{branch}")
+                    repo.git.pull('--rebase', 'origin', branch)
             logger.info(f"Pushed to {branch}")
             
             return True
@@ -110,5 +162,54 @@ class GitHubHandler:
         except Exception as e:
             logger.error(f"Error writing {file_path}: {e}")
             return False
-
-
+    
+    def write_file_stream(self, repo_path, file_path, chunks):
+        """
+        Write streamed content to a file in the repo
+        
+        Chunks go to a temp file next to the target, which is renamed into
+        place only once the stream is complete - a failed or empty stream
+        leaves the original file untouched.
+        
+        Returns: True if the file was written
+        """
+        full_path = Path(repo_path) / file_path
+        tmp_path = None
+        
+        try:
+            # Create parent directories if needed
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            fd, tmp_path = tempfile.mkstemp(
+                dir=full_path.parent,
+                prefix=f".{full_path.name}.",
+                suffix=".tmp"
+            )
+            
+            written = 0
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+            
+            if not written:
+                logger.warning(f"Nothing streamed for {file_path}, leaving it unchanged")
+                os.unlink(tmp_path)
+                return False
+            
+            # Keep the original permissions (e.g. executable scripts)
+            if full_path.exists():
+                shutil.copymode(full_path, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+            
+            os.replace(tmp_path, full_path)
+            
+            logger.info(f"Wrote to: {file_path}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error writing {file_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
@@ -0,0 +1,68 @@
+"""
+Fixed-capacity ring buffer for the API server's log lines
+"""
+import itertools
+from collections import deque
+
+
+class LogStore:
+    """
+    Keeps the last `capacity` log entries, each with a sequence number
+    
+    Sequence numbers only ever go up, so a client that remembers the last
+    one it saw can ask for just the newer entries. Appends are O(1) with
+    no copying - the deque drops the oldest entry by itself. The store
+    has no lock of its own; the API server uses it under state_lock.
+    """
+    
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        self._last_seq = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def last_seq(self):
+        """Sequence number of the newest entry (0 if nothing logged yet)"""
+        return self._last_seq
+    
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest entry still held"""
+        return self._last_seq - len(self._entries) + 1
+    
+    def append(self, entry):
+        """Add an entry (a dict) and return it with its sequence number"""
+        self._last_seq += 1
+        entry = dict(entry, seq=self._last_seq)
+        self._entries.append(entry)
+        return entry
+    
+    def restore(self, entries, last_seq):
+        """Reload entries (oldest first) and carry on numbering after last_seq"""
+        self._entries.clear()
+        self._entries.extend(entries)
+        self._last_seq = last_seq
+    
+    def tail(self, limit=50):
+        """The newest `limit` entries, oldest first"""
+        count = min(limit, len(self._entries))
+        return list(itertools.islice(reversed(self._entries), count))[::-1]
+    
+    def since(self, seq, limit=None):
+        """
+        Entries newer than `seq`, oldest first
+        
+        Returns: (entries, missed) - missed counts entries after `seq` that
+        already fell out of the buffer, so the client knows it has a gap
+        """
+        newer = max(0, self._last_seq - seq)
+        missed = max(0, newer - len(self._entries))
+        entries = self.tail(newer - missed)
+        
+        if limit is not None and len(entries) > limit:
+            # Hand them out oldest first so the client can keep paging
+            entries = entries[:limit]
+        return entries, missed
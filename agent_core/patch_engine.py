@@ -0,0 +1,238 @@
+"""
+Apply model-written edits (search/replace blocks or unified diffs) to a file
+"""
+import difflib
+import re
+
+SEARCH_MARKER = re.compile(r'^<{5,9} SEARCH\s*$')
+DIVIDER_MARKER = re.compile(r'^={5,9}\s*$')
+REPLACE_MARKER = re.compile(r'^>{5,9} REPLACE\s*$')
+HUNK_HEADER = re.compile(r'^@@ .* @@')
+
+# How similar a window must be to a search block to count as a fuzzy match
+FUZZY_THRESHOLD = 0.9
+
+
+class PatchError(Exception):
+    """Raised when edits can't be parsed or applied cleanly"""
+
+
+class Hunk:
+    """One edit: replace the `search` lines with the `replace` lines"""
+    
+    def __init__(self, search, replace):
+        self.search = search
+        self.replace = replace
+    
+    def __repr__(self):
+        return f"Hunk(-{len(self.search)} +{len(self.replace)})"
+
+
+def parse_edits(text):
+    """
+    Parse edits from a model response
+    
+    Accepts SEARCH/REPLACE blocks or a unified diff.
+    Returns: list of Hunk
+    """
+    lines = text.split('\n')
+    
+    if any(SEARCH_MARKER.match(line) for line in lines):
+        hunks = _parse_search_replace(lines)
+    elif any(HUNK_HEADER.match(line) for line in lines):
+        hunks = _parse_unified_diff(lines)
+    else:
+        raise PatchError("No SEARCH/REPLACE blocks or diff hunks found")
+    
+    if not hunks:
+        raise PatchError("Edit response contained no hunks")
+    
+    return hunks
+
+
+def _parse_search_replace(lines):
+    hunks = []
+    i = 0
+    
+    while i < len(lines):
+        if not SEARCH_MARKER.match(lines[i]):
+            i += 1
+            continue
+        
+        search, replace = [], []
+        i += 1
+        
+        while i < len(lines) and not DIVIDER_MARKER.match(lines[i]):
+            search.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PatchError("SEARCH block is missing its ======= divider")
+        i += 1
+        
+        while i < len(lines) and not REPLACE_MARKER.match(lines[i]):
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PatchError("SEARCH block is missing its >>>>>>> REPLACE marker")
+        i += 1
+        
+        hunks.append(Hunk(search, replace))
+    
+    return hunks
+
+
+def _parse_unified_diff(lines):
+    hunks = []
+    current = None
+    
+    for line in lines:
+        if HUNK_HEADER.match(line):
+            current = Hunk([], [])
+            hunks.append(current)
+            continue
+        
+        if current is None or line.startswith(('--- ', '+++ ')):
+            continue
+        
+        if line.startswith('-'):
+            current.search.append(line[1:])
+        elif line.startswith('+'):
+            current.replace.append(line[1:])
+        elif line.startswith(' ') or line == '':
+            current.search.append(line[1:])
+            current.replace.append(line[1:])
+        elif line.startswith('\\'):
+            # "\ No newline at end of file"
+            continue
+        else:
+            # Anything else ends the hunk (e.g. trailing prose)
+            current = None
+    
+    # Trailing blank context lines are usually just the end of the response
+    for hunk in hunks:
+        while hunk.search and hunk.replace and hunk.search[-1] == '' and hunk.replace[-1] == '':
+            hunk.search.pop()
+            hunk.replace.pop()
+    
+    return [hunk for hunk in hunks if hunk.search or hunk.replace]
+
+
+def _find_exact(lines, search):
+    size = len(search)
+    return [i for i in range(len(lines) - size + 1) if lines[i:i + size] == search]
+
+
+def _find_normalized(lines, search):
+    """Match ignoring leading/trailing whitespace on each line"""
+    target = [line.strip() for line in search]
+    stripped = [line.strip() for line in lines]
+    size = len(search)
+    return [i for i in range(len(lines) - size + 1) if stripped[i:i + size] == target]
+
+
+def _find_fuzzy(lines, search):
+    """Best window by similarity ratio, if it is clearly the best and close enough"""
+    size = len(search)
+    target = '\n'.join(line.strip() for line in search)
+    scores = []
+    
+    for i in range(len(lines) - size + 1):
+        window = '\n'.join(line.strip() for line in lines[i:i + size])
+        matcher = difflib.SequenceMatcher(None, target, window, autojunk=False)
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        scores.append((matcher.ratio(), i))
+    
+    scores = sorted(scores, reverse=True)
+    if not scores or scores[0][0] < FUZZY_THRESHOLD:
+        return []
+    if len(scores) > 1 and scores[1][0] == scores[0][0]:
+        return [scores[0][1], scores[1][1]]
+    return [scores[0][1]]
+
+
+def _reindent(replace, search, matched):
+    """Shift replacement lines by the indentation difference of a whitespace-tolerant match"""
+    def indent(line):
+        return line[:len(line) - len(line.lstrip())]
+    
+    first_search = next((line for line in search if line.strip()), None)
+    first_match = next((line for line in matched if line.strip()), None)
+    if first_search is None or first_match is None:
+        return replace
+    
+    have, want = indent(first_search), indent(first_match)
+    if have == want:
+        return replace
+    
+    shifted = []
+    for line in replace:
+        if line.startswith(have):
+            shifted.append(want + line[len(have):])
+        else:
+            shifted.append(line)
+    return shifted
+
+
+def _apply_hunk(lines, hunk):
+    """Apply one hunk to a list of lines, trying exact, then whitespace-tolerant, then fuzzy"""
+    search = hunk.search
+    
+    if not any(line.strip() for line in search):
+        # Pure insertion with no anchor - only valid for an empty file
+        if any(line.strip() for line in lines):
+            raise PatchError("Hunk has no search text to anchor it")
+        return list(hunk.replace)
+    
+    for finder in (_find_exact, _find_normalized, _find_fuzzy):
+        matches = finder(lines, search)
+        
+        if len(matches) > 1:
+            raise PatchError(f"Search text matches {len(matches)} places: {search[0].strip()!r}")
+        
+        if matches:
+            start = matches[0]
+            matched = lines[start:start + len(search)]
+            replace = hunk.replace if finder is _find_exact else _reindent(hunk.replace, search, matched)
+            return lines[:start] + list(replace) + lines[start + len(search):]
+    
+    raise PatchError(f"Search text not found: {search[0].strip()!r}")
+
+
+def verify_patch(original, patched, hunks):
+    """
+    Check a patched file against the original
+    
+    Every changed line must be accounted for by some hunk, so a bad fuzzy
+    match can't silently rewrite unrelated parts of the file.
+    """
+    if patched == original:
+        raise PatchError("Edits made no changes")
+    
+    budget = sum(len(hunk.search) + len(hunk.replace) for hunk in hunks)
+    matcher = difflib.SequenceMatcher(None, original.split('\n'), patched.split('\n'), autojunk=False)
+    changed = sum(
+        max(i2 - i1, j2 - j1)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    )
+    
+    if changed > budget:
+        raise PatchError(f"Patched file changed {changed} lines but edits only cover {budget}")
+
+
+def apply_edits(original, hunks):
+    """
+    Apply hunks in order and verify the result
+    
+    Returns: the new file content
+    Raises: PatchError if any hunk can't be placed unambiguously
+    """
+    lines = original.split('\n')
+    
+    for hunk in hunks:
+        lines = _apply_hunk(lines, hunk)
+    
+    patched = '\n'.join(lines)
+    verify_patch(original, patched, hunks)
+    return patched
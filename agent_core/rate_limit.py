@@ -0,0 +1,66 @@
+"""
+Token-bucket rate limiting shared between agent threads
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket
+    
+    capacity: most tokens that can be spent in a burst
+    refill_rate: tokens added back per second
+    """
+    
+    def __init__(self, capacity, refill_rate):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+    
+    @classmethod
+    def per_minute(cls, amount):
+        """Bucket that allows `amount` tokens per minute, all of it as a burst"""
+        return cls(amount, amount / 60.0)
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+    
+    def available(self):
+        """Tokens that could be spent right now"""
+        with self._cond:
+            self._refill()
+            return self._tokens
+    
+    def acquire(self, amount=1, timeout=None):
+        """
+        Block until `amount` tokens are available and take them
+        
+        Requests bigger than the bucket are clamped to its capacity so they
+        can still go through (after waiting for a full bucket).
+        
+        Returns: True if acquired, False if the timeout ran out first
+        """
+        amount = min(float(amount), self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with self._cond:
+            while True:
+                self._refill()
+                
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                
+                wait = (amount - self._tokens) / self.refill_rate if self.refill_rate > 0 else 1.0
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                
+                self._cond.wait(wait)
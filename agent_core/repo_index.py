@@ -0,0 +1,284 @@
+"""
+Per-repo index of files and symbols, so plans can name files that exist
+"""
+import git
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path, PurePosixPath
+
+logger = logging.getLogger(__name__)
+
+# Files bigger than this are listed but not parsed for symbols
+MAX_PARSE_BYTES = 256 * 1024
+
+# Most symbols kept per file
+MAX_SYMBOLS = 40
+
+# Definitions worth showing a planner, by file extension
+_PY = re.compile(r'^\s*(?:async\s+)?(?:def|class)\s+([A-Za-z_]\w*)', re.M)
+_JS = re.compile(
+    r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?'
+    r'(?:function\*?\s+([A-Za-z_$][\w$]*)|class\s+([A-Za-z_$][\w$]*)'
+    r'|(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>'
+    r'|(?:interface|type|enum)\s+([A-Za-z_$][\w$]*))',
+    re.M
+)
+_GO = re.compile(r'^(?:func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)|type\s+([A-Za-z_]\w*))', re.M)
+_RB = re.compile(r'^\s*(?:def\s+(?:self\.)?([A-Za-z_]\w*[?!]?)|class\s+([A-Z]\w*)|module\s+([A-Z]\w*))', re.M)
+_C_LIKE = re.compile(
+    r'^\s*(?:public|private|protected|internal|static|final|abstract|sealed|partial|\s)*'
+    r'(?:class|interface|enum|struct|record|trait|fn|impl)\s+([A-Za-z_]\w*)',
+    re.M
+)
+
+SYMBOL_PATTERNS = {
+    ".py": _PY,
+    ".js": _JS, ".jsx": _JS, ".ts": _JS, ".tsx": _JS, ".mjs": _JS, ".cjs": _JS,
+    ".go": _GO,
+    ".rb": _RB,
+    ".java": _C_LIKE, ".kt": _C_LIKE, ".cs": _C_LIKE, ".rs": _C_LIKE,
+    ".swift": _C_LIKE, ".scala": _C_LIKE, ".php": _C_LIKE,
+}
+
+# Task words that say nothing about where the change goes
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "add", "fix",
+    "make", "update", "change", "use", "new", "should", "when", "file", "files",
+    "code", "please", "all", "our", "not", "are", "can", "has", "have", "its",
+}
+
+_WORD = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+
+
+def words(text):
+    """Lowercase words of text, splitting camelCase, snake_case and paths"""
+    return [w.lower() for w in _WORD.findall(text) if len(w) >= 3 and w.lower() not in STOPWORDS]
+
+
+def extract_symbols(path, text):
+    """Top-level-ish definitions in a source file, in order of appearance"""
+    pattern = SYMBOL_PATTERNS.get(PurePosixPath(path).suffix.lower())
+    if not pattern:
+        return []
+    
+    symbols = []
+    seen = set()
+    for match in pattern.finditer(text):
+        name = next((group for group in match.groups() if group), None)
+        if name and name not in seen:
+            seen.add(name)
+            symbols.append(name)
+            if len(symbols) >= MAX_SYMBOLS:
+                break
+    return symbols
+
+
+def format_size(size):
+    if size is None:
+        return "?"
+    if size < 1024:
+        return f"{size}B"
+    return f"{size / 1024:.1f}KB"
+
+
+def checkout_stamp(repo):
+    """
+    Modification time and size of the clone's git index, or None without one
+    
+    Checking out, pulling or changing the sparse cone all rewrite the git
+    index, so an unchanged stamp means the same files are in the work tree.
+    """
+    try:
+        stat = os.stat(os.path.join(repo.git_dir, 'index'))
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class RepoIndex:
+    """
+    File tree, sizes and symbol table for one repository
+    
+    Entries are keyed by git blob hash, so after a pull only blobs that
+    changed are read and parsed again - an unchanged HEAD costs a single
+    rev-parse. Only files present in the work tree are parsed (sparse and
+    blobless clones list the rest by path alone, without fetching them);
+    those are looked for again only once the checkout itself changes.
+    The index is saved as JSON under cache_path between runs.
+    """
+    
+    def __init__(self, cache_path=None):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.head = None
+        self.checkout = None   # stamp of the git index when files were last looked for
+        self.files = {}   # path -> blob hash
+        self.blobs = {}   # blob hash -> {"size": int or None, "symbols": [...]}
+        self._lock = threading.Lock()
+        
+        if self.cache_path and self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.head = data["head"]
+                self.checkout = data.get("checkout")
+                self.files = data["files"]
+                self.blobs = data["blobs"]
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable repo index {self.cache_path}: {e}")
+    
+    @classmethod
+    def for_repo(cls, cache_dir, repo_url):
+        """
+        The index for a repo URL, cached under cache_dir
+        
+        The file is named after owner and repo for readability, plus a hash
+        of the whole URL so the same owner/repo on two hosts don't share it.
+        """
+        url = repo_url.rstrip('/').removesuffix('.git')
+        parts = url.replace(':', '/').split('/')
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        return cls(Path(cache_dir) / f"{'__'.join(parts[-2:])}-{digest}.json")
+    
+    def refresh(self, repo_path):
+        """
+        Bring the index up to date with the clone's HEAD
+        
+        Files that weren't checked out last time (no-checkout or sparse
+        clones) are looked for again when the checkout has changed since,
+        even if HEAD hasn't moved.
+        
+        Returns: number of blobs that had to be (re)parsed
+        """
+        with self._lock:
+            repo = git.Repo(repo_path)
+            head = repo.head.commit.hexsha
+            checkout = checkout_stamp(repo)
+            if head == self.head and (
+                checkout == self.checkout or all(blob["size"] is not None for blob in self.blobs.values())
+            ):
+                return 0
+            
+            files = {}
+            for entry in repo.git.ls_tree('-r', '-z', 'HEAD').split('\0'):
+                if not entry:
+                    continue
+                meta, path = entry.split('\t', 1)
+                mode, kind, blob = meta.split()
+                if kind == 'blob' and mode != '120000':
+                    files[path] = blob
+            
+            parsed = 0
+            blobs = {}
+            for path, blob in files.items():
+                known = self.blobs.get(blob)
+                if known is not None and known["size"] is not None:
+                    blobs[blob] = known
+                    continue
+                blobs[blob] = self._read(repo_path, path)
+                parsed += 1
+            
+            self.head = head
+            self.checkout = checkout
+            self.files = files
+            self.blobs = blobs
+            self._save()
+        
+        logger.info(f"Indexed {len(files)} files in {repo_path} ({parsed} new or changed)")
+        return parsed
+    
+    def _read(self, repo_path, path):
+        """Size and symbols of a checked-out file (size None if not in the work tree)"""
+        full_path = Path(repo_path) / path
+        try:
+            size = full_path.stat().st_size
+        except OSError:
+            return {"size": None, "symbols": []}
+        
+        symbols = []
+        if size <= MAX_PARSE_BYTES and PurePosixPath(path).suffix.lower() in SYMBOL_PATTERNS:
+            try:
+                symbols = extract_symbols(path, full_path.read_text(encoding='utf-8', errors='replace'))
+            except OSError:
+                pass
+        return {"size": size, "symbols": symbols}
+    
+    def _save(self):
+        """Atomically write the index to cache_path (lock held)"""
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"head": self.head, "checkout": self.checkout, "files": self.files, "blobs": self.blobs}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            logger.warning(f"Couldn't save repo index: {e}")
+    
+    def has_file(self, path):
+        return path in self.files
+    
+    def rank(self, task):
+        """Paths ordered by how well their path and symbols match the task's words"""
+        wanted = set(words(task))
+        scored = []
+        
+        for path, blob in self.files.items():
+            path_words = set(words(path))
+            symbols = self.blobs.get(blob, {}).get("symbols", [])
+            symbol_hits = sum(1 for symbol in symbols if wanted & set(words(symbol)))
+            
+            score = 3 * len(wanted & path_words) + min(symbol_hits, 5)
+            # Shallow files are a better guess than deep ones when nothing matches
+            scored.append((-score, path.count('/'), path))
+        
+        scored.sort()
+        return [(path, -score) for score, _, path in scored]
+    
+    def context_for(self, task, max_chars=6000):
+        """
+        Compact, ranked slice of the index to put in a planning prompt
+        
+        Lists the files most relevant to the task with their size and
+        symbols, then a directory overview, within max_chars.
+        """
+        if not self.files:
+            return ""
+        
+        with self._lock:
+            ranked = self.rank(task)
+            lines = [f"Repository has {len(self.files)} files. Most relevant to the task "
+                     "(path [size]: symbols) - only plan changes to files listed here, or new files:"]
+            used = len(lines[0])
+            shown = 0
+            
+            for path, score in ranked:
+                blob = self.blobs.get(self.files[path], {})
+                line = f"{path} [{format_size(blob.get('size'))}]"
+                if blob.get("symbols"):
+                    line += ": " + ", ".join(blob["symbols"][:12])
+                if used + len(line) + 1 > max_chars * 3 // 4:
+                    break
+                lines.append(line)
+                used += len(line) + 1
+                shown += 1
+            
+            # Where everything else lives
+            dirs = {}
+            for path, _ in ranked[shown:]:
+                top = path.split('/', 1)[0] + '/' if '/' in path else '.'
+                dirs[top] = dirs.get(top, 0) + 1
+            if dirs:
+                overview = "Other files by directory: " + ", ".join(
+                    f"{name} ({count})" for name, count in sorted(dirs.items(), key=lambda item: -item[1])
+                )
+                lines.append(overview[:max_chars - used - 1])
+        
+        return "\n".join(lines)
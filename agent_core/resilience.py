@@ -0,0 +1,250 @@
+"""
+Retries, rate limiting and a circuit breaker for calls to the Claude API
+"""
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import anthropic
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another try besides any 5xx (which includes 529 Overloaded)
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Claude while the circuit breaker is open"""
+
+
+def status_of(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error):
+    """True for errors that can go away by themselves (network trouble, 429, 5xx)"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = status_of(error)
+    return status is not None and (status in RETRYABLE_STATUSES or status >= 500)
+
+
+def is_outage(error):
+    """Errors that say the API itself is unwell - these count towards opening the circuit"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = status_of(error)
+    return status is not None and status >= 500
+
+
+def retry_after_seconds(error):
+    """
+    How long the server asked us to wait, from retry-after-ms / retry-after
+    
+    Returns: seconds, or None if the response didn't say
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+    except ValueError:
+        pass
+    
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter
+    
+    Attempt n waits a random time between 0 and base_delay * 2**(n-1),
+    capped at max_delay, so workers that failed together don't all come
+    back at the same moment. A retry-after from the server wins over the
+    backoff (plus up to 10% jitter), capped at max_retry_after.
+    """
+    
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=30.0, max_retry_after=60.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+    
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            retry_after = min(retry_after, self.max_retry_after)
+            return retry_after + random.uniform(0, retry_after * 0.1)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the API is down
+    
+    After failure_threshold outage errors in a row the circuit opens and
+    every call is refused with CircuitOpenError for reset_timeout seconds.
+    Then a single trial call is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"Claude API circuit open, retrying in {remaining:.0f}s")
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            
+            if self._trial_running:
+                raise CircuitOpenError("Claude API circuit half-open, trial call in progress")
+            self._trial_running = True
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Claude API circuit closed again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Claude API circuit opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """End a call that neither succeeded nor failed the API (e.g. a 400)"""
+        with self._lock:
+            self._trial_running = False
+
+
+class ResilientCaller:
+    """
+    Runs Claude API calls under a retry policy, circuit breaker and rate limit
+    
+    One instance is shared by every agent worker, so the limiter (a
+    TokenBucket counting requests) and the breaker see all traffic, and a
+    429 with retry-after pauses every worker, not just the one that got it.
+    """
+    
+    def __init__(self, policy=None, breaker=None, limiter=None):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+    
+    def before_request(self):
+        """Wait out any server-requested pause and the rate limit, then check the breaker"""
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        
+        if self.limiter:
+            self.limiter.acquire(1)
+        
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+        self.calls += 1
+    
+    def record_success(self):
+        self.breaker.record_success()
+    
+    def retry_delay(self, error, attempt):
+        """
+        Handle a failed attempt
+        
+        Returns: seconds to wait before the next attempt; re-raises the
+        error if it isn't worth retrying or attempts are used up
+        """
+        if is_outage(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        
+        if not is_retryable(error) or attempt >= self.policy.max_attempts or self.breaker.state == CircuitBreaker.OPEN:
+            self.failures += 1
+            raise error
+        
+        retry_after = retry_after_seconds(error)
+        delay = self.policy.delay(attempt, retry_after)
+        if status_of(error) == 429 and retry_after is not None:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        
+        self.retries += 1
+        logger.warning(f"Claude API call failed ({error.__class__.__name__}), retry {attempt} in {delay:.1f}s")
+        return delay
+    
+    def call(self, fn):
+        """Call fn() until it succeeds or the policy gives up"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.before_request()
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self.retry_delay(e, attempt))
+                continue
+            self.record_success()
+            return result
+    
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+        }
@@ -0,0 +1,157 @@
+"""
+On-disk, content-addressed cache for Claude responses
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Caches completion text keyed by a hash of model, prompt and parameters
+    
+    Entries expire after ttl seconds. When the cache grows past max_bytes
+    the least recently used entries (by file mtime, bumped on every hit)
+    are evicted. Set bypass to skip the cache without clearing it.
+    """
+    
+    def __init__(self, cache_dir, ttl=86400, max_bytes=200 * 1024 * 1024, bypass=False):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        
+        self._lock = threading.Lock()
+        self._total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob('*.json'))
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_key(model, prompt, **params):
+        """Stable hash of everything that affects the response"""
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "params": params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key):
+        """
+        Look up a cached response
+        
+        Returns: cached text, or None on a miss
+        """
+        if self.bypass:
+            return None
+        
+        path = self._path(key)
+        
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable cache entry {key[:12]}: {e}")
+                self._remove(path)
+                self.misses += 1
+                return None
+            
+            if self.ttl and time.time() - entry.get('created', 0) > self.ttl:
+                self._remove(path)
+                self.expired += 1
+                self.misses += 1
+                return None
+            
+            # Bump recency for LRU eviction
+            os.utime(path, None)
+            self.hits += 1
+            return entry['text']
+    
+    def put(self, key, text):
+        """Store a response, evicting old entries if over the size limit"""
+        if self.bypass:
+            return
+        
+        path = self._path(key)
+        data = json.dumps({"created": time.time(), "text": text}, ensure_ascii=False)
+        
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            
+            self._total_bytes += path.stat().st_size - old_size
+            
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            for path in self.cache_dir.glob('*.json'):
+                self._remove(path)
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(list(self.cache_dir.glob('*.json'))),
+                "bytes": self._total_bytes,
+                "bypass": self.bypass,
+            }
+    
+    def _remove(self, path):
+        """Delete one entry and keep the size total in step (lock held)"""
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            self._total_bytes -= size
+        except FileNotFoundError:
+            pass
+    
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes (lock held)"""
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        
+        entries.sort()
+        
+        # Evict down to 90% so we don't evict on every single put
+        target = self.max_bytes * 0.9
+        for _, path in entries:
+            if self._total_bytes <= target:
+                break
+            self._remove(path)
+            self.evictions += 1
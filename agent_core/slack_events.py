@@ -0,0 +1,241 @@
+"""
+Push-based Slack message sources and a durable ingestion cursor
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Message subtypes that never carry a new task
+IGNORED_SUBTYPES = {'message_changed', 'message_deleted', 'bot_message', 'channel_join'}
+
+
+def ts_key(ts):
+    """Slack timestamps are strings like '1712345678.000200' - compare them as numbers"""
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def ts_before(ts):
+    """The Slack timestamp one microsecond before ts, for an inclusive catch-up read"""
+    try:
+        return f"{Decimal(ts) - Decimal('0.000001'):f}"
+    except (TypeError, InvalidOperation):
+        return ts
+
+
+class EventCursor:
+    """
+    Remembers the newest Slack message we have handled, on disk
+    
+    Survives restarts so a catch-up read can resume exactly where we left
+    off, and keeps a short list of recently handled timestamps so the same
+    message arriving twice (e.g. as both `message` and `app_mention`, or via
+    catch-up and the live stream) only runs once.
+    
+    Mentions that became tasks are tracked as pending until finish() is
+    called for them. Tasks only live in the in-memory scheduler, so after a
+    restart the cursor resumes from the oldest pending mention and those
+    tasks run again. Pending changes are written straight away; plain
+    messages only move the cursor, so their saves are batched to one every
+    save_interval seconds (flush() writes the rest).
+    """
+    
+    def __init__(self, path=None, remember=500, save_interval=5.0):
+        self.path = Path(path) if path else None
+        self.save_interval = save_interval
+        self.last_ts = None
+        self._recent = deque(maxlen=remember)
+        self._pending = set()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """Load cursor state from disk if present"""
+        if not self.path or not self.path.exists():
+            return
+        
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.last_ts = data.get('last_ts')
+            pending = data.get('pending', [])
+            # Unfinished tasks were lost with the scheduler - read them again
+            self._recent.extend(ts for ts in data.get('recent', []) if ts not in pending)
+            if pending:
+                self.last_ts = ts_before(min(pending, key=ts_key))
+                logger.info(f"Replaying {len(pending)} unfinished Slack tasks")
+            logger.info(f"Resuming Slack ingestion from ts {self.last_ts}")
+        except Exception as e:
+            logger.error(f"Error loading Slack cursor {self.path}: {e}")
+    
+    def save(self):
+        """Atomically write cursor state to disk"""
+        if not self.path:
+            return
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_ts': self.last_ts,
+                'recent': list(self._recent),
+                'pending': sorted(self._pending, key=ts_key)
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+    
+    def seen(self, ts):
+        """True if this message was already handled"""
+        with self._lock:
+            return ts in self._recent
+    
+    def advance(self, ts):
+        """Record a handled message and move the cursor forward"""
+        with self._lock:
+            self._record(ts)
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save_logged()
+    
+    def begin(self, ts):
+        """Record a mention that is being handed off as a task, durably"""
+        with self._lock:
+            self._record(ts)
+            self._pending.add(ts)
+            self._save_logged()
+    
+    def finish(self, ts):
+        """Mark the task from a begin() as done, so a restart won't replay it"""
+        with self._lock:
+            if ts not in self._pending:
+                return
+            self._pending.discard(ts)
+            self._save_logged()
+    
+    def flush(self):
+        """Write any batched cursor moves to disk"""
+        with self._lock:
+            if self._dirty:
+                self._save_logged()
+    
+    def _record(self, ts):
+        self._recent.append(ts)
+        if self.last_ts is None or ts_key(ts) > ts_key(self.last_ts):
+            self.last_ts = ts
+        self._dirty = True
+    
+    def _save_logged(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"Error saving Slack cursor: {e}")
+
+
+class EventSource:
+    """Base class for push sources - delivers raw Slack message dicts"""
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.closed = False
+    
+    def start(self):
+        """Begin receiving events"""
+    
+    def stop(self):
+        """Stop receiving events and wake up any reader"""
+        self.closed = True
+        self._queue.put(None)
+    
+    def get(self, timeout=1.0):
+        """
+        Wait for the next message
+        
+        Returns: message dict, or None on timeout / after stop()
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def _deliver(self, event):
+        """Queue a message-like event for the reader"""
+        if event.get('type') not in ('message', 'app_mention'):
+            return
+        if event.get('subtype') in IGNORED_SUBTYPES:
+            return
+        self._queue.put(event)
+
+
+class SocketModeSource(EventSource):
+    """Receives Events API payloads over a Slack Socket Mode websocket"""
+    
+    def __init__(self, app_token, web_client=None):
+        super().__init__()
+        # Imported here so polling mode works without socket mode extras
+        from slack_sdk.socket_mode import SocketModeClient
+        
+        self.client = SocketModeClient(app_token=app_token, web_client=web_client)
+        self.client.socket_mode_request_listeners.append(self._on_request)
+    
+    def start(self):
+        """Open the websocket connection"""
+        logger.info("Connecting to Slack Socket Mode")
+        self.client.connect()
+    
+    def stop(self):
+        """Close the websocket connection"""
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.debug(f"Error closing Socket Mode client: {e}")
+        super().stop()
+    
+    def _on_request(self, client, req):
+        """Ack every envelope right away, then queue any message event"""
+        from slack_sdk.socket_mode.response import SocketModeResponse
+        
+        client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+        
+        if req.type == 'events_api':
+            self._deliver(req.payload.get('event', {}))
+
+
+class FakeEventSource(EventSource):
+    """
+    Offline event source for tests and local development
+    
+    Feed it messages with push() or from a JSON-lines file with load_file().
+    Call close() once the feed is done to end the listen loop.
+    """
+    
+    def push(self, event):
+        """Deliver one event (a Slack event dict)"""
+        event.setdefault('type', 'message')
+        self._deliver(event)
+    
+    def load_file(self, path):
+        """Deliver every event from a JSON-lines file"""
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.push(json.loads(line))
+    
+    def close(self):
+        """Signal the end of the feed"""
+        self.stop()
@@ -3,6 +3,7 @@ from slack_sdk.errors import SlackApiError
 import logging
 import time
 import re
+from .slack_events import EventCursor, ts_key
 
 logger = logging.getLogger(__name__)
 
@@ -38,47 +39,114 @@ class SlackHandler:
             logger.error(f"Error sending message: {e}")
             return None
     
-    def listen_for_mentions(self, channel, callback, poll_interval=5):
+    def listen_for_mentions(self, channel, callback, poll_interval=5, source=None, cursor=None):
         """
-        Poll for mentions of this bot
+        Listen for mentions of this bot
         
-        callback: function(task_data) to call when mentioned
+        callback: function(task_data, thread_ts) to call when mentioned
+        source: EventSource to receive pushed events from (None = poll history)
+        cursor: EventCursor so nothing is lost or repeated across restarts -
+        call cursor.finish(thread_ts) once a task from callback is done
         """
         logger.info(f"Listening for mentions in #{channel}")
         
-        last_checked = time.time()
+        cursor = cursor or EventCursor()
+        if cursor.last_ts is None:
+            # First run - only pick up messages from now on
+            cursor.last_ts = str(time.time())
         
-        while True:
+        try:
+            if source is not None:
+                self._listen_to_source(channel, callback, source, cursor)
+                return
+            
+            while True:
+                try:
+                    self._catch_up(channel, callback, cursor)
+                    time.sleep(poll_interval)
+                    
+                except SlackApiError as e:
+                    logger.error(f"Error listening to Slack: {e}")
+                    time.sleep(poll_interval)
+                except KeyboardInterrupt:
+                    logger.info("Stopped listening")
+                    break
+        finally:
+            cursor.flush()
+    
+    def _listen_to_source(self, channel, callback, source, cursor):
+        """Handle pushed events, after catching up on anything missed while offline"""
+        source.start()
+        
+        try:
             try:
-                # Get recent messages
-                response = self.client.conversations_history(
-                    channel=channel,
-                    oldest=str(last_checked),
-                    limit=10
-                )
+                self._catch_up(channel, callback, cursor)
+            except SlackApiError as e:
+                logger.error(f"Error catching up on missed messages: {e}")
+            
+            while True:
+                message = source.get(timeout=1.0)
                 
-                for message in response['messages']:
-                    # Check if bot is mentioned
-                    text = message.get('text', '')
-                    
-                    if self.bot_id and f'<@{self.bot_id}>' in text:
-                        # Extract task from message
-                        task_data = self._parse_task(message)
-                        
-                        if task_data:
-                            logger.info(f"Received task: {task_data.get('task', '')}")
-                            # Call the callback function
-                            callback(task_data, message['ts'])
+                if message is None:
+                    # Timeout, or the end-of-stream marker once stopped
+                    if source.closed:
+                        break
+                    continue
                 
-                last_checked = time.time()
-                time.sleep(poll_interval)
+                if message.get('channel') not in (None, channel):
+                    continue
                 
-            except SlackApiError as e:
-                logger.error(f"Error listening to Slack: {e}")
-                time.sleep(poll_interval)
-            except KeyboardInterrupt:
-                logger.info("Stopped listening")
+                self._handle_message(message, callback, cursor)
+                
+        except KeyboardInterrupt:
+            logger.info("Stopped listening")
+        finally:
+            source.stop()
+    
+    def _catch_up(self, channel, callback, cursor):
+        """Read every message since the cursor, oldest first, across all pages"""
+        messages = []
+        page_cursor = None
+        
+        while True:
+            response = self.client.conversations_history(
+                channel=channel,
+                oldest=cursor.last_ts,
+                limit=200,
+                cursor=page_cursor
+            )
+            messages.extend(response['messages'])
+            
+            page_cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not response.get('has_more') or not page_cursor:
                 break
+        
+        # History comes back newest first
+        for message in sorted(messages, key=lambda m: ts_key(m.get('ts'))):
+            self._handle_message(message, callback, cursor)
+    
+    def _handle_message(self, message, callback, cursor):
+        """Dispatch a message to the callback if it mentions us and is new"""
+        ts = message.get('ts')
+        
+        if not ts or cursor.seen(ts):
+            return
+        
+        # Check if bot is mentioned
+        text = message.get('text', '')
+        
+        if self.bot_id and f'<@{self.bot_id}>' in text:
+            # Extract task from message
+            task_data = self._parse_task(message)
+            
+            if task_data:
+                logger.info(f"Received task: {task_data.get('task', '')}")
+                # Pending on disk before the task exists, so a crash replays it
+                cursor.begin(ts)
+                callback(task_data, ts)
+                return
+        
+        cursor.advance(ts)
     
     def _parse_task(self, message):
         """
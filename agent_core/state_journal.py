@@ -0,0 +1,206 @@
+"""
+Append-only event journal with compacted snapshots, for crash-safe API state
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_PREFIX = "journal-"
+
+
+class StateJournal:
+    """
+    Durable log of every state-changing event
+    
+    Events are appended as JSON lines to the current journal segment and
+    fsynced in batches every fsync_interval seconds by a background thread,
+    so a burst of events costs one fsync instead of one each. Every event
+    gets a number n. Once snapshot_every events have piled up since the
+    last snapshot, on_snapshot is called to write a compacted snapshot and
+    journal segments it covers are deleted - so a restart only has to load
+    one snapshot and replay a short tail, however long the history is.
+    """
+    
+    def __init__(self, state_dir, fsync_interval=0.2, snapshot_every=10000, on_snapshot=None):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.on_snapshot = on_snapshot
+        
+        self.n = 0
+        self.snapshot_n = 0
+        self._file = None
+        self._segment = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _segments(self):
+        """Journal segments, oldest first"""
+        return sorted(self.state_dir.glob(f"{SEGMENT_PREFIX}*.jsonl"))
+    
+    def _segment_path(self, first_n):
+        return self.state_dir / f"{SEGMENT_PREFIX}{first_n:012d}.jsonl"
+    
+    def load(self):
+        """
+        Read back what was persisted
+        
+        Returns: (snapshot state or None, list of events after the snapshot)
+        """
+        snapshot = None
+        snapshot_path = self.state_dir / SNAPSHOT_FILE
+        if snapshot_path.exists():
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            snapshot = data["state"]
+            self.snapshot_n = self.n = data["n"]
+        
+        events = []
+        for segment in self._segments():
+            with open(segment, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash - everything before it is intact
+                        logger.warning(f"Skipping unreadable journal line {segment.name}:{line_no}")
+                        continue
+                    if record["n"] > self.n:
+                        events.append(record["event"])
+                        self.n = record["n"]
+        
+        logger.info(f"Loaded state: snapshot at {self.snapshot_n}, {len(events)} journal events to replay")
+        return snapshot, events
+    
+    def open(self):
+        """Start a fresh segment for new events and the background fsync thread"""
+        with self._lock:
+            self._open_segment()
+        
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run, name="state-journal", daemon=True)
+            self._thread.start()
+    
+    def _open_segment(self):
+        """Switch appends to a new segment starting after event n (lock held)"""
+        if self._file:
+            self._sync()
+            self._file.close()
+        self._segment = self._segment_path(self.n + 1)
+        self._file = open(self._segment, 'a', encoding='utf-8')
+        
+        # Reusing a segment that ends in a torn line - start on a fresh line
+        if self._file.tell() and not self._segment.read_bytes().endswith(b"\n"):
+            self._file.write("\n")
+    
+    def append(self, event):
+        """Journal one event (written now, fsynced with the next batch)"""
+        with self._lock:
+            self.n += 1
+            self._file.write(json.dumps({"n": self.n, "event": event}, default=str) + "\n")
+            self._dirty = True
+            return self.n
+    
+    def _sync(self):
+        """Flush and fsync the current segment (lock held)"""
+        if self._file and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+    
+    def sync(self):
+        """
+        Fsync what has been written so far, without holding up appends
+        
+        Only the flush happens under the lock; the fsync runs on a duplicate
+        of the file descriptor, which stays valid if a rotate() closes the
+        segment meanwhile.
+        """
+        with self._lock:
+            if not (self._file and self._dirty):
+                return
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+        finally:
+            os.close(fd)
+    
+    def rotate(self):
+        """
+        Start a new segment so a snapshot can cover everything before it
+        
+        Call with the caller's state lock held, together with capturing the
+        state, so the snapshot and the segment boundary agree.
+        Returns: number of the last event the snapshot will cover
+        """
+        with self._lock:
+            self._open_segment()
+            return self.n
+    
+    def write_snapshot(self, state, n):
+        """Atomically replace the snapshot, then drop the segments it covers"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"n": n, "state": state}, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_dir / SNAPSHOT_FILE)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        self.snapshot_n = n
+        with self._lock:
+            current = self._segment
+        for segment in self._segments():
+            if segment < self._segment_path(n + 1) and segment != current:
+                segment.unlink()
+        
+        logger.info(f"Wrote state snapshot at event {n}")
+    
+    def _run(self):
+        """Background loop: batched fsync, and snapshots when enough has piled up"""
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.sync()
+                if self.on_snapshot and self.n - self.snapshot_n >= self.snapshot_every:
+                    self.on_snapshot()
+            except Exception as e:
+                logger.error(f"State journal error: {e}")
+    
+    def close(self):
+        """Fsync what's pending and stop the background thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._file:
+                self._sync()
+                self._file.close()
+                self._file = None
+    
+    def stats(self):
+        return {
+            "events": self.n,
+            "snapshot_at": self.snapshot_n,
+            "since_snapshot": self.n - self.snapshot_n,
+            "segments": len(self._segments()),
+        }
@@ -0,0 +1,227 @@
+"""
+Bounded worker pool that drains queued tasks for the agent
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a task is submitted to a full scheduler queue"""
+
+
+class _Job:
+    """A queued task plus the bookkeeping needed for wait-time stats"""
+    
+    __slots__ = ("task_data", "thread_ts", "repo_key", "enqueued_at")
+    
+    def __init__(self, task_data, thread_ts, repo_key):
+        self.task_data = task_data
+        self.thread_ts = thread_ts
+        self.repo_key = repo_key
+        self.enqueued_at = time.monotonic()
+
+
+def repo_key(repo_url):
+    """Normalize a repo URL so the same repo always maps to the same key"""
+    if not repo_url:
+        return None
+    key = repo_url.strip().rstrip('/').lower()
+    if key.endswith('.git'):
+        key = key[:-4]
+    return key
+
+
+class TaskScheduler:
+    """
+    Queues incoming tasks and runs them on a fixed pool of worker threads
+    
+    handler: function(task_data, thread_ts, worker_id) that does the work
+    
+    When serialize_per_repo is on, two tasks for the same repo never run at
+    the same time. A task whose repo is busy is parked and picked up by the
+    worker that currently owns that repo, so no worker sits blocked on a lock.
+    
+    max_queue_size bounds every waiting task, queued or parked. The queue
+    itself is unbounded so shutdown sentinels can always be put on it.
+    """
+    
+    def __init__(self, handler, num_workers=2, max_queue_size=0, serialize_per_repo=True):
+        self.handler = handler
+        self.num_workers = max(1, int(num_workers))
+        self.serialize_per_repo = serialize_per_repo
+        self.max_queue_size = max(0, int(max_queue_size))
+        
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._active_repos = set()
+        self._parked = defaultdict(deque)
+        self._threads = []
+        self._accepting = False
+        
+        # Stats
+        self._started_at = None
+        self._busy_seconds = 0.0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+    
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        
+        self._started_at = time.monotonic()
+        self._accepting = True
+        
+        for worker_id in range(self.num_workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id,),
+                name=f"task-worker-{worker_id}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        
+        logger.info(f"Task scheduler started with {self.num_workers} workers")
+    
+    def submit(self, task_data, thread_ts=None):
+        """
+        Queue a task for the worker pool
+        
+        Raises: QueueFullError if the queue is at capacity
+        """
+        if not self._accepting:
+            raise RuntimeError("Scheduler is not running")
+        
+        job = _Job(task_data, thread_ts, repo_key(task_data.get('repo', '')))
+        
+        with self._lock:
+            if self.max_queue_size and self._waiting() >= self.max_queue_size:
+                raise QueueFullError(f"Task queue is full ({self.max_queue_size} waiting)")
+            self._queue.put_nowait(job)
+        
+        logger.info(f"Queued task (depth {self.queue_depth()}): {task_data.get('task', '')}")
+    
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and let the workers drain the queue"""
+        self._accepting = False
+        
+        for _ in self._threads:
+            self._queue.put(None)
+        
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        
+        self._threads = []
+        logger.info("Task scheduler stopped")
+    
+    def queue_depth(self):
+        """Number of tasks waiting to run (queued or parked behind a busy repo)"""
+        with self._lock:
+            return self._waiting()
+    
+    def _waiting(self):
+        """queue_depth() without taking the lock - callers must hold it"""
+        return self._queue.qsize() + sum(len(jobs) for jobs in self._parked.values())
+    
+    def get_stats(self):
+        """Snapshot of queue depth, wait times and worker utilization"""
+        depth = self.queue_depth()
+        
+        with self._lock:
+            started = self._completed + self._failed + self._running
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+            capacity = elapsed * self.num_workers
+            utilization = (self._busy_seconds / capacity * 100) if capacity > 0 else 0
+            
+            return {
+                "workers": self.num_workers,
+                "running": self._running,
+                "queue_depth": depth,
+                "parked": sum(len(jobs) for jobs in self._parked.values()),
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_seconds": round(self._total_wait / started, 3) if started else 0,
+                "max_wait_seconds": round(self._max_wait, 3),
+                "utilization": round(utilization, 1),
+            }
+    
+    def _worker_loop(self, worker_id):
+        """Pull jobs off the queue until a shutdown sentinel arrives"""
+        while True:
+            job = self._queue.get()
+            
+            if job is None:
+                break
+            
+            if not self._claim_repo(job):
+                # Repo is busy - the worker that owns it will run this job
+                continue
+            
+            # Run this job, then anything parked behind it for the same repo
+            while job is not None:
+                self._run_job(job, worker_id)
+                job = self._next_for_repo(job.repo_key)
+    
+    def _claim_repo(self, job):
+        """Mark the job's repo as busy, or park the job if it already is"""
+        if not self.serialize_per_repo or job.repo_key is None:
+            return True
+        
+        with self._lock:
+            if job.repo_key in self._active_repos:
+                self._parked[job.repo_key].append(job)
+                return False
+            self._active_repos.add(job.repo_key)
+            return True
+    
+    def _next_for_repo(self, key):
+        """Hand back the next parked job for a repo, or release the repo"""
+        if not self.serialize_per_repo or key is None:
+            return None
+        
+        with self._lock:
+            parked = self._parked.get(key)
+            if parked:
+                job = parked.popleft()
+                if not parked:
+                    del self._parked[key]
+                return job
+            
+            self._active_repos.discard(key)
+            return None
+    
+    def _run_job(self, job, worker_id):
+        """Run one job and record its timing"""
+        started = time.monotonic()
+        wait = started - job.enqueued_at
+        
+        with self._lock:
+            self._running += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        
+        failed = False
+        try:
+            # Handlers may return False to report a task that failed cleanly
+            failed = self.handler(job.task_data, job.thread_ts, worker_id) is False
+        except Exception as e:
+            failed = True
+            logger.error(f"Worker {worker_id} task crashed: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._busy_seconds += time.monotonic() - started
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
@@ -0,0 +1,173 @@
+"""
+Bounded, indexed task store for the API server
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore:
+    """
+    Keeps the most recent tasks in memory
+    
+    Tasks are indexed by id for O(1) updates and kept in insertion order in
+    a ring, each with a sequence number used as a pagination cursor. Once
+    more than max_tasks are held the oldest are evicted, and appended to
+    spill_path (JSON lines) if one is set so history isn't lost.
+    """
+    
+    def __init__(self, max_tasks=500, spill_path=None):
+        self.max_tasks = max_tasks
+        self.spill_path = Path(spill_path) if spill_path else None
+        if self.spill_path:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._index = {}
+        # Ring of tasks in sequence order; _ring[i] has seq _base_seq + i.
+        # Evicted slots before _head are None until the list is compacted.
+        self._ring = []
+        self._head = 0
+        self._base_seq = 1
+        self._next_seq = 1
+        self._lock = threading.RLock()
+        self._replaying = False
+        
+        self.spilled = 0
+    
+    def __len__(self):
+        return len(self._index)
+    
+    def add(self, task):
+        """Add a task (a dict with an "id"); re-adding an id updates it in place"""
+        with self._lock:
+            existing = self._index.get(task["id"])
+            if existing is not None:
+                existing.update(task)
+                return existing
+            
+            task = dict(task, seq=self._next_seq)
+            self._next_seq += 1
+            self._ring.append(task)
+            self._index[task["id"]] = task
+            
+            while len(self._index) > self.max_tasks:
+                self._evict_oldest()
+            return task
+    
+    def get(self, task_id):
+        """Task by id, or None if unknown or evicted"""
+        with self._lock:
+            return self._index.get(task_id)
+    
+    def update(self, task_id, **fields):
+        """
+        Update fields of a task in place
+        
+        Returns: the task, or None if it's not held in memory
+        """
+        with self._lock:
+            task = self._index.get(task_id)
+            if task is not None:
+                task.update(fields)
+            return task
+    
+    def recent(self, limit=10):
+        """The newest `limit` tasks, oldest first"""
+        with self._lock:
+            return self._ring[max(self._head, len(self._ring) - limit):]
+    
+    def page(self, cursor=None, limit=50):
+        """
+        One page of tasks, newest first
+        
+        cursor: the next_cursor from the previous page (None = start at the newest)
+        Returns: (tasks, next_cursor) - next_cursor is None on the last page
+        """
+        with self._lock:
+            end = len(self._ring)
+            if cursor is not None:
+                # Everything older than the cursor's sequence number
+                end = max(self._head, min(end, int(cursor) - self._base_seq))
+            
+            start = max(self._head, end - limit)
+            tasks = self._ring[start:end][::-1]
+            
+            next_cursor = str(tasks[-1]["seq"]) if tasks and start > self._head else None
+            return tasks, next_cursor
+    
+    def export(self):
+        """Tasks held in memory plus the next sequence number, for snapshots"""
+        held = self.held()
+        return dict(held, tasks=[dict(task) for task in held["tasks"]])
+    
+    def held(self):
+        """Like export(), but the task dicts are the live ones - a cheap shallow copy"""
+        with self._lock:
+            return {
+                "tasks": self._ring[self._head:],
+                "next_seq": self._next_seq,
+            }
+    
+    def restore(self, data):
+        """Replace the contents with an export() - sequence numbers carry on"""
+        with self._lock:
+            tasks = [dict(task) for task in data["tasks"]][-self.max_tasks:]
+            self._ring = tasks
+            self._index = {task["id"]: task for task in tasks}
+            self._head = 0
+            self._next_seq = data["next_seq"]
+            self._base_seq = tasks[0]["seq"] if tasks else self._next_seq
+    
+    @contextmanager
+    def replaying(self):
+        """
+        Evict without spilling while journal events are re-applied
+        
+        Those evictions were spilled when the events first happened, so
+        spilling them again would duplicate lines in spill_path.
+        """
+        with self._lock:
+            self._replaying = True
+            try:
+                yield self
+            finally:
+                self._replaying = False
+    
+    def _evict_oldest(self):
+        """Evict the oldest task, spilling it to disk (lock held)"""
+        task = self._ring[self._head]
+        self._ring[self._head] = None
+        self._head += 1
+        del self._index[task["id"]]
+        if not self._replaying:
+            self._spill(task)
+        
+        # Compact once the dead prefix is as big as the live part
+        if self._head > self.max_tasks:
+            del self._ring[:self._head]
+            self._base_seq += self._head
+            self._head = 0
+    
+    def _spill(self, task):
+        if not self.spill_path:
+            return
+        
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(task, default=str) + '\n')
+            self.spilled += 1
+        except Exception as e:
+            logger.warning(f"Failed to spill task {task['id']}: {e}")
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "tasks": len(self._index),
+                "max_tasks": self.max_tasks,
+                "spilled": self.spilled,
+                "spill_file": str(self.spill_path) if self.spill_path else None,
+            }
@@ -0,0 +1,223 @@
+"""
+Token, cost and latency accounting for Claude calls
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens (input, output), matched on model name prefix
+PRICES = {
+    "claude-opus": (15.0, 75.0),
+    "claude-sonnet": (3.0, 15.0),
+    "claude-haiku": (0.8, 4.0),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+# What a call is aggregated by
+DIMENSIONS = ("task", "stage", "model", "repo")
+
+COUNTERS = ("calls", "errors", "input_tokens", "output_tokens",
+            "cache_read_tokens", "cache_write_tokens", "latency_ms", "cost_usd")
+
+# task/repo labels for the calls made in the current context
+_labels = contextvars.ContextVar("claude_call_labels", default={})
+
+
+@contextmanager
+def labels(**values):
+    """Tag every Claude call made inside the block, e.g. labels(task=task_id, repo=url)"""
+    token = _labels.set({**_labels.get(), **values})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels():
+    return dict(_labels.get())
+
+
+def estimate_cost(model, input_tokens=0, output_tokens=0, cache_read_tokens=0, cache_write_tokens=0):
+    """List-price cost of a call in USD (0 for models we have no price for)"""
+    for prefix, (input_price, output_price) in PRICES.items():
+        if model.startswith(prefix):
+            return (
+                input_tokens * input_price
+                + cache_write_tokens * input_price * CACHE_WRITE_MULTIPLIER
+                + cache_read_tokens * input_price * CACHE_READ_MULTIPLIER
+                + output_tokens * output_price
+            ) / 1_000_000
+    return 0.0
+
+
+def usage_record(model, stage, usage=None, latency=0.0, ok=True, first_token=None):
+    """
+    One call's metrics as a flat dict, labelled with the current task/repo
+    
+    usage: the API response's usage object (None if the call failed)
+    latency / first_token: seconds until the whole reply / its first chunk
+    """
+    def tokens(name):
+        return (getattr(usage, name, 0) or 0) if usage is not None else 0
+    
+    record = {
+        "task": None,
+        "repo": None,
+        **current_labels(),
+        "stage": stage,
+        "model": model,
+        "ok": ok,
+        "input_tokens": tokens("input_tokens"),
+        "output_tokens": tokens("output_tokens"),
+        "cache_read_tokens": tokens("cache_read_input_tokens"),
+        "cache_write_tokens": tokens("cache_creation_input_tokens"),
+        "latency_ms": round(latency * 1000, 1),
+    }
+    if first_token is not None:
+        record["first_token_ms"] = round(first_token * 1000, 1)
+    record["cost_usd"] = estimate_cost(
+        model, record["input_tokens"], record["output_tokens"],
+        record["cache_read_tokens"], record["cache_write_tokens"]
+    )
+    return record
+
+
+class Telemetry:
+    """
+    Aggregates call records by task, stage, model and repo
+    
+    Totals are kept per (task, stage, model, repo) combination and rolled
+    up on demand, so any grouping can be asked for. Only the max_series
+    most recently used combinations are kept apart; older ones are folded
+    into task "other" so the stage/model/repo totals stay exact.
+    
+    series_path: optional JSONL file getting one compact line per call,
+    rotated to <name>.1 past max_series_bytes
+    on_record: optional callback given every record (e.g. to forward it)
+    """
+    
+    def __init__(self, series_path=None, on_record=None, max_series=5000, max_series_bytes=20 * 1024 * 1024):
+        self.series_path = Path(series_path) if series_path else None
+        self.on_record = on_record
+        self.max_series = max_series
+        self.max_series_bytes = max_series_bytes
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if self.series_path:
+            self.series_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    def observe(self, model, stage, usage=None, latency=0.0, ok=True, first_token=None):
+        """Record one finished (or failed) call"""
+        record = dict(usage_record(model, stage, usage, latency, ok, first_token), ts=time.time())
+        self.add(record)
+        self._write(record)
+        
+        if self.on_record:
+            try:
+                self.on_record(record)
+            except Exception as e:
+                logger.debug(f"Couldn't forward call metrics: {e}")
+        return record
+    
+    def add(self, record):
+        """Fold a record into the totals (raises ValueError on a malformed one)"""
+        key = tuple(record.get(name) for name in DIMENSIONS)
+        values = {
+            "calls": 1,
+            "errors": 0 if record.get("ok", True) else 1,
+            "input_tokens": int(record.get("input_tokens", 0)),
+            "output_tokens": int(record.get("output_tokens", 0)),
+            "cache_read_tokens": int(record.get("cache_read_tokens", 0)),
+            "cache_write_tokens": int(record.get("cache_write_tokens", 0)),
+            "latency_ms": float(record.get("latency_ms", 0)),
+            "cost_usd": float(record.get("cost_usd", 0)),
+        }
+        
+        with self._lock:
+            self._merge(key, values, float(record.get("latency_ms", 0)))
+    
+    def _merge(self, key, values, max_latency=0.0):
+        """Add values into the series for key (lock held)"""
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = dict(dict.fromkeys(COUNTERS, 0), max_latency_ms=0.0)
+        else:
+            self._series.move_to_end(key)
+        
+        for name in COUNTERS:
+            series[name] += values[name]
+        series["max_latency_ms"] = max(series["max_latency_ms"], max_latency)
+        
+        while len(self._series) > self.max_series:
+            old_key, old = self._series.popitem(last=False)
+            if old_key[0] == "other":
+                # Already the catch-all; put it back at the front and stop
+                self._series[old_key] = old
+                self._series.move_to_end(old_key, last=False)
+                break
+            self._merge(("other",) + old_key[1:], old, old["max_latency_ms"])
+    
+    def _write(self, record):
+        if not self.series_path:
+            return
+        
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        try:
+            with self._lock:
+                if self.series_path.exists() and self.series_path.stat().st_size > self.max_series_bytes:
+                    os.replace(self.series_path, self.series_path.with_name(self.series_path.name + ".1"))
+                with open(self.series_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"Couldn't write call metrics: {e}")
+    
+    def summary(self, group_by=("stage",)):
+        """
+        Totals rolled up by the given dimensions, biggest latency first
+        
+        Returns: {"totals": {...}, "groups": [{<dimensions>, <counters>}, ...]}
+        """
+        indexes = [DIMENSIONS.index(name) for name in group_by]
+        groups = {}
+        totals = dict.fromkeys(COUNTERS, 0)
+        
+        with self._lock:
+            for key, series in self._series.items():
+                group_key = tuple(key[i] for i in indexes)
+                group = groups.get(group_key)
+                if group is None:
+                    group = groups[group_key] = dict(zip(group_by, group_key), **dict.fromkeys(COUNTERS, 0), max_latency_ms=0.0)
+                for name in COUNTERS:
+                    group[name] += series[name]
+                    totals[name] += series[name]
+                group["max_latency_ms"] = max(group["max_latency_ms"], series["max_latency_ms"])
+        
+        for row in list(groups.values()) + [totals]:
+            row["avg_latency_ms"] = round(row["latency_ms"] / row["calls"], 1) if row["calls"] else 0.0
+            row["cost_usd"] = round(row["cost_usd"], 6)
+        
+        return {
+            "totals": totals,
+            "groups": sorted(groups.values(), key=lambda row: row["latency_ms"], reverse=True),
+        }
+    
+    def export(self):
+        with self._lock:
+            return [{"key": list(key), **series} for key, series in self._series.items()]
+    
+    def restore(self, series):
+        with self._lock:
+            self._series.clear()
+            for entry in series or []:
+                entry = dict(entry)
+                self._series[tuple(entry.pop("key"))] = entry
@@ -0,0 +1,159 @@
+"""
+Per-task git worktrees on top of one shared clone per repo
+"""
+import git
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from .clone_strategies import path_lock
+
+logger = logging.getLogger(__name__)
+
+# Local branch prefix for task worktrees
+TASK_BRANCH_PREFIX = "lmnh/"
+
+
+def _main_repo(worktree):
+    """Path of the clone a worktree belongs to"""
+    common_dir = worktree.git.rev_parse('--path-format=absolute', '--git-common-dir')
+    return Path(common_dir).parent
+
+
+class WorktreeManager:
+    """
+    Gives every task its own worktree and task branch
+    
+    All worktrees of a repo share the clone's object store, so tasks can
+    run side by side without re-cloning and without seeing each other's
+    half-written files.
+    """
+    
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._pruner = None
+        self._stop = threading.Event()
+        self._active = set()
+        self._lock = threading.Lock()
+    
+    def create(self, repo_path, task_id, branch="main"):
+        """
+        Add a worktree for a task, starting from the latest origin/<branch>
+        
+        Returns: path to the worktree
+        """
+        repo_path = Path(repo_path)
+        worktree_path = self.root / f"{repo_path.name}-{task_id}"
+        task_branch = f"{TASK_BRANCH_PREFIX}{task_id}"
+        
+        with path_lock(repo_path):
+            repo = git.Repo(repo_path)
+            repo.git.worktree(
+                'add', '--force', '--no-track',
+                '-B', task_branch,
+                str(worktree_path),
+                f"origin/{branch}"
+            )
+        
+        with self._lock:
+            self._active.add(worktree_path.resolve())
+        
+        logger.info(f"Created worktree: {worktree_path.name}")
+        return str(worktree_path)
+    
+    def remove(self, worktree_path):
+        """Remove a task worktree and its task branch"""
+        worktree_path = Path(worktree_path)
+        
+        with self._lock:
+            self._active.discard(worktree_path.resolve())
+        
+        try:
+            worktree = git.Repo(worktree_path)
+            repo_path = _main_repo(worktree)
+            task_branch = worktree.active_branch.name if not worktree.head.is_detached else None
+        except Exception as e:
+            logger.warning(f"Worktree {worktree_path.name} is broken, deleting it: {e}")
+            shutil.rmtree(worktree_path, ignore_errors=True)
+            return
+        
+        with path_lock(repo_path):
+            repo = git.Repo(repo_path)
+            repo.git.worktree('remove', '--force', str(worktree_path))
+            
+            if task_branch and task_branch.startswith(TASK_BRANCH_PREFIX):
+                repo.git.branch('-D', task_branch)
+        
+        logger.info(f"Removed worktree: {worktree_path.name}")
+    
+    def prune(self, max_age=3600):
+        """
+        Remove worktrees left behind by crashed tasks
+        
+        Anything under the worktree root older than max_age seconds that no
+        running task owns goes, then `git worktree prune` drops stale
+        metadata from the clones. A worktree that can't be removed (e.g. a
+        locked one) is logged and skipped.
+        
+        Returns: number of worktrees removed
+        """
+        removed = 0
+        repos = set()
+        cutoff = time.time() - max_age
+        
+        with self._lock:
+            active = set(self._active)
+        
+        for worktree_path in self.root.iterdir():
+            if not worktree_path.is_dir() or worktree_path.resolve() in active:
+                continue
+            if worktree_path.stat().st_mtime > cutoff:
+                continue
+            
+            try:
+                repos.add(_main_repo(git.Repo(worktree_path)))
+            except Exception:
+                pass
+            
+            try:
+                self.remove(worktree_path)
+                removed += 1
+            except Exception as e:
+                logger.error(f"Couldn't prune worktree {worktree_path.name}: {e}")
+        
+        for repo_path in repos:
+            try:
+                with path_lock(repo_path):
+                    git.Repo(repo_path).git.worktree('prune')
+            except Exception as e:
+                logger.error(f"git worktree prune failed in {repo_path}: {e}")
+        
+        if removed:
+            logger.info(f"Pruned {removed} stale worktree(s)")
+        return removed
+    
+    def start_pruner(self, interval=600, max_age=3600):
+        """Prune stale worktrees every `interval` seconds in the background"""
+        if self._pruner:
+            return
+        
+        # A fresh event per start: a restarted pruner must not see the last stop,
+        # and a pruner still winding down keeps its own
+        stop = self._stop = threading.Event()
+        
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.prune(max_age)
+                except Exception as e:
+                    logger.error(f"Worktree prune failed: {e}")
+        
+        self._pruner = threading.Thread(target=loop, name="worktree-pruner", daemon=True)
+        self._pruner.start()
+    
+    def stop_pruner(self):
+        """Stop the background pruner"""
+        self._stop.set()
+        self._pruner = None
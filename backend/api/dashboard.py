@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func, and_, or_, case, extract
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+from collections import namedtuple
 from pydantic import BaseModel
 from database import get_db
 from models import Task, TaskTransition, TaskComment, User, Project
+from models.task_rollup import TaskRollup
+from services.user_loader import UserLoader
 import json
 
 router = APIRouter()
@@ -68,6 +71,75 @@ class DashboardSummary(BaseModel):
     user_metrics: List[UserMetrics]
     time_series: List[TimeSeriesData]
 
+# Per-status totals behind the overview and status distribution
+StatusGroup = namedtuple('StatusGroup', ['status', 'tasks', 'timed', 'seconds'])
+
+def rollups_cover(start_date, end_date):
+    """
+    Whether task_rollups can answer these date filters exactly
+    
+    Rollups count tasks by creation day, so they match the created_date
+    filters only when start_date is a midnight and end_date the last
+    instant of a day. Anything finer is counted on tasks.
+    """
+    return (
+        (start_date is None or start_date.time() == datetime.min.time()) and
+        (end_date is None or end_date.time() == datetime.max.time())
+    )
+
+def rollup_filters(project_id, user_id, start_date, end_date):
+    """Dashboard filters as conditions on task_rollups (only when rollups_cover the dates)"""
+    filters = []
+    if project_id:
+        filters.append(TaskRollup.project_id == project_id)
+    if user_id:
+        filters.append(TaskRollup.assigned_to == user_id)
+    if start_date:
+        filters.append(TaskRollup.day >= start_date.date())
+    if end_date:
+        filters.append(TaskRollup.day <= end_date.date())
+    return filters
+
+def task_filters(project_id, user_id, start_date, end_date):
+    """Dashboard filters as conditions on tasks"""
+    filters = []
+    if project_id:
+        filters.append(Task.project_id == project_id)
+    if user_id:
+        filters.append(Task.assigned_to == user_id)
+    if start_date:
+        filters.append(Task.created_date >= start_date)
+    if end_date:
+        filters.append(Task.created_date <= end_date)
+    return filters
+
+def status_groups(db, project_id, user_id, start_date, end_date):
+    """Task count, completed-with-a-date count and their total seconds, per status"""
+    if rollups_cover(start_date, end_date):
+        # Reads groups rather than tasks
+        return db.query(
+            TaskRollup.status,
+            func.sum(TaskRollup.task_count).label('tasks'),
+            func.sum(TaskRollup.completed_count).label('timed'),
+            func.sum(TaskRollup.completion_seconds).label('seconds')
+        ).filter(*rollup_filters(project_id, user_id, start_date, end_date)).group_by(TaskRollup.status).all()
+    
+    filters = task_filters(project_id, user_id, start_date, end_date)
+    counts = db.query(Task.status, func.count(Task.id)).filter(*filters).group_by(Task.status).all()
+    
+    # Only completed tasks' durations are reported
+    timed = seconds = 0
+    for created_date, completed_date in db.query(Task.created_date, Task.completed_date).filter(
+        *filters, Task.status == 'completed', Task.completed_date.isnot(None)
+    ):
+        timed += 1
+        seconds += (completed_date - created_date).total_seconds()
+    
+    return [
+        StatusGroup(status, count, *((timed, seconds) if status == 'completed' else (0, 0)))
+        for status, count in counts
+    ]
+
 @router.get("/dashboard/overview", response_model=TaskMetrics)
 def get_dashboard_overview(
     project_id: Optional[int] = Query(None),
@@ -76,20 +148,9 @@ def get_dashboard_overview(
     end_date: Optional[datetime] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Task)
+    groups = status_groups(db, project_id, user_id, start_date, end_date)
     
-    # Apply filters
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    if user_id:
-        query = query.filter(Task.assigned_to == user_id)
-    if start_date:
-        query = query.filter(Task.created_date >= start_date)
-    if end_date:
-        query = query.filter(Task.created_date <= end_date)
-    
-    tasks = query.all()
-    total_tasks = len(tasks)
+    total_tasks = sum(group.tasks for group in groups)
     
     if total_tasks == 0:
         return TaskMetrics(
@@ -101,19 +162,21 @@ def get_dashboard_overview(
             completion_rate=0
         )
     
-    active_tasks = len([t for t in tasks if t.status not in ['completed', 'cancelled']])
-    completed_tasks = len([t for t in tasks if t.status == 'completed'])
+    active_tasks = sum(group.tasks for group in groups if group.status not in ['completed', 'cancelled'])
+    completed_tasks = sum(group.tasks for group in groups if group.status == 'completed')
     
-    # Calculate overdue tasks
+    # Overdue depends on the clock, so it is always counted on tasks (in SQL, not Python)
     now = datetime.utcnow()
-    overdue_tasks = len([t for t in tasks if t.due_date and t.due_date < now and t.status not in ['completed', 'cancelled']])
+    overdue_tasks = db.query(func.count(Task.id)).filter(
+        Task.due_date < now,
+        Task.status.notin_(['completed', 'cancelled']),
+        *task_filters(project_id, user_id, start_date, end_date)
+    ).scalar() or 0
     
     # Calculate average completion time
-    completed_with_dates = [t for t in tasks if t.status == 'completed' and t.completed_date]
-    avg_completion_time = 0
-    if completed_with_dates:
-        total_time = sum([(t.completed_date - t.created_date).total_seconds() / 3600 for t in completed_with_dates])
-        avg_completion_time = total_time / len(completed_with_dates)
+    completed_timed = sum(group.timed for group in groups if group.status == 'completed')
+    completed_seconds = sum(group.seconds for group in groups if group.status == 'completed')
+    avg_completion_time = (completed_seconds / completed_timed / 3600) if completed_timed else 0
     
     completion_rate = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
     
@@ -134,21 +197,9 @@ def get_status_distribution(
     end_date: Optional[datetime] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Task.status, func.count(Task.id).label('count'))
-    
-    # Apply filters
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    if user_id:
-        query = query.filter(Task.assigned_to == user_id)
-    if start_date:
-        query = query.filter(Task.created_date >= start_date)
-    if end_date:
-        query = query.filter(Task.created_date <= end_date)
+    results = status_groups(db, project_id, user_id, start_date, end_date)
     
-    results = query.group_by(Task.status).all()
-    
-    total_count = sum([r.count for r in results])
+    total_count = sum([r.tasks for r in results])
     
     if total_count == 0:
         return []
@@ -156,8 +207,8 @@ def get_status_distribution(
     return [
         StatusDistribution(
             status=result.status,
-            count=result.count,
-            percentage=(result.count / total_count) * 100
+            count=result.tasks,
+            percentage=(result.tasks / total_count) * 100
         )
         for result in results
     ]
@@ -277,10 +328,13 @@ def get_task_lifecycle(task_id: int, db: Session = Depends(get_db)):
         .order_by(TaskTransition.timestamp)\
         .all()
     
+    # The creator and everyone who moved the task, in one query
+    users = UserLoader(db, User).load([task.created_by] + [t.user_id for t in transitions])
+    
     lifecycle_steps = []
     
     # Add creation step
-    creator = db.query(User).filter(User.id == task.created_by).first()
+    creator = users.get(task.created_by)
     lifecycle_steps.append(TaskLifecycleStep(
         status="created",
         timestamp=task.created_date,
@@ -298,7 +352,7 @@ def get_task_lifecycle(task_id: int, db: Session = Depends(get_db)):
         elif task.status == 'completed' and task.completed_date:
             duration_in_status = (task.completed_date - transition.timestamp).total_seconds() / 3600
         
-        user = db.query(User).filter(User.id == transition.user_id).first()
+        user = users.get(transition.user_id)
         lifecycle_steps.append(TaskLifecycleStep(
             status=transition.to_status,
             timestamp=transition.timestamp,
@@ -407,7 +461,9 @@ def get_dashboard_summary(
 
 @router.get("/dashboard/task-transitions/{task_id}")
 def get_task_transitions(task_id: int, db: Session = Depends(get_db)):
+    # Fill t.user from the join instead of lazy-loading it per row
     transitions = db.query(TaskTransition).join(User, TaskTransition.user_id == User.id)\
+        .options(contains_eager(TaskTransition.user))\
         .filter(TaskTransition.task_id == task_id)\
         .order_by(TaskTransition.timestamp.desc())\
         .all()
@@ -5,8 +5,12 @@ from backend.models.task import Task, TaskStatus, TaskPriority
 from backend.models.user import User
 from backend.models.activity_log import ActivityLog
 from backend.database import db
-from sqlalchemy import and_, or_, desc
+from backend.services import task_rollups, task_search
+from backend.services.user_loader import request_user_loader
+from backend.services.pagination import keyset_page, decode_cursor, clamp_per_page, total_cache, wants_cursor
+from sqlalchemy import and_, desc, case
 from sqlalchemy.orm import joinedload
+import click
 
 tasks_bp = Blueprint('tasks', __name__)
 
@@ -16,13 +20,24 @@ def get_tasks():
     try:
         user_id = get_jwt_identity()
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
+        cursor = request.args.get('cursor')
         status = request.args.get('status')
         priority = request.args.get('priority')
         search = request.args.get('search')
         assigned_to = request.args.get('assigned_to')
         created_by = request.args.get('created_by')
         
+        # Search results are ranked, and a (created_at, id) cursor can't follow relevance order
+        if search and wants_cursor(request.args):
+            return jsonify({'error': 'Cursor pagination is not supported with search; use page'}), 400
+        
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
         query = Task.query.options(
             joinedload(Task.assigned_to_user),
             joinedload(Task.created_by_user)
@@ -44,26 +59,42 @@ def get_tasks():
         if created_by:
             query = query.filter(Task.created_by == created_by)
         
-        # Search in title and description
+        # Search in title and description through the full-text index
+        relevance = None
         if search:
-            search_filter = or_(
-                Task.title.ilike(f'%{search}%'),
-                Task.description.ilike(f'%{search}%')
+            query, relevance = task_search.apply(db.session, query, search)
+        
+        if wants_cursor(request.args):
+            # Newest first, seeking past the cursor on the (created_at, id) index
+            items, next_cursor = keyset_page(query, Task.created_at, Task.id, cursor, per_page)
+            page_info = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if request.args.get('include_total', 'false').lower() == 'true':
+                filters = tuple(sorted((k, v) for k, v in request.args.items() if k not in ('cursor', 'paginate', 'per_page', 'include_total')))
+                page_info['total'] = total_cache.get(('tasks',) + filters, query.count)
+        else:
+            # Page-number pagination stays the default; indexed searches rank best matches first
+            order = (relevance, desc(Task.id)) if relevance is not None else (desc(Task.created_at), desc(Task.id))
+            pagination = query.order_by(*order).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False
             )
-            query = query.filter(search_filter)
-        
-        # Order by creation date (newest first)
-        query = query.order_by(desc(Task.created_at))
-        
-        # Paginate results
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+            items = pagination.items
+            page_info = {
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
         
         tasks = []
-        for task in pagination.items:
+        for task in items:
             task_data = {
                 'id': task.id,
                 'title': task.title,
@@ -92,14 +123,7 @@ def get_tasks():
         
         return jsonify({
             'tasks': tasks,
-            'pagination': {
-                'page': pagination.page,
-                'pages': pagination.pages,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
+            'pagination': page_info
         }), 200
         
     except Exception as e:
@@ -137,6 +161,11 @@ def create_task():
         db.session.add(task)
         db.session.flush()  # Get the task ID
         
+        # Count the task in its rollup group, in the same transaction
+        rollups = task_rollups.RollupDelta()
+        rollups.add(task_rollups.contribution(task))
+        rollups.apply(db.session)
+        
         # Log activity
         log_entry = ActivityLog(
             user_id=user_id,
@@ -235,6 +264,7 @@ def update_task(task_id):
         user_id = get_jwt_identity()
         task = Task.query.get_or_404(task_id)
         data = request.get_json()
+        rollup_before = task_rollups.contribution(task)
         
         # Store original values for change tracking
         original_values = {
@@ -306,6 +336,11 @@ def update_task(task_id):
             )
             db.session.add(log_entry)
         
+        # Move the task between rollup groups if status, priority or assignee changed
+        rollups = task_rollups.RollupDelta()
+        rollups.move(rollup_before, task_rollups.contribution(task))
+        rollups.apply(db.session)
+        
         db.session.commit()
         
         # Load relationships for response
@@ -366,6 +401,10 @@ def delete_task(task_id):
         )
         db.session.add(log_entry)
         
+        rollups = task_rollups.RollupDelta()
+        rollups.remove(task_rollups.contribution(task))
+        rollups.apply(db.session)
+        
         db.session.delete(task)
         db.session.commit()
         
@@ -383,113 +422,111 @@ def get_task_activity(task_id):
         task = Task.query.get_or_404(task_id)
         
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
         # Get activity logs for this task
-        pagination = ActivityLog.query.filter(
+        query = ActivityLog.query.filter(
             and_(
                 ActivityLog.entity_type == 'task',
                 ActivityLog.entity_id == task_id
             )
-        ).order_by(desc(ActivityLog.created_at)).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
         )
         
+        if wants_cursor(request.args):
+            items, next_cursor = keyset_page(query, ActivityLog.created_at, ActivityLog.id, cursor, per_page)
+            page_info = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if request.args.get('include_total', 'false').lower() == 'true':
+                page_info['total'] = total_cache.get(('task_activity', task_id), query.count)
+        else:
+            # Page-number pagination stays the default
+            pagination = query.order_by(desc(ActivityLog.created_at), desc(ActivityLog.id)).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            items = pagination.items
+            page_info = {
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        # Everyone on the page in one IN query
+        users = request_user_loader(db.session, User).load(log.user_id for log in items)
+        
         activities = []
-        for log in pagination.items:
-            user = User.query.get(log.user_id)
+        for log in items:
             activity_data = {
                 'id': log.id,
                 'action': log.action,
                 'created_at': log.created_at.isoformat(),
                 'details': log.details,
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email
-                } if user else None
+                'user': users.summary(log.user_id)
             }
             activities.append(activity_data)
         
         return jsonify({
             'activities': activities,
-            'pagination': {
-                'page': pagination.page,
-                'pages': pagination.pages,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
+            'pagination': page_info
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def count_where(condition):
+    """Conditional sum - counts the rows matching condition within one aggregate query"""
+    return db.func.coalesce(db.func.sum(case((condition, 1), else_=0)), 0)
+
 @tasks_bp.route('/tasks/analytics', methods=['GET'])
 @jwt_required()
 def get_task_analytics():
     try:
         user_id = get_jwt_identity()
-        
-        # Get task counts by status
-        status_counts = {}
-        for status in TaskStatus:
-            count = Task.query.filter(Task.status == status).count()
-            status_counts[status.value] = count
-        
-        # Get task counts by priority
-        priority_counts = {}
-        for priority in TaskPriority:
-            count = Task.query.filter(Task.priority == priority).count()
-            priority_counts[priority.value] = count
-        
-        # Get overdue tasks count
-        overdue_count = Task.query.filter(
-            and_(
-                Task.due_date < datetime.now(timezone.utc),
-                Task.status != TaskStatus.completed
-            )
-        ).count()
-        
-        # Get completion rate for the current month
-        start_of_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        total_tasks_this_month = Task.query.filter(
-            Task.created_at >= start_of_month
-        ).count()
-        
-        completed_tasks_this_month = Task.query.filter(
-            and_(
-                Task.created_at >= start_of_month,
-                Task.status == TaskStatus.completed
-            )
-        ).count()
-        
-        completion_rate = (completed_tasks_this_month / total_tasks_this_month * 100) if total_tasks_this_month > 0 else 0
-        
-        # Get average completion time
-        completed_tasks = Task.query.filter(
-            and_(
-                Task.status == TaskStatus.completed,
-                Task.completed_at.isnot(None)
-            )
-        ).all()
-        
-        total_completion_time = 0
-        for task in completed_tasks:
-            completion_time = (task.completed_at - task.created_at).total_seconds() / 3600  # hours
-            total_completion_time += completion_time
-        
-        avg_completion_time = (total_completion_time / len(completed_tasks)) if completed_tasks else 0
+        now = datetime.now(timezone.utc)
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        is_completed = Task.status == TaskStatus.completed
+        
+        # Every count and the average completion time in a single pass over tasks.
+        # This stays on tasks rather than task_rollups: rollup groups are fine-grained
+        # enough for the dashboard filters that reading them here is no cheaper.
+        columns = [count_where(Task.status == status).label(f'status_{status.name}') for status in TaskStatus]
+        columns += [count_where(Task.priority == priority).label(f'priority_{priority.name}') for priority in TaskPriority]
+        columns += [
+            count_where(and_(Task.due_date < now, Task.status != TaskStatus.completed)).label('overdue'),
+            count_where(Task.created_at >= start_of_month).label('month_total'),
+            count_where(and_(Task.created_at >= start_of_month, is_completed)).label('month_completed'),
+            db.func.avg(case(
+                (and_(is_completed, Task.completed_at.isnot(None)),
+                 task_rollups.duration_seconds(db.session, Task.created_at, Task.completed_at))
+            )).label('avg_completion_seconds'),
+        ]
+        totals = db.session.query(*columns).one()
+        
+        status_counts = {status.value: int(getattr(totals, f'status_{status.name}')) for status in TaskStatus}
+        priority_counts = {priority.value: int(getattr(totals, f'priority_{priority.name}')) for priority in TaskPriority}
+        overdue_count = int(totals.overdue)
+        
+        completion_rate = (totals.month_completed / totals.month_total * 100) if totals.month_total > 0 else 0
+        avg_completion_time = float(totals.avg_completion_seconds or 0) / 3600  # hours
         
         # Get task assignment distribution
         assignment_stats = db.session.query(
             User.username,
             db.func.count(Task.id).label('task_count')
-        ).join(Task, User.id == Task.assigned_to).group_by(User.id).all()
+        ).join(Task, User.id == Task.assigned_to).group_by(User.id, User.username).all()
         
         assignment_distribution = {}
         for username, count in assignment_stats:
@@ -534,10 +571,12 @@ def bulk_update_tasks():
             return jsonify({'error': 'No tasks found'}), 404
         
         updated_tasks = []
+        rollups = task_rollups.RollupDelta()
         
         for task in tasks:
             # Store original values for change tracking
             original_status = task.status.value
+            rollup_before = task_rollups.contribution(task)
             
             # Apply updates
             if 'status' in updates:
@@ -556,6 +595,7 @@ def bulk_update_tasks():
                 task.assigned_to = updates['assigned_to']
             
             task.updated_at = datetime.now(timezone.utc)
+            rollups.move(rollup_before, task_rollups.contribution(task))
             
             # Log activity
             changes = {}
@@ -581,6 +621,8 @@ def bulk_update_tasks():
             
             updated_tasks.append(task.id)
         
+        # One upsert per rollup group touched, however many tasks moved
+        rollups.apply(db.session)
         db.session.commit()
         
         return jsonify({
@@ -590,4 +632,26 @@ def bulk_update_tasks():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@tasks_bp.cli.command('rebuild-rollups')
+def rebuild_rollups():
+    """Recompute the task_rollups table from tasks (run after the migration or to repair drift)"""
+    try:
+        groups = task_rollups.rebuild(db.session)
+        db.session.commit()
+        click.echo(f'Rebuilt task rollups: {groups} groups')
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+
+@tasks_bp.cli.command('build-search-index')
+def build_search_index():
+    """Create the task full-text search index for the configured database"""
+    try:
+        dialect = task_search.create_index(db.session)
+        db.session.commit()
+        click.echo(f'Task search index ready ({dialect})')
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum as SQLEnum, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -67,6 +67,11 @@ class Task(Base):
     time_logs = relationship("TaskTimeLog", back_populates="task", cascade="all, delete-orphan")
     dependencies = relationship("TaskDependency", foreign_keys="TaskDependency.task_id", back_populates="task")
     blocked_by = relationship("TaskDependency", foreign_keys="TaskDependency.depends_on_id", back_populates="depends_on_task")
+    
+    __table_args__ = (
+        # Keyset pagination of the task list: ORDER BY created_at DESC, id DESC
+        Index('idx_tasks_created_at_id', 'created_at', 'id'),
+    )
 
 class TaskLifecycleEvent(Base):
     __tablename__ = 'task_lifecycle_events'
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Index
+from .task import Base
+
+class TaskRollup(Base):
+    """
+    Task counts per (project, assignee, status, priority, creation day)
+    
+    Kept up to date by backend.services.task_rollups whenever a task is
+    created, updated or deleted, so dashboards can aggregate over groups
+    instead of scanning tasks. A missing project or assignee is stored as 0.
+    """
+    __tablename__ = "task_rollups"
+    
+    project_id = Column(Integer, primary_key=True, default=0)
+    assigned_to = Column(Integer, primary_key=True, default=0)
+    status = Column(String(50), primary_key=True)
+    priority = Column(String(20), primary_key=True, default='')
+    day = Column(Date, primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    # Tasks in this group with a completed_at, and their summed time to completion
+    completed_count = Column(Integer, nullable=False, default=0)
+    completion_seconds = Column(BigInteger, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('idx_task_rollups_day', 'day'),
+        Index('idx_task_rollups_assigned_to', 'assigned_to'),
+    )
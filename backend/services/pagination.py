@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination on (created_at, id), newest first
+
+A page is fetched with WHERE (created_at, id) < cursor ORDER BY created_at
+DESC, id DESC LIMIT n+1, which walks the (created_at, id) index straight
+to the page - no OFFSET scan, and no COUNT(*) unless the client asks for
+the total, which is then cached for a short while.
+
+Endpoints keep page-number (OFFSET) pagination by default; keyset paging
+is used once the client sends a cursor, or paginate=cursor for the first
+page (see wants_cursor).
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, or_, desc
+
+MAX_PER_PAGE = 100
+
+# Seconds an opt-in total stays cached per endpoint and filter set
+TOTAL_TTL = 30
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor pointing just after the given row"""
+    payload = json.dumps({'t': created_at.isoformat(), 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    The (created_at, id) a cursor points after
+    
+    Raises: ValueError if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['t']), int(payload['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def wants_cursor(args):
+    """Whether a request opted in to keyset paging: a cursor, or paginate=cursor"""
+    return bool(args.get('cursor')) or args.get('paginate') == 'cursor'
+
+def clamp_per_page(per_page):
+    return max(1, min(per_page or 20, MAX_PER_PAGE))
+
+def keyset_page(query, created_column, id_column, cursor=None, per_page=20):
+    """
+    One page of query after cursor, newest first
+    
+    Returns: (items, next_cursor) - next_cursor is None on the last page
+    """
+    per_page = clamp_per_page(per_page)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # The outer <= bounds the index range scan; the OR breaks ties on id
+        query = query.filter(and_(
+            created_column <= created_at,
+            or_(created_column < created_at, id_column < row_id)
+        ))
+    
+    rows = query.order_by(desc(created_column), desc(id_column)).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    return items, next_cursor
+
+class TotalCache:
+    """Short-lived cache of COUNT(*) results, keyed by endpoint and filters"""
+    
+    def __init__(self, ttl=TOTAL_TTL, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._totals = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, count):
+        """The cached total for key, or count() stored for next time"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._totals.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+        
+        total = count()
+        with self._lock:
+            if len(self._totals) >= self.max_entries:
+                self._totals = {k: v for k, v in self._totals.items() if v[1] > now}
+                if len(self._totals) >= self.max_entries:
+                    self._totals.clear()
+            self._totals[key] = (total, now + self.ttl)
+        return total
+
+total_cache = TotalCache()
@@ -0,0 +1,175 @@
+"""
+Incrementally maintained task analytics rollups
+
+Every task contributes one row's worth of counts to the task_rollups
+group it falls in. The task endpoints call these helpers inside their own
+transaction, so the rollups commit (or roll back) together with the task
+change, and dashboard reads only have to aggregate over groups.
+"""
+from collections import defaultdict
+from datetime import timedelta, timezone
+from sqlalchemy import func, case, cast, literal_column, Numeric
+from backend.models.task import Task
+from backend.models.task_rollup import TaskRollup
+
+KEY_COLUMNS = ('project_id', 'assigned_to', 'status', 'priority', 'day')
+COUNT_COLUMNS = ('task_count', 'completed_count', 'completion_seconds')
+
+def _value(field):
+    """Enum members are stored by value, like the rest of the schema"""
+    if field is None:
+        return ''
+    return getattr(field, 'value', field)
+
+def _naive_utc(when):
+    """created_at is stored naive, completed_at may come in tz-aware"""
+    if when is not None and when.tzinfo is not None:
+        return when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+def duration_seconds(session, start, end):
+    """SQL expression for the seconds between two timestamp columns, per dialect"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return func.extract('epoch', end - start)
+    if dialect == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    if dialect in ('mysql', 'mariadb'):
+        # SECOND would truncate fractional seconds; keep them, like the other dialects
+        return func.timestampdiff(literal_column('MICROSECOND'), start, end) / 1000000
+    raise ValueError(f"Unsupported database dialect: {dialect}")
+
+def whole_seconds(delta):
+    """
+    A timedelta in whole seconds, rounded exactly as completion_seconds() rounds in SQL
+    
+    Rounds half away from zero to milliseconds, then to seconds.
+    """
+    micros = abs(delta // timedelta(microseconds=1))
+    seconds = ((micros + 500) // 1000 + 500) // 1000
+    return seconds if delta >= timedelta(0) else -seconds
+
+def completion_seconds(session, start, end):
+    """SQL counterpart of whole_seconds(end - start), so rebuild() stores what contribution() adds"""
+    # Milliseconds first: SQLite's julianday difference is only exact to about that
+    return func.round(func.round(cast(duration_seconds(session, start, end), Numeric), 3))
+
+def contribution(task):
+    """
+    The rollup group a task counts towards and what it adds to it
+    
+    Every task counts, soft-deleted or not, as the task queries always have;
+    completion time counts when completed_at is set.
+    
+    Returns: (key, (task_count, completed_count, completion_seconds))
+    """
+    created_at = _naive_utc(task.created_at)
+    completed_at = _naive_utc(task.completed_at)
+    key = (
+        task.project_id or 0,
+        task.assigned_to or 0,
+        _value(task.status),
+        _value(task.priority),
+        created_at.date(),
+    )
+    if completed_at is not None:
+        return key, (1, 1, whole_seconds(completed_at - created_at))
+    return key, (1, 0, 0)
+
+class RollupDelta:
+    """
+    Net rollup changes of one request, applied with one upsert per group
+    
+    Usage: take contribution(task) before a change, call
+    delta.move(before, contribution(task)) after it, then delta.apply(session)
+    before committing.
+    """
+    
+    def __init__(self):
+        self._changes = defaultdict(lambda: [0, 0, 0])
+    
+    def add(self, entry, sign=1):
+        key, counts = entry
+        change = self._changes[key]
+        for i, count in enumerate(counts):
+            change[i] += sign * count
+    
+    def remove(self, entry):
+        self.add(entry, -1)
+    
+    def move(self, before, after):
+        if before != after:
+            self.remove(before)
+            self.add(after)
+    
+    def apply(self, session):
+        """Upsert every group that changed, then drop groups left empty"""
+        emptied = []
+        for key, counts in self._changes.items():
+            if not any(counts):
+                continue
+            _upsert(session, key, counts)
+            if counts[0] < 0:
+                emptied.append(key)
+        
+        for key in emptied:
+            session.query(TaskRollup).filter(
+                *[getattr(TaskRollup, column) == value for column, value in zip(KEY_COLUMNS, key)],
+                TaskRollup.task_count <= 0
+            ).delete(synchronize_session=False)
+        self._changes.clear()
+
+def _upsert(session, key, counts):
+    """Add counts to a group's row, creating it if needed, in one statement"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        raise ValueError(f"Unsupported database dialect: {dialect}")
+    
+    table = TaskRollup.__table__
+    stmt = insert(table).values(**dict(zip(KEY_COLUMNS, key)), **dict(zip(COUNT_COLUMNS, counts)))
+    
+    if dialect in ('mysql', 'mariadb'):
+        stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in COUNT_COLUMNS})
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={c: table.c[c] + stmt.excluded[c] for c in COUNT_COLUMNS}
+        )
+    session.execute(stmt)
+
+def rebuild(session):
+    """
+    Recompute every rollup from the tasks table (backfill, or repair drift)
+    
+    Runs as one DELETE plus one INSERT ... SELECT in the caller's transaction.
+    Returns: number of groups written
+    """
+    completed = Task.completed_at.isnot(None)
+    groups = session.query(
+        func.coalesce(Task.project_id, 0),
+        func.coalesce(Task.assigned_to, 0),
+        Task.status,
+        func.coalesce(Task.priority, ''),
+        func.date(Task.created_at),
+        func.count(Task.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.coalesce(func.sum(case((completed, completion_seconds(session, Task.created_at, Task.completed_at)))), 0),
+    ).group_by(
+        func.coalesce(Task.project_id, 0),
+        func.coalesce(Task.assigned_to, 0),
+        Task.status,
+        func.coalesce(Task.priority, ''),
+        func.date(Task.created_at),
+    )
+    
+    session.query(TaskRollup).delete(synchronize_session=False)
+    session.execute(
+        TaskRollup.__table__.insert().from_select(list(KEY_COLUMNS + COUNT_COLUMNS), groups.statement)
+    )
+    return session.query(func.count()).select_from(TaskRollup).scalar()
@@ -0,0 +1,171 @@
+"""
+Indexed, relevance-ranked search over task titles and descriptions
+
+Each dialect gets the index it is good at:
+- postgresql: a GIN full-text index on title + description, plus a
+  pg_trgm index on title so near-miss spellings still match
+- sqlite: an FTS5 table over tasks, kept in sync by triggers
+- mysql: a FULLTEXT index (database/migrations/add_tasks_search_index.sql)
+
+All three are maintained by the database on every task insert, update and
+delete. Other dialects, a database where the index was never created, or a
+search with no indexable words fall back to the old ILIKE scan.
+
+Title matches rank above description matches on Postgres and SQLite. The
+MySQL FULLTEXT index covers both columns as one, so ranking there is
+unweighted.
+"""
+import re
+import time
+import weakref
+from sqlalchemy import or_, desc, func, literal_column, table, column, text
+from backend.models.task import Task
+
+# Title matches count this many times more than description matches (Postgres and SQLite)
+TITLE_WEIGHT = 10.0
+
+# Must stay identical to the indexed expression for Postgres to use the index
+PG_DOCUMENT = "to_tsvector('english', coalesce(tasks.title, '') || ' ' || coalesce(tasks.description, ''))"
+
+# Ranking only: the same words with the title weighted A and the description D.
+# It is computed for matching rows alone, so it needs no index of its own.
+PG_RANKED_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(tasks.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tasks.description, '')), 'D')"
+)
+# ts_rank_cd weights for {D, C, B, A}, each at most 1.0
+PG_RANK_WEIGHTS = f"'{{{1 / TITLE_WEIGHT}, 0.2, 0.4, 1.0}}'::float4[]"
+
+SCHEMA = {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS idx_tasks_search_fts ON tasks USING GIN (({PG_DOCUMENT}))",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_title_trgm ON tasks USING GIN (title gin_trgm_ops)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+        "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        # Index the rows that existed before the triggers
+        "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+    ],
+    'mysql': [
+        "ALTER TABLE tasks ADD FULLTEXT INDEX idx_tasks_search (title, description)",
+    ],
+}
+SCHEMA['mariadb'] = SCHEMA['mysql']
+
+tasks_fts = table('tasks_fts', column('rowid'), column('tasks_fts'))
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+def search_words(term):
+    return _WORD.findall(term or '')
+
+def fts5_query(term):
+    """
+    An FTS5 MATCH expression for free text: every word must appear, the
+    last one as a prefix (so results show up while typing). Words are
+    quoted, so FTS5 syntax in the term is matched literally.
+    """
+    words = search_words(term)
+    if not words:
+        return None
+    quoted = ['"' + word.replace('"', '""') + '"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def create_index(session):
+    """Create the search index for the session's dialect (safe to re-run on Postgres and SQLite)"""
+    dialect = session.get_bind().dialect.name
+    if dialect not in SCHEMA:
+        raise ValueError(f"Unsupported database dialect: {dialect}")
+    for statement in SCHEMA[dialect]:
+        session.execute(text(statement))
+    _index_checks.pop(session.get_bind().engine, None)
+    return dialect
+
+# A row back means the dialect's index (and on Postgres, pg_trgm) is in place
+INDEX_CHECKS = {
+    'postgresql': "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'tasks' "
+                  "AND indexname IN ('idx_tasks_search_fts', 'idx_tasks_title_trgm') "
+                  "HAVING COUNT(DISTINCT indexname) = 2",
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'",
+    'mysql': "SELECT 1 FROM information_schema.STATISTICS WHERE table_schema = DATABASE() "
+             "AND table_name = 'tasks' AND index_name = 'idx_tasks_search' LIMIT 1",
+}
+INDEX_CHECKS['mariadb'] = INDEX_CHECKS['mysql']
+
+# Seconds a missing index is remembered before the catalog is asked again,
+# so an index built later (flask tasks build-search-index) gets picked up
+MISSING_INDEX_TTL = 60
+
+# engine -> (index exists, time.monotonic() of the check)
+_index_checks = weakref.WeakKeyDictionary()
+
+def index_exists(session):
+    """
+    Whether the search index for the session's dialect has been created
+    
+    The catalog is queried once per engine rather than per search: an index
+    that exists is remembered for good, a missing one for MISSING_INDEX_TTL.
+    """
+    bind = session.get_bind()
+    check = INDEX_CHECKS.get(bind.dialect.name)
+    if check is None:
+        return False
+    
+    now = time.monotonic()
+    known = _index_checks.get(bind.engine)
+    if known is not None and (known[0] or now - known[1] < MISSING_INDEX_TTL):
+        return known[0]
+    
+    exists = session.execute(text(check)).first() is not None
+    _index_checks[bind.engine] = (exists, now)
+    return exists
+
+def apply(session, query, term):
+    """
+    Filter a Task query down to tasks matching term
+    
+    Returns: (query, order) - order is the relevance ordering to use
+    (best match first), or None for the unranked ILIKE fallback
+    """
+    dialect = session.get_bind().dialect.name
+    indexed = bool(search_words(term)) and index_exists(session)
+    
+    if dialect == 'postgresql' and indexed:
+        document = literal_column(PG_DOCUMENT)
+        ts_query = func.websearch_to_tsquery('english', term)
+        query = query.filter(or_(
+            document.op('@@')(ts_query),
+            Task.title.op('%')(term)
+        ))
+        ranked = func.ts_rank_cd(literal_column(PG_RANK_WEIGHTS), literal_column(PG_RANKED_DOCUMENT), ts_query)
+        return query, desc(ranked + func.similarity(Task.title, term))
+    
+    if dialect == 'sqlite' and indexed:
+        query = query.join(tasks_fts, tasks_fts.c.rowid == Task.id).filter(
+            tasks_fts.c.tasks_fts.op('MATCH')(fts5_query(term))
+        )
+        # bm25() is lower for better matches
+        return query, func.bm25(literal_column('tasks_fts'), TITLE_WEIGHT, 1.0)
+    
+    if dialect in ('mysql', 'mariadb') and indexed:
+        from sqlalchemy.dialects.mysql import match as mysql_match
+        match = mysql_match(Task.title, Task.description, against=term)
+        return query.filter(match > 0), desc(match)
+    
+    query = query.filter(or_(
+        Task.title.ilike(f'%{term}%'),
+        Task.description.ilike(f'%{term}%')
+    ))
+    return query, None
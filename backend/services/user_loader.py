@@ -0,0 +1,54 @@
+"""
+Batched user lookups for serializers
+
+Serializers that show a user per row (activity feeds, lifecycles) collect
+the ids first and resolve them with one IN query, instead of a query per
+row. Users already loaded are kept for the rest of the request.
+"""
+
+class UserLoader:
+    """
+    Per-request identity cache of users, filled one IN query at a time
+    
+    Usage: loader.load(row.user_id for row in rows), then loader.get(id)
+    while serializing - get() never queries, so unknown ids give None.
+    """
+    
+    def __init__(self, session, user_model):
+        self.session = session
+        self.user_model = user_model
+        self._users = {}
+    
+    def load(self, user_ids):
+        """Fetch every user in user_ids not loaded yet, in a single query"""
+        missing = {user_id for user_id in user_ids if user_id is not None} - self._users.keys()
+        if missing:
+            User = self.user_model
+            for user in self.session.query(User).filter(User.id.in_(missing)):
+                self._users[user.id] = user
+            # Remember ids with no user too, so they aren't asked for again
+            for user_id in missing:
+                self._users.setdefault(user_id, None)
+        return self
+    
+    def get(self, user_id):
+        return self._users.get(user_id)
+    
+    def summary(self, user_id):
+        """The {id, username, email} dict the task API embeds for a user, or None"""
+        user = self.get(user_id)
+        if user is None:
+            return None
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email
+        }
+
+def request_user_loader(session, user_model):
+    """The Flask request's shared UserLoader, created on first use"""
+    from flask import g
+    loader = g.get('user_loader')
+    if loader is None:
+        loader = g.user_loader = UserLoader(session, user_model)
+    return loader
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark GitHubHandler clone strategies on a locally generated repo
+
+Usage:
+    python benchmarks/bench_clone_strategies.py [--dirs 40] [--files 50] [--commits 30] [--blob-kb 16]
+
+Builds a throwaway repo with many directories and a long history of
+fat commits, then times a cold clone_or_pull with each strategy and
+reports wall time and on-disk size.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_core.clone_strategies import CloneStrategy
+from agent_core.github_handler import GitHubHandler
+
+
+def git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_repo(path, dirs, files, commits, blob_kb):
+    """Create a repo with dirs*files files rewritten over `commits` commits"""
+    path.mkdir(parents=True)
+    git(path, 'init', '-q', '-b', 'main')
+    git(path, 'config', 'user.email', 'bench@example.com')
+    git(path, 'config', 'user.name', 'bench')
+    # Needed for partial clones over file://
+    git(path, 'config', 'uploadpack.allowFilter', 'true')
+    git(path, 'config', 'uploadpack.allowAnySHA1InWant', 'true')
+    
+    rng = random.Random(42)
+    all_files = [path / f"pkg{d:03d}" / f"module{f:03d}.py" for d in range(dirs) for f in range(files)]
+    
+    for commit in range(commits):
+        # First commit writes everything, later ones rewrite a random 10%
+        touched = all_files if commit == 0 else rng.sample(all_files, max(1, len(all_files) // 10))
+        for file in touched:
+            file.parent.mkdir(exist_ok=True)
+            file.write_bytes(os.urandom(blob_kb * 512).hex().encode())
+        git(path, 'add', '-A')
+        git(path, 'commit', '-q', '-m', f'commit {commit}')
+    
+    return [str(f.relative_to(path)) for f in all_files]
+
+
+def du(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def run(name, strategy, url, work, sparse_paths, warm_mirror=False):
+    workspace = work / name.replace(' ', '-').replace('(', '').replace(')', '')
+    handler = GitHubHandler('token', 'user', workspace, clone_strategy=strategy)
+    
+    if warm_mirror:
+        # Mirror already exists from an earlier task - only its refresh is timed
+        strategy.update_mirror(url, 'source')
+    
+    started = time.perf_counter()
+    repo_path = handler.clone_or_pull(url, 'main', sparse_paths=sparse_paths)
+    elapsed = time.perf_counter() - started
+    
+    if not repo_path:
+        return f"{name:<28} FAILED"
+    
+    checked_out = sum(1 for p in Path(repo_path).rglob('*.py'))
+    return f"{name:<28} {elapsed:8.2f}s {du(repo_path) / 1e6:10.1f} MB {checked_out:8d} files"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dirs', type=int, default=40)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--commits', type=int, default=30)
+    parser.add_argument('--blob-kb', type=int, default=16)
+    args = parser.parse_args()
+    
+    work = Path(tempfile.mkdtemp(prefix='lmnh-clone-bench-'))
+    
+    try:
+        print(f"Building repo: {args.dirs} dirs x {args.files} files, {args.commits} commits, {args.blob_kb} KB blobs...")
+        source = work / 'source'
+        files = build_repo(source, args.dirs, args.files, args.commits, args.blob_kb)
+        url = source.resolve().as_uri()
+        print(f"Source repo: {du(source / '.git') / 1e6:.1f} MB of objects\n")
+        
+        # A typical plan touches a handful of files in a couple of directories
+        sparse_paths = files[:3] + files[-2:]
+        mirror_dir = work / 'mirrors'
+        
+        strategies = [
+            ('full', CloneStrategy(), False),
+            ('shallow (depth=1)', CloneStrategy(depth=1), False),
+            ('blobless', CloneStrategy(blobless=True), False),
+            ('blobless + sparse', CloneStrategy(blobless=True, sparse=True), False),
+            ('shallow + blobless + sparse', CloneStrategy(depth=1, blobless=True, sparse=True), False),
+            ('mirror (warm)', CloneStrategy(mirror_dir=mirror_dir), True),
+            ('mirror + sparse (warm)', CloneStrategy(sparse=True, mirror_dir=mirror_dir), True),
+        ]
+        
+        print(f"{'strategy':<28} {'time':>9} {'disk':>13} {'checkout':>14}")
+        for name, strategy, warm in strategies:
+            print(run(name, strategy, url, work, sparse_paths, warm))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
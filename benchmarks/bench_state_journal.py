@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark API server restart time with a persistent state journal
+
+Usage:
+    python benchmarks/bench_state_journal.py [--events 1000000] [--snapshot-every 10000]
+
+Feeds a stream of task/log/status events through the API server in
+persistent mode, then restarts it in a fresh interpreter and reports how
+long the snapshot load and journal replay take.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+WRITE_SCRIPT = '''
+import sys, time
+from agent_core import api_server as s
+
+events = int(sys.argv[1])
+started = time.perf_counter()
+with s.state_lock:
+    for i in range(events):
+        kind = i % 4
+        if kind == 0:
+            s.record_event({"type": "task_add", "id": f"t{i}", "title": f"Task {i}", "status": "in_progress"})
+        elif kind == 1:
+            s.record_event({"type": "status", "status": "working", "current_task": f"Task {i}", "progress": i % 100})
+        elif kind == 2:
+            s.record_event({"type": "log", "level": "info", "message": f"Progress on {i}"})
+        else:
+            s.record_event({"type": "task_update", "id": f"t{i - 3}", "status": "completed"})
+        if i % 1000 == 0 and s.journal.n - s.journal.snapshot_n >= s.journal.snapshot_every:
+            # What the journal thread does between requests; done inline so
+            # this tight loop can't starve it of the lock
+            s.take_snapshot()
+elapsed = time.perf_counter() - started
+s.close_state()
+print(f"{events / elapsed:.0f}")
+'''
+
+RESTART_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+from agent_core import api_server as s
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "restore": s.restore_seconds,
+    "journal": s.journal.stats(),
+    "tasks": len(s.task_store),
+}))
+s.close_state()
+'''
+
+
+def du(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+
+def python(script, env, *args):
+    result = subprocess.run(
+        [sys.executable, '-c', script, *args],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--snapshot-every', type=int, default=10000)
+    args = parser.parse_args()
+    
+    work = Path(tempfile.mkdtemp(prefix='lmnh-journal-bench-'))
+    env = dict(
+        os.environ,
+        LMNH_STATE_MODE='persistent',
+        LMNH_STATE_DIR=str(work / 'state'),
+        LMNH_STATE_SNAPSHOT_EVERY=str(args.snapshot_every),
+        LMNH_TASK_SPILL_FILE=str(work / 'spill.jsonl'),
+    )
+    
+    try:
+        print(f"Writing {args.events:,} events (snapshot every {args.snapshot_every:,})...")
+        rate = python(WRITE_SCRIPT, env, str(args.events))
+        print(f"Ingest: {int(rate):,} events/s, state dir {du(work / 'state') / 1e6:.1f} MB\n")
+        
+        for attempt in range(3):
+            restart = json.loads(python(RESTART_SCRIPT, env))
+            journal = restart['journal']
+            print(
+                f"Restart {attempt + 1}: {restart['restore']:.3f}s restoring state, "
+                f"{restart['seconds']:.3f}s including imports "
+                f"(snapshot at {journal['snapshot_at']:,}, {journal['segments']} segment(s), "
+                f"{restart['tasks']} tasks in memory)"
+            )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /tasks/analytics queries on a seeded SQLite database
+
+Usage:
+    python benchmarks/bench_task_analytics.py [--rows 2000000] [--repeat 3] [--writes 5000]
+
+Seeds a tasks table shaped like database/migrations/create_tasks_table.sql
+and times the three ways the endpoint has computed its numbers:
+
+- per-count queries: a COUNT per status and per priority, three more
+  counts, and every completed task loaded to average its duration in Python
+- single aggregate (what it does now): one conditional-sum pass over tasks
+- rollups: a GROUP BY over task_rollups plus the overdue count, which
+  depends on the clock and still reads tasks. The endpoint doesn't use
+  this: task_rollups is grouped as finely as the dashboard filters need,
+  so it holds only a few tasks per group and reading it saves nothing
+
+All three must produce the same numbers. It then times task updates with
+and without the rollup upserts that ride along in the same transaction,
+to show what keeping the dashboard rollups costs per write.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+STATUSES = ["backlog", "todo", "in_progress", "in_review", "testing", "completed", "blocked", "cancelled"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def seed(conn, rows):
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT NOT NULL);
+        CREATE TABLE tasks (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            assigned_to INTEGER,
+            created_by INTEGER NOT NULL,
+            due_date TIMESTAMP,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            completed_at TIMESTAMP
+        );
+    """)
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [(i, f"user{i}") for i in range(1, 51)])
+    
+    rng = random.Random(42)
+    now = datetime.now()
+    
+    def generate():
+        for i in range(1, rows + 1):
+            created = now - timedelta(seconds=rng.randrange(365 * 86400))
+            status = rng.choice(STATUSES)
+            completed = created + timedelta(seconds=rng.randrange(30 * 86400)) if status == "completed" else None
+            due = created + timedelta(days=rng.randrange(1, 60)) if rng.random() < 0.7 else None
+            yield (
+                i, f"Task {i}", "Seeded task", status, rng.choice(PRIORITIES),
+                rng.randrange(1, 51), rng.randrange(1, 51),
+                due.strftime(FMT) if due else None,
+                created.strftime(FMT), created.strftime(FMT),
+                completed.strftime(FMT) if completed else None,
+            )
+    
+    conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", generate())
+    conn.executescript("""
+        CREATE INDEX idx_tasks_status ON tasks (status);
+        CREATE INDEX idx_tasks_assigned_to ON tasks (assigned_to);
+        CREATE INDEX idx_tasks_due_date ON tasks (due_date);
+        CREATE INDEX idx_tasks_created_at ON tasks (created_at);
+        ANALYZE;
+    """)
+    conn.commit()
+
+
+def old_analytics(conn, now, start_of_month):
+    """One query per number, and every completed row pulled into Python"""
+    count = lambda sql, *args: conn.execute(sql, args).fetchone()[0]
+    
+    status_counts = {s: count("SELECT COUNT(*) FROM tasks WHERE status = ?", s) for s in STATUSES}
+    priority_counts = {p: count("SELECT COUNT(*) FROM tasks WHERE priority = ?", p) for p in PRIORITIES}
+    overdue = count("SELECT COUNT(*) FROM tasks WHERE due_date < ? AND status != 'completed'", now)
+    month_total = count("SELECT COUNT(*) FROM tasks WHERE created_at >= ?", start_of_month)
+    month_completed = count(
+        "SELECT COUNT(*) FROM tasks WHERE created_at >= ? AND status = 'completed'", start_of_month
+    )
+    
+    # .all() loads whole Task rows
+    completed = conn.execute(
+        "SELECT * FROM tasks WHERE status = 'completed' AND completed_at IS NOT NULL"
+    ).fetchall()
+    total_hours = 0
+    for row in completed:
+        total_hours += (datetime.strptime(row[10], FMT) - datetime.strptime(row[8], FMT)).total_seconds() / 3600
+    avg_hours = total_hours / len(completed) if completed else 0
+    
+    return status_counts, priority_counts, overdue, month_total, month_completed, round(avg_hours, 2)
+
+
+def new_analytics(conn, now, start_of_month):
+    """The single aggregate the endpoint now runs (as compiled for SQLite)"""
+    columns = [f"COALESCE(SUM(CASE WHEN status = '{s}' THEN 1 ELSE 0 END), 0)" for s in STATUSES]
+    columns += [f"COALESCE(SUM(CASE WHEN priority = '{p}' THEN 1 ELSE 0 END), 0)" for p in PRIORITIES]
+    columns += [
+        "COALESCE(SUM(CASE WHEN due_date < :now AND status != 'completed' THEN 1 ELSE 0 END), 0)",
+        "COALESCE(SUM(CASE WHEN created_at >= :month THEN 1 ELSE 0 END), 0)",
+        "COALESCE(SUM(CASE WHEN created_at >= :month AND status = 'completed' THEN 1 ELSE 0 END), 0)",
+        "AVG(CASE WHEN status = 'completed' AND completed_at IS NOT NULL "
+        "THEN (julianday(completed_at) - julianday(created_at)) * 86400 END)",
+    ]
+    row = conn.execute(f"SELECT {', '.join(columns)} FROM tasks", {"now": now, "month": start_of_month}).fetchone()
+    
+    statuses = len(STATUSES)
+    priorities = len(PRIORITIES)
+    return (
+        dict(zip(STATUSES, row[:statuses])),
+        dict(zip(PRIORITIES, row[statuses:statuses + priorities])),
+        row[-4], row[-3], row[-2],
+        round((row[-1] or 0) / 3600, 2),
+    )
+
+
+def build_rollups(conn):
+    """task_rollups as `flask tasks rebuild-rollups` fills it (SQLite flavour)"""
+    conn.executescript("""
+        CREATE TABLE task_rollups (
+            project_id INTEGER NOT NULL DEFAULT 0,
+            assigned_to INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL DEFAULT '',
+            day DATE NOT NULL,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            completed_count INTEGER NOT NULL DEFAULT 0,
+            completion_seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, assigned_to, status, priority, day)
+        );
+        INSERT INTO task_rollups
+        SELECT 0, COALESCE(assigned_to, 0), status, COALESCE(priority, ''), date(created_at), COUNT(*),
+               SUM(CASE WHEN completed_at IS NOT NULL THEN 1 ELSE 0 END),
+               COALESCE(SUM(CASE WHEN completed_at IS NOT NULL
+                   THEN CAST(ROUND(ROUND((julianday(completed_at) - julianday(created_at)) * 86400, 3)) AS INTEGER) END), 0)
+        FROM tasks
+        GROUP BY COALESCE(assigned_to, 0), status, COALESCE(priority, ''), date(created_at);
+        CREATE INDEX idx_task_rollups_day ON task_rollups (day);
+    """)
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM task_rollups").fetchone()[0]
+
+
+def rollup_analytics(conn, now, start_of_month):
+    """The same numbers read from task_rollups, folded the same way in Python"""
+    groups = conn.execute("""
+        SELECT status, priority, day >= date(:month) AS this_month,
+               SUM(task_count), SUM(completed_count), SUM(completion_seconds)
+        FROM task_rollups
+        GROUP BY status, priority, this_month
+    """, {"month": start_of_month}).fetchall()
+    
+    status_counts = dict.fromkeys(STATUSES, 0)
+    priority_counts = dict.fromkeys(PRIORITIES, 0)
+    month_total = month_completed = timed = seconds = 0
+    for status, priority, this_month, tasks, completed, completion_seconds in groups:
+        status_counts[status] += tasks
+        priority_counts[priority] += tasks
+        if this_month:
+            month_total += tasks
+            if status == "completed":
+                month_completed += tasks
+        if status == "completed":
+            timed += completed
+            seconds += completion_seconds
+    
+    overdue = conn.execute(
+        "SELECT COUNT(*) FROM tasks WHERE due_date < ? AND status != 'completed'", (now,)
+    ).fetchone()[0]
+    avg_hours = seconds / timed / 3600 if timed else 0
+    return status_counts, priority_counts, overdue, month_total, month_completed, round(avg_hours, 2)
+
+
+UPSERT = """
+    INSERT INTO task_rollups VALUES (0, ?, ?, ?, date(?), ?, 0, 0)
+    ON CONFLICT DO UPDATE SET task_count = task_count + excluded.task_count
+"""
+
+
+def time_writes(conn, writes, with_rollups):
+    """Seconds per status change, one transaction each like update_task"""
+    rng = random.Random(7)
+    rows = conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0]
+    started = time.perf_counter()
+    for _ in range(writes):
+        task_id = rng.randrange(1, rows + 1)
+        new_status = rng.choice(STATUSES[:5])
+        assigned_to, status, priority, created_at = conn.execute(
+            "SELECT assigned_to, status, priority, created_at FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id))
+        if with_rollups:
+            # RollupDelta.move: one upsert out of the old group, one into the new
+            conn.execute(UPSERT, (assigned_to, status, priority, created_at, -1))
+            conn.execute(UPSERT, (assigned_to, new_status, priority, created_at, 1))
+        conn.commit()
+    return (time.perf_counter() - started) / writes
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--writes', type=int, default=5000)
+    args = parser.parse_args()
+    
+    fd, path = tempfile.mkstemp(prefix='lmnh-analytics-bench-', suffix='.db')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        print(f"Seeding {args.rows:,} tasks...")
+        seed(conn, args.rows)
+        
+        now = datetime.now()
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).strftime(FMT)
+        now = now.strftime(FMT)
+        
+        groups = build_rollups(conn)
+        # The read scans groups, not tasks: the fewer tasks per group, the less it gains
+        print(f"Rolled up into {groups:,} groups ({args.rows / groups:.1f} tasks per group)")
+        
+        old_time, old_result = best_of(args.repeat, old_analytics, conn, now, start_of_month)
+        new_time, new_result = best_of(args.repeat, new_analytics, conn, now, start_of_month)
+        rollup_time, rollup_result = best_of(args.repeat, rollup_analytics, conn, now, start_of_month)
+        assert old_result == new_result == rollup_result, (old_result, new_result, rollup_result)
+        
+        print(f"Per-count queries + Python average: {old_time * 1000:8.1f} ms")
+        print(f"Single aggregate (current endpoint): {new_time * 1000:7.1f} ms")
+        print(f"Rollup read:                        {rollup_time * 1000:8.1f} ms")
+        print(f"Rollup read takes {rollup_time / old_time:.2f}x the per-count time and "
+              f"{rollup_time / new_time:.2f}x the single aggregate's (results identical)")
+        
+        plain = time_writes(conn, args.writes, with_rollups=False)
+        maintained = time_writes(conn, args.writes, with_rollups=True)
+        print(f"Task update:                        {plain * 1e6:8.1f} us")
+        print(f"Task update + rollup upserts:       {maintained * 1e6:8.1f} us "
+              f"({(maintained - plain) * 1e6:+.1f} us per write)")
+        conn.close()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark deep pages of the tasks list on a seeded SQLite database
+
+Usage:
+    python benchmarks/bench_task_pagination.py [--rows 1000000] [--per-page 20] [--repeat 3]
+
+Compares the page-number pagination GET /tasks does by default (OFFSET
+plus a COUNT(*) per request) with the keyset pagination clients get by
+sending a cursor or paginate=cursor (seek past the (created_at, id)
+cursor, no count), at increasing depths. Both must return the same rows.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from bench_task_analytics import seed, best_of
+
+ORDER = "ORDER BY created_at DESC, id DESC"
+
+
+def offset_page(conn, page, per_page):
+    total = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+    rows = conn.execute(
+        f"SELECT id, created_at FROM tasks {ORDER} LIMIT ? OFFSET ?", (per_page, (page - 1) * per_page)
+    ).fetchall()
+    return rows, total
+
+
+def keyset_page(conn, cursor, per_page):
+    if cursor is None:
+        return conn.execute(f"SELECT id, created_at FROM tasks {ORDER} LIMIT ?", (per_page + 1,)).fetchall()
+    created_at, row_id = cursor
+    return conn.execute(
+        f"SELECT id, created_at FROM tasks WHERE created_at <= ? AND (created_at < ? OR id < ?) {ORDER} LIMIT ?",
+        (created_at, created_at, row_id, per_page + 1)
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    fd, path = tempfile.mkstemp(prefix='lmnh-pagination-bench-', suffix='.db')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        print(f"Seeding {args.rows:,} tasks...")
+        seed(conn, args.rows)
+        conn.execute("CREATE INDEX idx_tasks_created_at_id ON tasks (created_at, id)")
+        
+        print(f"{'page':>8} {'offset + count':>16} {'keyset':>10}")
+        for page in (1, 10, 100, 1000, args.rows // args.per_page // 2):
+            old_time, (old_rows, _) = best_of(args.repeat, offset_page, conn, page, args.per_page)
+            
+            # The cursor a client would hold after reading the previous page
+            cursor = None
+            if page > 1:
+                cursor = conn.execute(
+                    f"SELECT created_at, id FROM tasks {ORDER} LIMIT 1 OFFSET ?", ((page - 1) * args.per_page - 1,)
+                ).fetchone()
+            new_time, new_rows = best_of(args.repeat, keyset_page, conn, cursor, args.per_page)
+            assert old_rows == new_rows[:args.per_page], page
+            
+            print(f"{page:>8} {old_time * 1000:>13.1f} ms {new_time * 1000:>7.2f} ms")
+        conn.close()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
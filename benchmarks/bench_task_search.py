@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark task search on a large synthetic SQLite corpus
+
+Usage:
+    python benchmarks/bench_task_search.py [--rows 500000] [--repeat 3]
+
+Seeds tasks with generated titles and descriptions, then times the search
+GET /tasks used to do (ILIKE '%term%' on title and description, a full
+table scan) against the FTS5 index and bm25 ranking it uses now. The index
+is created the way `flask tasks build-search-index` does, triggers and
+all, and a few writes check that it stays in sync.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+VOCABULARY = (
+    "dashboard agent deploy pipeline token cache latency retry webhook login oauth session "
+    "database migration index query timeout export import report chart metric alert queue "
+    "worker schedule billing invoice payment refund email notification template upload image "
+    "resize thumbnail search filter sort pagination cursor audit permission role admin user "
+    "profile settings theme mobile layout button modal form validation error crash memory leak"
+).split()
+FILLER = "the a to in of for on with when after before should could fix add update remove improve".split()
+SYLLABLES = "ka lo mi ne ru sa te vo zi pa do fe gu hi ja".split()
+
+# Same statements as backend/services/task_search.py SCHEMA['sqlite']
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+]
+
+SEARCHES = ["webhook", "oauth login", "memory leak", "thumbnail resize", "invoice refund email"]
+
+
+def vocabulary(rng, size=20000):
+    """
+    Words with Zipf-like frequencies, as in real text: the named words
+    spread through the ranks, the rest made-up three-syllable words
+    """
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(3)) for _ in range(size)]
+    for i, word in enumerate(VOCABULARY):
+        words[20 + i * 40] = word
+    cum_weights = []
+    total = 0.0
+    for rank in range(size):
+        total += 1 / (rank + 1)
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def sentence(rng, words, count):
+    terms = rng.choices(words[0], cum_weights=words[1], k=count)
+    return " ".join(term if rng.random() < 0.6 else rng.choice(FILLER) for term in terms)
+
+
+def seed(conn, rows):
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT NOT NULL, description TEXT, created_at TEXT)")
+    rng = random.Random(42)
+    words = vocabulary(rng)
+    conn.executemany(
+        "INSERT INTO tasks VALUES (?, ?, ?, datetime('now'))",
+        ((i, sentence(rng, words, 6).capitalize(), sentence(rng, words, 40)) for i in range(1, rows + 1))
+    )
+    conn.commit()
+
+
+def like_search(conn, term, limit=20):
+    pattern = f"%{term}%"
+    return conn.execute(
+        "SELECT id FROM tasks WHERE title LIKE ? OR description LIKE ? ORDER BY created_at DESC, id DESC LIMIT ?",
+        (pattern, pattern, limit)
+    ).fetchall()
+
+
+def fts_search(conn, term, limit=20):
+    words = ['"' + word + '"' for word in term.split()]
+    words[-1] += '*'
+    return conn.execute(
+        "SELECT tasks.id FROM tasks JOIN tasks_fts ON tasks_fts.rowid = tasks.id "
+        "WHERE tasks_fts MATCH ? ORDER BY bm25(tasks_fts, 10.0, 1.0), tasks.id DESC LIMIT ?",
+        (" ".join(words), limit)
+    ).fetchall()
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    fd, path = tempfile.mkstemp(prefix='lmnh-search-bench-', suffix='.db')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        print(f"Seeding {args.rows:,} tasks...")
+        seed(conn, args.rows)
+        
+        started = time.perf_counter()
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        print(f"Built FTS5 index in {time.perf_counter() - started:.1f}s")
+        
+        print(f"{'search':<24} {'ILIKE scan':>12} {'FTS5 + bm25':>12}")
+        for term in SEARCHES:
+            like_time, like_rows = best_of(args.repeat, like_search, conn, term)
+            fts_time, fts_rows = best_of(args.repeat, fts_search, conn, term)
+            print(f"{term:<24} {like_time * 1000:>9.1f} ms {fts_time * 1000:>9.1f} ms")
+        
+        # Writes go through the triggers
+        conn.execute("INSERT INTO tasks (title, description) VALUES ('Zyxwv importer', 'rare word')")
+        new_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        assert fts_search(conn, "zyxwv") == [(new_id,)]
+        conn.execute("UPDATE tasks SET title = 'Qwertz importer' WHERE id = ?", (new_id,))
+        assert fts_search(conn, "zyxwv") == [] and fts_search(conn, "qwertz") == [(new_id,)]
+        conn.execute("DELETE FROM tasks WHERE id = ?", (new_id,))
+        assert fts_search(conn, "qwertz") == []
+        print("Index stays in sync on insert, update and delete")
+        conn.close()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import DashboardLayout from '@/components/DashboardLayout';
 import AgentStatus from '@/components/AgentStatus';
 import TaskQueue from '@/components/TaskQueue';
@@ -61,8 +61,87 @@ export default function Dashboard() {
     successRate: 92,
   });
 
-  // Fetch agent status every 2 seconds
+  // Live updates pushed by the API - polling below is only the fallback
+  const [streaming, setStreaming] = useState(false);
+  const lastLogSeq = useRef<number | null>(null);
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return;
+    }
+
+    const source = new EventSource('http://localhost:8000/api/stream');
+
+    const upsertTask = (task: any) => {
+      setTasks((prev) => {
+        const index = prev.findIndex((t) => t.id === task.id);
+        if (index === -1) {
+          return [...prev, task].slice(-10);
+        }
+        const next = [...prev];
+        next[index] = task;
+        return next;
+      });
+    };
+
+    source.onopen = () => setStreaming(true);
+    // EventSource reconnects by itself (resuming via Last-Event-ID); poll until it does
+    source.onerror = () => setStreaming(false);
+
+    source.addEventListener('snapshot', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      setAgentData({
+        status: data.status,
+        currentTask: data.current_task,
+        progress: data.progress || 0,
+        uptime: data.uptime || '0h 0m',
+      });
+      setTasks(data.tasks);
+      setStats(data.stats);
+      setLogs(data.logs);
+      if (data.logs.length > 0) {
+        lastLogSeq.current = data.logs[data.logs.length - 1].seq;
+      }
+    });
+
+    source.addEventListener('status', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      setAgentData((prev) => ({
+        ...prev,
+        status: data.status,
+        currentTask: data.current_task,
+        progress: data.progress || 0,
+      }));
+    });
+
+    source.addEventListener('task', (event) => {
+      upsertTask(JSON.parse((event as MessageEvent).data));
+    });
+
+    source.addEventListener('log', (event) => {
+      const log = JSON.parse((event as MessageEvent).data);
+      setLogs((prev) => [...prev, log].slice(-100));
+      lastLogSeq.current = log.seq;
+    });
+
+    source.addEventListener('stats', (event) => {
+      setStats(JSON.parse((event as MessageEvent).data));
+    });
+
+    source.addEventListener('heartbeat', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      setAgentData((prev) => ({ ...prev, uptime: data.uptime }));
+    });
+
+    return () => source.close();
+  }, []);
+
+  // Fetch agent status every 2 seconds (when not streaming)
   useEffect(() => {
+    if (streaming) {
+      return;
+    }
+
     const fetchStatus = async () => {
       try {
         const response = await fetch('http://localhost:8000/api/status');
@@ -98,17 +177,31 @@ export default function Dashboard() {
     const interval = setInterval(fetchStatus, 2000);
 
     return () => clearInterval(interval);
-  }, []);
+  }, [streaming]);
 
-  // Fetch logs every 1 second
+  // Fetch new logs every 1 second - only entries after the last one we saw
   useEffect(() => {
+    if (streaming) {
+      return;
+    }
+
     const fetchLogs = async () => {
       try {
-        const response = await fetch('http://localhost:8000/api/logs');
+        const url = lastLogSeq.current === null
+          ? 'http://localhost:8000/api/logs'
+          : `http://localhost:8000/api/logs?since=${lastLogSeq.current}`;
+        const response = await fetch(url);
         if (response.ok) {
           const data = await response.json();
           if (data.logs) {
-            setLogs(data.logs);
+            if (lastLogSeq.current === null || data.reset) {
+              setLogs(data.logs.slice(-100));
+            } else if (data.logs.length > 0) {
+              setLogs((prev) => [...prev, ...data.logs].slice(-100));
+            }
+          }
+          if (typeof data.last_seq === 'number') {
+            lastLogSeq.current = data.last_seq;
           }
         }
       } catch (error) {
@@ -118,7 +211,7 @@ export default function Dashboard() {
 
     const interval = setInterval(fetchLogs, 1000);
     return () => clearInterval(interval);
-  }, []);
+  }, [streaming]);
 
   return (
     <DashboardLayout>
@@ -187,21 +187,54 @@ export default function ChatModal({ isOpen, onClose }: ChatModalProps) {
       const response = await fetch('http://localhost:8000/api/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: input }),
+        body: JSON.stringify({ message: input, stream: true }),
       });
 
-      if (response.ok) {
-        const data = await response.json();
-        const assistantMessage: Message = {
-          role: 'assistant',
-          content: data.response,
-          timestamp: new Date().toLocaleTimeString(),
-          mood: detectMood(data.response),
-        };
-        setMessages(prev => [...prev, assistantMessage]);
-      } else {
+      if (!response.ok || !response.body) {
         throw new Error('API error');
       }
+
+      // Show the reply as it streams in, token by token
+      const timestamp = new Date().toLocaleTimeString();
+      let content = '';
+      setMessages(prev => [...prev, { role: 'assistant', content, timestamp }]);
+      setLoading(false);
+
+      const showReply = (mood?: Message['mood']) => {
+        setMessages(prev => [
+          ...prev.slice(0, -1),
+          { role: 'assistant', content, timestamp, mood },
+        ]);
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop() || '';
+
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!data) continue;
+
+          if (event === 'token') {
+            content += JSON.parse(data).text;
+            showReply();
+          } else if (event === 'error') {
+            content += ' *connection wobbles*';
+            showReply('confused');
+          }
+        }
+      }
+
+      showReply(detectMood(content));
     } catch (error) {
       console.log('Chat API not available');
       const fallbackMessage: Message = {
@@ -0,0 +1,5 @@
+-- Keyset pagination seeks on (created_at, id), newest first
+CREATE INDEX idx_tasks_created_at_id ON tasks (created_at, id);
+
+-- Activity feed of one entity, newest first
+CREATE INDEX idx_activity_logs_entity_created_at_id ON activity_logs (entity_type, entity_id, created_at, id);
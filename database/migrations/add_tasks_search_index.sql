@@ -0,0 +1,3 @@
+-- Full-text index behind GET /tasks?search= (ranked with MATCH ... AGAINST)
+-- Postgres and SQLite get theirs from `flask tasks build-search-index`
+ALTER TABLE tasks ADD FULLTEXT INDEX idx_tasks_search (title, description);
@@ -0,0 +1,33 @@
+CREATE TABLE IF NOT EXISTS task_rollups (
+    project_id INTEGER NOT NULL DEFAULT 0,
+    assigned_to INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(50) NOT NULL,
+    priority VARCHAR(20) NOT NULL DEFAULT '',
+    day DATE NOT NULL,
+    task_count INTEGER NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    completion_seconds BIGINT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (project_id, assigned_to, status, priority, day),
+    INDEX idx_task_rollups_day (day),
+    INDEX idx_task_rollups_assigned_to (assigned_to)
+);
+
+-- Fill from existing tasks, so dashboards have counts as soon as this runs.
+-- Same rules as backend/services/task_rollups.py (and `flask tasks
+-- rebuild-rollups`, which can be re-run to repair drift): every row counts,
+-- a task is timed when completed_at is set, and completion time is rounded
+-- half away from zero to milliseconds, then to whole seconds.
+INSERT INTO task_rollups (project_id, assigned_to, status, priority, day, task_count, completed_count, completion_seconds)
+SELECT
+    COALESCE(project_id, 0),
+    COALESCE(assigned_to, 0),
+    status,
+    COALESCE(priority, ''),
+    DATE(created_at),
+    COUNT(*),
+    SUM(CASE WHEN completed_at IS NOT NULL THEN 1 ELSE 0 END),
+    COALESCE(SUM(CASE WHEN completed_at IS NOT NULL
+        THEN ROUND(ROUND(TIMESTAMPDIFF(MICROSECOND, created_at, completed_at) / 1000000, 3)) END), 0)
+FROM tasks
+GROUP BY COALESCE(project_id, 0), COALESCE(assigned_to, 0), status, COALESCE(priority, ''), DATE(created_at);
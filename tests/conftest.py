@@ -0,0 +1,4 @@
+import os
+
+# Tests get a fresh in-memory API server state instead of the on-disk journal
+os.environ.setdefault('LMNH_STATE_MODE', 'memory')
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_core import api_server
+from agent_core.chat_service import ChatBusyError, ChatService, ReplyCache, normalize_message
+
+
+class FakeStream:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.closed = True
+    
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+
+class FakeMessages:
+    def __init__(self, chunks, delay=0):
+        self.chunks = chunks
+        self.delay = delay
+        self.streams = []
+    
+    def stream(self, **kwargs):
+        self.last_request = kwargs
+        stream = FakeStream(self.chunks, self.delay)
+        self.streams.append(stream)
+        return stream
+
+
+def make_service(chunks, delay=0, **kwargs):
+    service = ChatService('sk-test', 'claude-test', **kwargs)
+    service.client = type('Client', (), {'messages': FakeMessages(chunks, delay)})()
+    return service
+
+
+class TestChatService:
+    
+    def test_streams_chunks_in_order(self):
+        service = make_service(['LOOK ', 'MUM ', 'NO HANDS!'])
+        
+        async def collect():
+            return [chunk async for chunk in service.stream('system', 'hi')]
+        
+        assert asyncio.run(collect()) == ['LOOK ', 'MUM ', 'NO HANDS!']
+        assert service.stats()['completed'] == 1
+    
+    def test_concurrency_is_capped(self):
+        service = make_service(['a', 'b'], delay=0.05, max_concurrency=2)
+        peak = 0
+        
+        async def one():
+            nonlocal peak
+            async for _ in service.stream('system', 'hi'):
+                peak = max(peak, service.active)
+        
+        async def many():
+            await asyncio.gather(*(one() for _ in range(5)))
+        
+        asyncio.run(many())
+        assert peak == 2
+        assert service.stats()['completed'] == 5
+    
+    def test_busy_service_rejects_after_queue_timeout(self):
+        service = make_service(['slow'], delay=0.5, max_concurrency=1, queue_timeout=0.05)
+        
+        async def scenario():
+            first = asyncio.ensure_future(service.complete('system', 'one'))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ChatBusyError):
+                await service.complete('system', 'two')
+            first.cancel()
+        
+        asyncio.run(scenario())
+        assert service.stats()['rejected'] == 1
+    
+    def test_slow_reply_times_out_and_frees_its_slot(self):
+        service = make_service(['a', 'b', 'c'], delay=0.2, max_concurrency=1, timeout=0.3)
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(service.complete('system', 'hi'))
+        
+        assert service.stats()['timeouts'] == 1
+        assert service.active == 0
+        assert service.client.messages.streams[0].closed
+    
+    def test_cancelling_closes_the_upstream_stream(self):
+        service = make_service(['a', 'b', 'c'], delay=0.2)
+        
+        async def scenario():
+            task = asyncio.ensure_future(service.complete('system', 'hi'))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        
+        asyncio.run(scenario())
+        assert service.stats()['cancelled'] == 1
+        assert service.client.messages.streams[0].closed
+
+
+class TestReplyCache:
+    
+    def test_normalize_folds_case_and_punctuation(self):
+        assert normalize_message('  What are you   DOING?! ') == normalize_message('what are you doing')
+    
+    def test_repeat_question_is_served_from_cache(self):
+        service = make_service(['LOOK ', 'MUM!'], cache=ReplyCache(ttl=60))
+        
+        async def ask():
+            first = await service.complete('system', 'hi', ('hi', 1))
+            second = await service.complete('system', 'hi', ('hi', 1))
+            return first, second
+        
+        assert asyncio.run(ask()) == ('LOOK MUM!', 'LOOK MUM!')
+        assert len(service.client.messages.streams) == 1
+        assert service.stats()['reply_cache']['hits'] == 1
+    
+    def test_new_state_version_misses(self):
+        service = make_service(['ok'], cache=ReplyCache(ttl=60))
+        
+        async def ask():
+            await service.complete('system', 'hi', ('hi', 1))
+            await service.complete('system', 'hi', ('hi', 2))
+        
+        asyncio.run(ask())
+        assert len(service.client.messages.streams) == 2
+    
+    def test_entries_expire_and_are_bounded(self):
+        cache = ReplyCache(ttl=0, max_entries=2)
+        cache.put('a', 'x')
+        assert cache.get('a') is None
+        
+        cache.ttl = 60
+        for key in 'abc':
+            cache.put(key, key)
+        assert cache.get('a') is None
+        assert cache.get('c') == 'c'
+
+
+def test_chat_context_puts_persona_before_live_state():
+    blocks = api_server.build_chat_context()
+    
+    assert blocks[0]['text'] == api_server.CHAT_PERSONA
+    assert 'Current status' in blocks[1]['text']
+    # Too short for the provider's prompt cache, so nothing is marked for it
+    assert not any('cache_control' in block for block in blocks)
+
+
+def test_chat_cache_key_follows_state(monkeypatch):
+    key = api_server.chat_cache_key('Hi!')
+    api_server.record_event({'type': 'status', 'status': 'working', 'current_task': 'Cache test', 'progress': 5})
+    
+    assert api_server.chat_cache_key('hi') != key
+    assert api_server.chat_cache_key('hi') == api_server.chat_cache_key('HI?')
+
+
+def test_chat_endpoint_streams_tokens(monkeypatch):
+    monkeypatch.setattr(api_server, 'chat', make_service(['Hey ', 'mum!']))
+    client = TestClient(api_server.app)
+    
+    response = client.post('/api/chat', json={'message': 'hi', 'stream': True})
+    
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.text.count('event: token') == 2
+    assert '"powered_by": "Claude AI"' in response.text
+
+
+def test_chat_endpoint_falls_back_without_claude(monkeypatch):
+    monkeypatch.setattr(api_server, 'chat', None)
+    client = TestClient(api_server.app)
+    
+    body = client.post('/api/chat', json={'message': 'tell me a joke'}).json()
+    
+    assert body['powered_by'] == 'Personality Patterns'
+    assert 'bugs' in body['response']
@@ -0,0 +1,161 @@
+import subprocess
+
+import git
+import pytest
+
+from agent_core.clone_strategies import CloneStrategy, is_sparse, sparse_dirs
+
+
+def run_git(cwd, *args):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit(seed, files, message):
+    for name, content in files.items():
+        path = seed / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    run_git(seed, 'add', '-A')
+    run_git(seed, 'commit', '-q', '-m', message)
+    run_git(seed, 'push', '-q', 'origin', 'main')
+
+
+@pytest.fixture
+def seed(tmp_path, monkeypatch):
+    """Working repo that pushes to a bare origin (see origin_url)"""
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'LMNH')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'lmnh@example.com')
+    
+    bare = tmp_path / 'origin.git'
+    run_git(tmp_path, 'init', '-q', '--bare', '-b', 'main', str(bare))
+    # Partial clones need the server to allow filters
+    run_git(bare, 'config', 'uploadpack.allowFilter', 'true')
+    
+    seed = tmp_path / 'seed'
+    seed.mkdir()
+    run_git(seed, 'init', '-q', '-b', 'main')
+    run_git(seed, 'remote', 'add', 'origin', str(bare))
+    commit(seed, {'app.py': 'print("hi")\n'}, 'init')
+    commit(seed, {'src/core/main.py': 'def main():\n    pass\n', 'docs/guide.md': '# Guide\n'}, 'add src and docs')
+    commit(seed, {'app.py': 'print("hello")\n'}, 'tweak app')
+    return seed
+
+
+@pytest.fixture
+def origin_url(seed):
+    return f"file://{seed.parent / 'origin.git'}"
+
+
+def checked_out(repo_path):
+    return sorted(
+        str(path.relative_to(repo_path)) for path in repo_path.rglob('*')
+        if path.is_file() and '.git' not in path.parts
+    )
+
+
+class TestCloneStrategy:
+    
+    def test_full_clone(self, tmp_path, origin_url):
+        repo = CloneStrategy().clone(origin_url, tmp_path / 'repo', 'main')
+        
+        assert checked_out(tmp_path / 'repo') == ['app.py', 'docs/guide.md', 'src/core/main.py']
+        assert int(repo.git.rev_list('--count', 'HEAD')) == 3
+    
+    def test_shallow_clone_and_pull(self, tmp_path, seed, origin_url):
+        strategy = CloneStrategy(depth=1)
+        repo = strategy.clone(origin_url, tmp_path / 'repo', 'main')
+        assert int(repo.git.rev_list('--count', 'HEAD')) == 1
+        
+        commit(seed, {'app.py': 'print("again")\n'}, 'again')
+        strategy.pull(repo, origin_url, 'main')
+        
+        assert (tmp_path / 'repo' / 'app.py').read_text() == 'print("again")\n'
+        assert repo.git.rev_parse('--is-shallow-repository') == 'true'
+    
+    def test_blobless_clone(self, tmp_path, origin_url):
+        repo = CloneStrategy(blobless=True).clone(origin_url, tmp_path / 'repo', 'main')
+        
+        assert repo.git.config('--get', 'remote.origin.partialclonefilter') == 'blob:none'
+        assert (tmp_path / 'repo' / 'src' / 'core' / 'main.py').exists()
+        # Old versions of app.py were never fetched
+        first = repo.git.rev_list('--max-parents=0', 'HEAD')
+        missing = repo.git.rev_list('--objects', '--missing=print', first)
+        assert any(line.startswith('?') for line in missing.splitlines())
+    
+    def test_sparse_clone_checks_out_planned_dirs_only(self, tmp_path, origin_url):
+        repo = CloneStrategy(sparse=True).clone(
+            origin_url, tmp_path / 'repo', 'main', sparse_paths=['src/core/main.py']
+        )
+        
+        assert is_sparse(repo)
+        # Root files always come along in cone mode
+        assert checked_out(tmp_path / 'repo') == ['app.py', 'src/core/main.py']
+    
+    def test_sparse_without_paths_is_a_full_checkout(self, tmp_path, origin_url):
+        repo = CloneStrategy(sparse=True).clone(origin_url, tmp_path / 'repo', 'main')
+        
+        assert not is_sparse(repo)
+        assert 'docs/guide.md' in checked_out(tmp_path / 'repo')
+    
+    def test_pull_widens_sparse_checkout(self, tmp_path, seed, origin_url):
+        strategy = CloneStrategy(sparse=True)
+        repo = strategy.clone(origin_url, tmp_path / 'repo', 'main', sparse_paths=['src/core/main.py'])
+        commit(seed, {'docs/guide.md': '# Guide v2\n'}, 'docs')
+        
+        strategy.pull(repo, origin_url, 'main', sparse_paths=['docs/guide.md'])
+        
+        assert checked_out(tmp_path / 'repo') == ['app.py', 'docs/guide.md', 'src/core/main.py']
+        assert (tmp_path / 'repo' / 'docs' / 'guide.md').read_text() == '# Guide v2\n'
+    
+    def test_pull_does_not_make_a_full_checkout_sparse(self, tmp_path, origin_url):
+        repo = CloneStrategy().clone(origin_url, tmp_path / 'repo', 'main')
+        
+        CloneStrategy(sparse=True).pull(repo, origin_url, 'main', sparse_paths=['src/core/main.py'])
+        
+        assert not is_sparse(repo)
+        assert 'docs/guide.md' in checked_out(tmp_path / 'repo')
+    
+    def test_mirror_is_created_then_refreshed(self, tmp_path, seed, origin_url):
+        strategy = CloneStrategy(mirror_dir=tmp_path / 'mirrors')
+        strategy.clone(origin_url, tmp_path / 'one', 'main')
+        
+        mirror = tmp_path / 'mirrors' / 'one.git'
+        assert git.Repo(mirror).bare
+        alternates = (tmp_path / 'one' / '.git' / 'objects' / 'info' / 'alternates').read_text()
+        assert str(mirror) in alternates
+        
+        commit(seed, {'app.py': 'print("mirrored")\n'}, 'mirrored')
+        strategy.clone(origin_url, tmp_path / 'two', 'main')
+        
+        head = run_git(seed, 'rev-parse', 'HEAD')
+        assert run_git(tmp_path / 'mirrors' / 'two.git', 'rev-parse', 'main') == head
+        assert run_git(tmp_path / 'two', 'rev-parse', 'HEAD') == head
+    
+    def test_clone_without_usable_mirror_falls_back(self, tmp_path, origin_url):
+        # Something that isn't a repository sits where the mirror should be
+        broken = tmp_path / 'mirrors' / 'repo.git'
+        broken.mkdir(parents=True)
+        (broken / 'junk').write_text('not a repo')
+        
+        strategy = CloneStrategy(mirror_dir=tmp_path / 'mirrors')
+        repo = strategy.clone(origin_url, tmp_path / 'repo', 'main')
+        
+        assert checked_out(tmp_path / 'repo') == ['app.py', 'docs/guide.md', 'src/core/main.py']
+        assert not (tmp_path / 'repo' / '.git' / 'objects' / 'info' / 'alternates').exists()
+        
+        # Pulls keep working too
+        strategy.pull(repo, origin_url, 'main')
+    
+    def test_describe_and_config(self):
+        assert CloneStrategy().describe() == 'full'
+        strategy = CloneStrategy.from_config({
+            'clone_depth': 1, 'clone_blobless': True, 'clone_sparse': True, 'clone_mirror_dir': '/tmp/m'
+        })
+        assert strategy.describe() == 'depth=1, blobless, sparse, mirror'
+
+
+def test_sparse_dirs():
+    assert sparse_dirs(['app.py', 'src/core/main.py', '/src/core/util.py', 'docs/a/b.md']) == ['docs/a', 'src/core']
+    assert sparse_dirs(None) == []
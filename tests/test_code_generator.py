@@ -0,0 +1,161 @@
+import threading
+import time
+
+from agent_core.code_generator import ParallelCodeGenerator, estimate_tokens, PROMPT_OVERHEAD_TOKENS
+from agent_core.rate_limit import TokenBucket
+
+
+class FakeGitHub:
+    def __init__(self, contents=None):
+        self.contents = contents or {}
+        self.written = {}
+        self._lock = threading.Lock()
+    
+    def read_file(self, repo_path, file):
+        return self.contents.get(file, "")
+    
+    def write_file(self, repo_path, file, content):
+        with self._lock:
+            self.written[file] = content
+        return True
+
+
+class FakeClaude:
+    def __init__(self, generate):
+        self.generate = generate
+    
+    def generate_code(self, task, file, current_content):
+        return self.generate(file, current_content)
+
+
+class FakeEditingClaude(FakeClaude):
+    """Returns edits that never apply, so diff mode falls back"""
+    
+    def __init__(self, events):
+        super().__init__(lambda file, content: "regenerated")
+        self.events = events
+    
+    def generate_edits(self, task, file, current_content):
+        self.events.append(("edits", file))
+        return []
+    
+    def generate_code(self, task, file, current_content):
+        self.events.append(("call", file))
+        return super().generate_code(task, file, current_content)
+
+
+class RecordingBucket:
+    def __init__(self, events):
+        self.events = events
+    
+    def acquire(self, amount=1, timeout=None):
+        self.events.append(("acquire", amount))
+        return True
+
+
+class TestParallelCodeGenerator:
+    
+    def test_never_runs_more_than_max_concurrency(self):
+        lock = threading.Lock()
+        active = {"now": 0, "max": 0}
+        
+        def generate(file, content):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return f"new {file}"
+        
+        github = FakeGitHub()
+        files = [f"f{i}.py" for i in range(8)]
+        results = ParallelCodeGenerator(FakeClaude(generate), max_concurrency=3).run("task", "/repo", files, github)
+        
+        assert results == {file: True for file in files}
+        assert active["max"] == 3
+        assert github.written["f5.py"] == "new f5.py"
+    
+    def test_progress_is_reported_in_completion_order(self):
+        # c finishes first, then b, then a - the reverse of submission order
+        reported = {name: threading.Event() for name in ("a.py", "b.py", "c.py")}
+        waits_for = {"a.py": "b.py", "b.py": "c.py"}
+        
+        def generate(file, content):
+            if file in waits_for:
+                assert reported[waits_for[file]].wait(5)
+            return f"new {file}"
+        
+        progress = []
+        
+        def on_progress(done, total, file, ok):
+            progress.append((done, total, file, ok))
+            reported[file].set()
+        
+        generator = ParallelCodeGenerator(FakeClaude(generate), max_concurrency=3)
+        generator.run("task", "/repo", ["a.py", "b.py", "c.py"], FakeGitHub(), on_progress=on_progress)
+        
+        assert progress == [(1, 3, "c.py", True), (2, 3, "b.py", True), (3, 3, "a.py", True)]
+    
+    def test_failed_file_does_not_stop_the_others(self):
+        def generate(file, content):
+            if file == "bad.py":
+                raise RuntimeError("boom")
+            return None if file == "empty.py" else "code"
+        
+        github = FakeGitHub()
+        results = ParallelCodeGenerator(FakeClaude(generate)).run(
+            "task", "/repo", ["bad.py", "empty.py", "good.py"], github
+        )
+        
+        assert results == {"bad.py": False, "empty.py": False, "good.py": True}
+        assert list(github.written) == ["good.py"]
+    
+    def test_reserves_token_estimate_before_each_call(self):
+        events = []
+        contents = {"small.py": "x" * 40, "big.py": "y" * 4000}
+        
+        def generate(file, content):
+            events.append(("call", file))
+            return "code"
+        
+        generator = ParallelCodeGenerator(FakeClaude(generate), max_concurrency=1, token_bucket=RecordingBucket(events))
+        generator.run("task", "/repo", ["small.py", "big.py"], FakeGitHub(contents))
+        
+        expected = {file: 2 * estimate_tokens(text) + PROMPT_OVERHEAD_TOKENS for file, text in contents.items()}
+        assert events == [
+            ("acquire", expected["small.py"]), ("call", "small.py"),
+            ("acquire", expected["big.py"]), ("call", "big.py"),
+        ]
+    
+    def test_fallback_after_failed_edits_reserves_again(self):
+        events = []
+        contents = {"app.py": "z" * 400}
+        
+        generator = ParallelCodeGenerator(
+            FakeEditingClaude(events), max_concurrency=1, token_bucket=RecordingBucket(events), edit_mode="diff"
+        )
+        github = FakeGitHub(contents)
+        assert generator.run("task", "/repo", ["app.py"], github) == {"app.py": True}
+        
+        estimate = 2 * estimate_tokens(contents["app.py"]) + PROMPT_OVERHEAD_TOKENS
+        assert events == [
+            ("acquire", estimate), ("edits", "app.py"),
+            ("acquire", estimate), ("call", "app.py"),
+        ]
+        assert github.written["app.py"] == "regenerated"
+    
+    def test_token_bucket_throttles_calls_over_budget(self):
+        # Each call needs the whole bucket, which refills in ~0.1s
+        bucket = TokenBucket(PROMPT_OVERHEAD_TOKENS, PROMPT_OVERHEAD_TOKENS * 10)
+        started = time.monotonic()
+        
+        generator = ParallelCodeGenerator(FakeClaude(lambda file, content: "code"), max_concurrency=3, token_bucket=bucket)
+        results = generator.run("task", "/repo", ["a.py", "b.py", "c.py"], FakeGitHub())
+        
+        assert all(results.values())
+        # The first call spends the initial burst, the other two wait for refills
+        assert time.monotonic() - started >= 0.15
+    
+    def test_no_files(self):
+        assert ParallelCodeGenerator(FakeClaude(lambda file, content: "code")).run("task", "/repo", [], FakeGitHub()) == {}
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+
+from agent_core import api_server
+
+
+def test_unchanged_status_returns_304():
+    client = TestClient(api_server.app)
+    
+    first = client.get('/api/status')
+    etag = first.headers['etag']
+    assert first.status_code == 200
+    
+    again = client.get('/api/status', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.content == b''
+    
+    client.post('/api/update', json={'status': 'working', 'current_task': 'etag', 'progress': 42})
+    changed = client.get('/api/status', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json()['progress'] == 42
+    assert changed.headers['etag'] != etag
+
+
+def test_logs_do_not_invalidate_stats_or_tasks():
+    client = TestClient(api_server.app)
+    stats_etag = client.get('/api/stats').headers['etag']
+    tasks_etag = client.get('/api/tasks').headers['etag']
+    
+    client.post('/api/log', json={'level': 'info', 'message': 'noise'})
+    
+    assert client.get('/api/stats', headers={'If-None-Match': stats_etag}).status_code == 304
+    assert client.get('/api/tasks', headers={'If-None-Match': tasks_etag}).status_code == 304
+    
+    client.post('/api/task/add', json={'id': 'etag1', 'title': 'New task'})
+    assert client.get('/api/tasks', headers={'If-None-Match': tasks_etag}).status_code == 200
+
+
+def test_repeated_polls_reuse_the_serialized_body(monkeypatch):
+    client = TestClient(api_server.app)
+    client.post('/api/update', json={'stats': {'tasks_completed': 7}})
+    
+    builds = []
+    original = api_server.json.dumps
+    monkeypatch.setattr(api_server.json, 'dumps', lambda *a, **k: builds.append(1) or original(*a, **k))
+    
+    for _ in range(3):
+        assert client.get('/api/stats').json() == {'tasks_completed': 7}
+    assert len(builds) == 1
+
+
+def test_different_pages_get_different_etags():
+    client = TestClient(api_server.app)
+    for i in range(4):
+        client.post('/api/task/add', json={'id': f"etagpage{i}", 'title': 'x'})
+    
+    first = client.get('/api/tasks', params={'limit': 2})
+    second = client.get('/api/tasks', params={'limit': 2, 'cursor': first.json()['next_cursor']})
+    assert first.headers['etag'] != second.headers['etag']
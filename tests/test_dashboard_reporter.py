@@ -0,0 +1,140 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_core import api_server, dashboard_reporter
+from agent_core.dashboard_reporter import DashboardReporter
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Stands in for requests.Session and records every batch posted"""
+    
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+    
+    def mount(self, prefix, adapter):
+        pass
+    
+    def get(self, url, timeout=None):
+        return FakeResponse()
+    
+    def post(self, url, json=None, timeout=None):
+        if self.fail:
+            raise ConnectionError("dashboard down")
+        self.batches.append(json["events"])
+        return FakeResponse()
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def make_reporter(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(dashboard_reporter.requests, 'Session', lambda: session)
+    reporters = []
+    
+    def make(**kwargs):
+        # A long flush interval keeps the background thread out of the way
+        kwargs.setdefault('flush_interval', 60)
+        reporter = DashboardReporter(**kwargs)
+        reporters.append(reporter)
+        return reporter, session
+    
+    yield make
+    for reporter in reporters:
+        reporter.close()
+
+
+class TestDashboardReporter:
+    
+    def test_calls_are_buffered_and_status_coalesced(self, make_reporter):
+        reporter, session = make_reporter()
+        
+        reporter.add_task('t1', 'Fix bug', 'in_progress')
+        for progress in (10, 20, 40):
+            reporter.update_status('working', 'Fix bug', progress)
+        reporter.add_log('info', 'hello')
+        assert session.batches == []
+        
+        assert reporter.flush()
+        [batch] = session.batches
+        assert [e['type'] for e in batch] == ['task_add', 'log', 'status']
+        assert batch[-1]['progress'] == 40
+        assert reporter.get_stats()['coalesced'] == 2
+    
+    def test_full_buffer_drops_oldest(self, make_reporter):
+        reporter, session = make_reporter(max_buffer=3, batch_size=100)
+        
+        for i in range(5):
+            reporter.add_log('info', f"log {i}")
+        
+        assert reporter.get_stats()['dropped'] == 2
+        reporter.flush()
+        assert [e['message'] for e in session.batches[0]] == ['log 2', 'log 3', 'log 4']
+    
+    def test_failed_batch_is_retried(self, make_reporter):
+        reporter, session = make_reporter()
+        
+        session.fail = True
+        reporter.add_log('info', 'first')
+        reporter.update_status('working', 'x', 10)
+        assert not reporter.flush()
+        
+        session.fail = False
+        reporter.update_status('working', 'x', 50)
+        assert reporter.flush()
+        
+        [batch] = session.batches
+        assert [e['type'] for e in batch] == ['log', 'status']
+        assert batch[-1]['progress'] == 50
+        assert reporter.get_stats()['failed_batches'] == 1
+    
+    def test_close_flushes_remaining_events(self, make_reporter):
+        reporter, session = make_reporter()
+        
+        reporter.add_log('info', 'bye')
+        reporter.close()
+        
+        assert [[e['message'] for e in batch] for batch in session.batches] == [['bye']]
+
+
+def test_ingest_endpoint_applies_events_in_order():
+    client = TestClient(api_server.app)
+    events = [
+        {'type': 'task_add', 'id': 'ingest1', 'title': 'Add ingest', 'status': 'in_progress', 'ts': 1700000000},
+        {'type': 'task_update', 'id': 'ingest1', 'status': 'completed'},
+        {'type': 'bogus'},
+        {'type': 'status', 'status': 'idle', 'current_task': None, 'progress': 0},
+    ]
+    
+    response = client.post('/api/ingest', json={'events': events})
+    
+    body = response.json()
+    assert (body['success'], body['applied'], body['failed']) == (False, 3, 1)
+    assert [r['ok'] for r in body['results']] == [True, True, False, True]
+    assert 'Unknown event type' in body['results'][2]['error']
+    task = api_server.task_store.get('ingest1')
+    assert task['status'] == 'completed'
+    assert api_server.agent_state['status'] == 'idle'
+
+
+def test_ingest_rejects_malformed_batches():
+    client = TestClient(api_server.app)
+    
+    assert client.post('/api/ingest', json={'events': 'nope'}).status_code == 400
+    
+    too_many = [{'type': 'log', 'level': 'info', 'message': 'x'}] * (api_server.MAX_INGEST_EVENTS + 1)
+    assert client.post('/api/ingest', json={'events': too_many}).status_code == 413
+    
+    body = client.post('/api/ingest', json={'events': [{'type': 'log', 'level': 'info'}]}).json()
+    assert body['results'] == [{'ok': False, 'error': 'Missing field(s): message'}]
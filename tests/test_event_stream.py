@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+from agent_core import api_server
+
+
+def parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    return fields['event'], fields.get('id'), json.loads(fields['data'])
+
+
+async def next_frame(stream, timeout=1):
+    return parse(await asyncio.wait_for(stream.__anext__(), timeout))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestEventStream:
+    
+    def test_snapshot_then_deltas(self):
+        async def scenario():
+            stream = api_server.stream_events()
+            event, seq, snapshot = await next_frame(stream)
+            assert event == 'snapshot'
+            assert 'tasks' in snapshot and 'logs' in snapshot
+            
+            with api_server.state_lock:
+                api_server.add_task('sse1', 'Stream me', 'in_progress')
+            
+            frames = [await next_frame(stream) for _ in range(2)]
+            await stream.aclose()
+            return seq, frames
+        
+        seq, frames = run(scenario())
+        assert [f[0] for f in frames] == ['task', 'log']
+        assert frames[0][2]['id'] == 'sse1'
+        assert int(frames[0][1]) > int(seq)
+        assert api_server.event_hub.subscriber_count() == 0
+    
+    def test_resume_replays_missed_deltas(self):
+        with api_server.state_lock:
+            since = api_server.event_hub.last_seq
+            api_server.add_log('info', 'while you were away')
+            api_server.update_agent_state({'status': 'working', 'current_task': 'x', 'progress': 10})
+        
+        async def scenario():
+            stream = api_server.stream_events(since)
+            frames = [await next_frame(stream) for _ in range(2)]
+            await stream.aclose()
+            return frames
+        
+        frames = run(scenario())
+        assert [f[0] for f in frames] == ['log', 'status']
+        assert frames[0][2]['message'] == 'while you were away'
+        assert frames[1][2]['progress'] == 10
+    
+    def test_unchanged_status_is_not_pushed(self):
+        with api_server.state_lock:
+            api_server.update_agent_state({'status': 'idle', 'current_task': None, 'progress': 0})
+            before = api_server.event_hub.last_seq
+            api_server.update_agent_state({'status': 'idle', 'current_task': None, 'progress': 0})
+            assert api_server.event_hub.last_seq == before
+    
+    def test_heartbeat_when_idle(self):
+        async def scenario():
+            stream = api_server.stream_events(api_server.event_hub.last_seq, heartbeat=0.05)
+            frame = await next_frame(stream)
+            await stream.aclose()
+            return frame
+        
+        event, seq, data = run(scenario())
+        assert event == 'heartbeat'
+        assert 'uptime' in data
+    
+    def test_stale_cursor_gets_a_fresh_snapshot(self):
+        async def scenario():
+            stream = api_server.stream_events(10 ** 9)
+            frame = await next_frame(stream)
+            await stream.aclose()
+            return frame
+        
+        assert run(scenario())[0] == 'snapshot'
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+from agent_core import api_server
+from agent_core.log_store import LogStore
+
+
+def fill(store, count):
+    for i in range(count):
+        store.append({'level': 'info', 'message': f"line {i}"})
+
+
+class TestLogStore:
+    
+    def test_sequence_numbers_keep_growing_past_capacity(self):
+        store = LogStore(capacity=3)
+        fill(store, 5)
+        
+        assert len(store) == 3
+        assert (store.first_seq, store.last_seq) == (3, 5)
+        assert [e['seq'] for e in store.tail()] == [3, 4, 5]
+    
+    def test_since_returns_only_newer_entries(self):
+        store = LogStore(capacity=10)
+        fill(store, 6)
+        
+        entries, missed = store.since(4)
+        assert [e['message'] for e in entries] == ['line 4', 'line 5']
+        assert missed == 0
+        assert store.since(6) == ([], 0)
+    
+    def test_since_reports_entries_that_fell_out(self):
+        store = LogStore(capacity=3)
+        fill(store, 10)
+        
+        entries, missed = store.since(2)
+        assert [e['seq'] for e in entries] == [8, 9, 10]
+        assert missed == 5
+    
+    def test_since_limit_pages_oldest_first(self):
+        store = LogStore(capacity=10)
+        fill(store, 6)
+        
+        entries, _ = store.since(0, limit=2)
+        assert [e['seq'] for e in entries] == [1, 2]
+
+
+def test_logs_endpoint_is_incremental():
+    client = TestClient(api_server.app)
+    last_seq = client.get('/api/logs').json()['last_seq']
+    
+    client.post('/api/log', json={'level': 'info', 'message': 'first'})
+    client.post('/api/log', json={'level': 'info', 'message': 'second'})
+    
+    body = client.get('/api/logs', params={'since': last_seq}).json()
+    assert [log['message'] for log in body['logs']] == ['first', 'second']
+    assert body['last_seq'] == last_seq + 2
+    
+    body = client.get('/api/logs', params={'since': body['last_seq']}).json()
+    assert body['logs'] == []
+    
+    # A cursor from a previous server run starts over
+    assert client.get('/api/logs', params={'since': 10 ** 9}).json()['reset'] is True
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from backend.services.pagination import (
+    MAX_PER_PAGE, TotalCache, decode_cursor, encode_cursor, keyset_page, wants_cursor
+)
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = 'rows'
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Three rows share each timestamp, so pages have to break ties on id
+        session.add_all(Row(id=i, created_at=START + timedelta(minutes=i // 3)) for i in range(1, 26))
+        session.commit()
+        yield session
+
+
+def walk(session, per_page):
+    pages, cursor = [], None
+    while True:
+        items, cursor = keyset_page(session.query(Row), Row.created_at, Row.id, cursor, per_page)
+        pages.append([row.id for row in items])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor(datetime(2026, 3, 1, 9, 0, 0, 123456), 42)
+    
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (datetime(2026, 3, 1, 9, 0, 0, 123456), 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', encode_cursor(START, 1)[:-3]])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_are_newest_first_and_break_ties_on_id(session):
+    pages = walk(session, per_page=4)
+    ids = [row_id for page in pages for row_id in page]
+    
+    assert ids == sorted(range(1, 26), key=lambda i: (i // 3, i), reverse=True)
+    assert [len(page) for page in pages] == [4] * 6 + [1]
+
+
+def test_last_full_page_has_no_next_cursor(session):
+    assert walk(session, per_page=5)[-1] == [5, 4, 3, 2, 1]
+    assert len(walk(session, per_page=5)) == 5
+
+
+def test_per_page_is_clamped(session):
+    items, cursor = keyset_page(session.query(Row), Row.created_at, Row.id, per_page=10 * MAX_PER_PAGE)
+    assert len(items) == 25 and cursor is None
+
+
+def test_keyset_paging_is_opt_in():
+    assert not wants_cursor({'page': '2'})
+    assert wants_cursor({'paginate': 'cursor'})
+    assert wants_cursor({'cursor': encode_cursor(START, 1)})
+
+
+def test_totals_are_cached_until_they_expire():
+    calls = []
+    cache = TotalCache(ttl=60)
+    count = lambda: calls.append(1) or len(calls)
+    
+    assert cache.get(('tasks', 'open'), count) == 1
+    assert cache.get(('tasks', 'open'), count) == 1
+    assert cache.get(('tasks', 'done'), count) == 2
+    
+    cache.ttl = -1
+    cache.get(('tasks', 'closed'), count)
+    assert cache.get(('tasks', 'closed'), count) == 4
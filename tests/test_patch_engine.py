@@ -0,0 +1,97 @@
+import pytest
+
+from agent_core.patch_engine import apply_edits, parse_edits, PatchError, Hunk
+
+ORIGINAL = """import os
+
+
+def greet(name):
+    message = "Hello, " + name
+    return message
+
+
+def farewell(name):
+    return "Bye, " + name
+"""
+
+
+class TestParseEdits:
+    
+    def test_search_replace_blocks(self):
+        text = """Here you go:
+<<<<<<< SEARCH
+    message = "Hello, " + name
+=======
+    message = f"Hello, {name}!"
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+import os
+=======
+import os
+import sys
+>>>>>>> REPLACE
+"""
+        hunks = parse_edits(text)
+        assert len(hunks) == 2
+        assert hunks[0].search == ['    message = "Hello, " + name']
+        assert hunks[1].replace == ['import os', 'import sys']
+    
+    def test_unified_diff(self):
+        text = """--- a/greet.py
++++ b/greet.py
+@@ -9,2 +9,2 @@ def farewell(name):
+ def farewell(name):
+-    return "Bye, " + name
++    return "Goodbye, " + name
+"""
+        hunks = parse_edits(text)
+        assert len(hunks) == 1
+        assert hunks[0].search == ['def farewell(name):', '    return "Bye, " + name']
+        assert hunks[0].replace == ['def farewell(name):', '    return "Goodbye, " + name']
+    
+    def test_rejects_unstructured_text(self):
+        with pytest.raises(PatchError):
+            parse_edits("I changed the greeting for you!")
+    
+    def test_rejects_unterminated_block(self):
+        with pytest.raises(PatchError):
+            parse_edits("<<<<<<< SEARCH\nfoo\n=======\nbar\n")
+
+
+class TestApplyEdits:
+    
+    def test_exact_match(self):
+        hunks = [Hunk(['    return "Bye, " + name'], ['    return "Goodbye, " + name'])]
+        patched = apply_edits(ORIGINAL, hunks)
+        assert '"Goodbye, " + name' in patched
+        assert patched.replace('Goodbye', 'Bye') == ORIGINAL
+    
+    def test_whitespace_tolerant_match_keeps_file_indentation(self):
+        hunks = [Hunk(['message = "Hello, " + name', 'return message'],
+                      ['message = f"Hello, {name}!"', 'return message'])]
+        patched = apply_edits(ORIGINAL, hunks)
+        assert '    message = f"Hello, {name}!"\n    return message' in patched
+    
+    def test_fuzzy_match(self):
+        # Model got a small detail of the context wrong
+        hunks = [Hunk(['def greet(name):', '    message = "Hello " + name'],
+                      ['def greet(name):', '    message = "Hi, " + name'])]
+        patched = apply_edits(ORIGINAL, hunks)
+        assert '    message = "Hi, " + name' in patched
+        assert 'Hello' not in patched
+    
+    def test_ambiguous_match_is_rejected(self):
+        hunks = [Hunk(['    return message'], ['    return message.upper()'])]
+        source = ORIGINAL + "\n\ndef again(message):\n    return message\n"
+        with pytest.raises(PatchError):
+            apply_edits(source, hunks)
+    
+    def test_missing_search_is_rejected(self):
+        hunks = [Hunk(['def nothing_like_this():'], ['pass'])]
+        with pytest.raises(PatchError):
+            apply_edits(ORIGINAL, hunks)
+    
+    def test_no_op_edit_is_rejected(self):
+        hunks = [Hunk(['import os'], ['import os'])]
+        with pytest.raises(PatchError):
+            apply_edits(ORIGINAL, hunks)
@@ -0,0 +1,152 @@
+import subprocess
+
+import git
+import pytest
+
+from agent_core import repo_index
+from agent_core.clone_strategies import CloneStrategy, is_sparse
+from agent_core.github_handler import GitHubHandler
+from agent_core.repo_index import RepoIndex, extract_symbols, words
+
+
+def run_git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Small repo with a couple of source files committed on main"""
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'LMNH')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'lmnh@example.com')
+    
+    path = tmp_path / 'repo'
+    (path / 'src' / 'billing').mkdir(parents=True)
+    (path / 'src' / 'billing' / 'invoices.py').write_text(
+        'class InvoiceBuilder:\n    def add_line(self):\n        pass\n\ndef send_invoice(invoice):\n    pass\n'
+    )
+    (path / 'web').mkdir()
+    (path / 'web' / 'Login.tsx').write_text(
+        'export default function LoginForm() {}\nexport const useSession = () => null\n'
+    )
+    (path / 'README.md').write_text('# Demo\n')
+    run_git(path, 'init', '-q', '-b', 'main')
+    run_git(path, 'add', '-A')
+    run_git(path, 'commit', '-q', '-m', 'init')
+    return path
+
+
+def commit_all(path, message):
+    run_git(path, 'add', '-A')
+    run_git(path, 'commit', '-q', '-m', message)
+
+
+def test_symbols_are_extracted_per_language():
+    assert extract_symbols('a.py', 'class A:\n    async def run(self):\n        pass\n') == ['A', 'run']
+    assert extract_symbols('a.go', 'func (s *Server) Start() {}\ntype Config struct{}\n') == ['Start', 'Config']
+    assert extract_symbols('a.md', 'def not_code') == []
+
+
+def test_words_split_identifiers():
+    assert words('sendInvoice to billing_service/API') == ['send', 'invoice', 'billing', 'service', 'api']
+
+
+def test_index_lists_files_sizes_and_symbols(repo, tmp_path):
+    index = RepoIndex(tmp_path / 'index.json')
+    
+    assert index.refresh(repo) == 3
+    assert index.has_file('src/billing/invoices.py')
+    
+    blob = index.blobs[index.files['web/Login.tsx']]
+    assert blob['symbols'] == ['LoginForm', 'useSession']
+    assert blob['size'] == (repo / 'web' / 'Login.tsx').stat().st_size
+
+
+def test_only_changed_blobs_are_parsed_again(repo, tmp_path, monkeypatch):
+    index = RepoIndex(tmp_path / 'index.json')
+    index.refresh(repo)
+    assert index.refresh(repo) == 0
+    
+    (repo / 'web' / 'Login.tsx').write_text('export function LogoutButton() {}\n')
+    (repo / 'README.md').unlink()
+    commit_all(repo, 'change')
+    
+    parsed = []
+    original = repo_index.extract_symbols
+    monkeypatch.setattr(repo_index, 'extract_symbols', lambda path, text: parsed.append(path) or original(path, text))
+    
+    # A fresh instance picks the saved index back up from disk
+    reloaded = RepoIndex(tmp_path / 'index.json')
+    assert reloaded.refresh(repo) == 1
+    assert parsed == ['web/Login.tsx']
+    assert not reloaded.has_file('README.md')
+
+
+def test_context_ranks_relevant_files_first(repo, tmp_path):
+    index = RepoIndex(tmp_path / 'index.json')
+    index.refresh(repo)
+    
+    context = index.context_for('Add a discount line to invoices before we send them')
+    lines = context.splitlines()
+    
+    assert lines[1].startswith('src/billing/invoices.py [')
+    assert 'InvoiceBuilder' in lines[1]
+    assert 'web/Login.tsx' in context
+
+
+def test_context_respects_the_budget(repo, tmp_path):
+    index = RepoIndex(tmp_path / 'index.json')
+    index.refresh(repo)
+    
+    assert len(index.context_for('invoices', max_chars=200)) <= 200
+    assert RepoIndex().context_for('anything') == ''
+
+
+@pytest.mark.parametrize('sparse', [True, False])
+def test_first_index_comes_from_a_tree_fetch_then_planned_checkout(repo, tmp_path, sparse):
+    origin = f"file://{repo}"
+    github = GitHubHandler('token', 'user', tmp_path / 'ws', clone_strategy=CloneStrategy(sparse=sparse))
+    index = RepoIndex(tmp_path / 'index.json')
+    
+    # Before planning: history and trees only, nothing checked out
+    repo_path = github.fetch_tree(origin, 'main')
+    assert not (tmp_path / 'ws' / 'repo' / 'README.md').exists()
+    index.refresh(repo_path)
+    assert index.has_file('web/Login.tsx')
+    assert index.blobs[index.files['src/billing/invoices.py']]['size'] is None
+    
+    # The plan names its files: the checkout is limited to them in sparse mode
+    assert github.clone_or_pull(origin, 'main', sparse_paths=['src/billing/invoices.py']) == repo_path
+    assert is_sparse(git.Repo(repo_path)) == sparse
+    assert (tmp_path / 'ws' / 'repo' / 'web' / 'Login.tsx').exists() == (not sparse)
+    
+    # Same HEAD, but the checked-out files now get parsed
+    index.refresh(repo_path)
+    assert index.blobs[index.files['src/billing/invoices.py']]['symbols'] == ['InvoiceBuilder', 'add_line', 'send_invoice']
+    assert (index.blobs[index.files['web/Login.tsx']]['size'] is None) == sparse
+    
+    # Nothing moved: files outside the sparse cone aren't looked for again
+    assert index.refresh(repo_path) == 0
+    
+    # Later tasks only widen the sparse checkout, and what they bring in gets parsed
+    github.clone_or_pull(origin, 'main', sparse_paths=['web/Login.tsx'])
+    assert (tmp_path / 'ws' / 'repo' / 'web' / 'Login.tsx').exists()
+    index.refresh(repo_path)
+    assert index.blobs[index.files['web/Login.tsx']]['symbols'] == ['LoginForm', 'useSession']
+
+
+def test_fetch_tree_leaves_an_existing_clone_alone(repo, tmp_path):
+    github = GitHubHandler('token', 'user', tmp_path / 'ws')
+    repo_path = github.clone_or_pull(f"file://{repo}", 'main')
+    
+    assert github.fetch_tree(f"file://{repo}", 'main') == repo_path
+    assert (tmp_path / 'ws' / 'repo' / 'README.md').exists()
+
+
+def test_cache_file_is_per_repo_url(tmp_path):
+    path = lambda url: RepoIndex.for_repo(tmp_path, url).cache_path
+    
+    assert path('https://github.com/org/my.github.io.git').name.startswith('org__my.github.io-')
+    assert path('https://github.com/org/repo.git') == path('https://github.com/org/repo/')
+    assert path('https://github.com/org/repo') != path('https://gitlab.com/org/repo')
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+import httpx
+import pytest
+
+from agent_core.claude_handler import ClaudeHandler
+from agent_core.rate_limit import TokenBucket
+from agent_core.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy
+
+PLAN = {"summary": "Fix it", "steps": [], "files_to_modify": ["a.py"]}
+
+
+def message(text):
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-test",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 10},
+    }
+
+
+def error(status, kind, headers=None):
+    body = {"type": "error", "error": {"type": kind, "message": kind}}
+    return status, headers or {}, body
+
+
+class FakeAnthropic:
+    """Local stand-in for the Messages API that plays back scripted responses"""
+    
+    def __init__(self, responses, default=None):
+        self.responses = list(responses)
+        self.default = default or (200, {}, message(json.dumps(PLAN)))
+        self.requests = []
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fake.requests.append(time.monotonic())
+                status, headers, body = fake.responses.pop(0) if fake.responses else fake.default
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_api():
+    servers = []
+    
+    def start(responses, default=None):
+        server = FakeAnthropic(responses, default)
+        servers.append(server)
+        return server
+    
+    yield start
+    for server in servers:
+        server.close()
+
+
+def make_handler(server, max_attempts=4, threshold=5, reset=30.0, limiter=None):
+    caller = ResilientCaller(
+        RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=0.05),
+        CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        limiter=limiter
+    )
+    return ClaudeHandler('sk-test', resilience=caller, base_url=server.url)
+
+
+def test_overloaded_and_server_errors_are_retried(fake_api):
+    server = fake_api([error(529, 'overloaded_error'), error(500, 'api_error')])
+    handler = make_handler(server)
+    
+    assert handler.analyze_task('fix it') == PLAN
+    assert len(server.requests) == 3
+    assert handler.resilience.stats()['retries'] == 2
+
+
+def test_rate_limit_waits_for_retry_after(fake_api):
+    server = fake_api([error(429, 'rate_limit_error', {'retry-after': '0.3'})])
+    handler = make_handler(server)
+    
+    assert handler.analyze_task('fix it') == PLAN
+    assert server.requests[1] - server.requests[0] >= 0.3
+
+
+def test_bad_request_is_not_retried(fake_api):
+    server = fake_api([error(400, 'invalid_request_error')])
+    handler = make_handler(server)
+    
+    assert handler.analyze_task('fix it') is None
+    assert len(server.requests) == 1
+    assert handler.resilience.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gives_up_after_max_attempts(fake_api):
+    server = fake_api([], default=error(503, 'api_error'))
+    handler = make_handler(server, max_attempts=3)
+    
+    assert handler.analyze_task('fix it') is None
+    assert len(server.requests) == 3
+
+
+def test_open_circuit_fails_fast_until_reset(fake_api):
+    server = fake_api([error(500, 'api_error')] * 2)
+    handler = make_handler(server, max_attempts=5, threshold=2, reset=0.2)
+    
+    assert handler.analyze_task('fix it') is None
+    assert len(server.requests) == 2
+    
+    with pytest.raises(CircuitOpenError):
+        handler.resilience.call(lambda: None)
+    assert len(server.requests) == 2
+    
+    # After the reset timeout one trial call goes through and closes the circuit
+    time.sleep(0.25)
+    assert handler.analyze_task('fix it') == PLAN
+    assert handler.resilience.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_shared_limiter_paces_requests(fake_api):
+    server = fake_api([])
+    handler = make_handler(server, limiter=TokenBucket(1, 10))
+    
+    for _ in range(3):
+        handler.analyze_task('fix it')
+    
+    assert server.requests[-1] - server.requests[0] >= 0.15
+
+
+class FlakyStreams:
+    """messages.stream that fails to connect once, then streams"""
+    
+    def __init__(self, failure):
+        self.failure = failure
+        self.opened = 0
+    
+    def stream(self, **kwargs):
+        self.opened += 1
+        if self.opened == 1:
+            raise self.failure
+        
+        class Stream:
+            text_stream = iter(['{"summary": ', '"Fix it"}'])
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc):
+                return False
+        
+        return Stream()
+
+
+def test_stream_is_retried_before_the_first_chunk(fake_api):
+    server = fake_api([])
+    handler = make_handler(server)
+    failure = anthropic.APIConnectionError(request=httpx.Request('POST', server.url))
+    handler.client = type('Client', (), {'messages': FlakyStreams(failure)})()
+    
+    assert ''.join(handler.stream_plan('fix it')) == '{"summary": "Fix it"}'
+    assert handler.client.messages.opened == 2
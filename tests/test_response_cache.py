@@ -0,0 +1,91 @@
+import os
+import time
+
+from agent_core.claude_handler import ClaudeHandler
+from agent_core.response_cache import ResponseCache
+
+
+class FakeMessages:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        block = type('Block', (), {'text': self.text})()
+        return type('Response', (), {'content': [block]})()
+
+
+def make_handler(cache, text):
+    handler = ClaudeHandler('sk-test', cache=cache)
+    handler.client = type('Client', (), {'messages': FakeMessages(text)})()
+    return handler
+
+
+class TestResponseCache:
+    
+    def test_hit_and_miss_counters(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        key = cache.make_key('model', 'prompt', max_tokens=10)
+        
+        assert cache.get(key) is None
+        cache.put(key, 'hello')
+        assert cache.get(key) == 'hello'
+        assert cache.make_key('model', 'prompt', max_tokens=11) != key
+        
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    
+    def test_entries_expire(self, tmp_path):
+        cache = ResponseCache(tmp_path, ttl=60)
+        cache.put('k', 'old')
+        
+        entry = tmp_path / 'k.json'
+        entry.write_text('{"created": 0, "text": "old"}')
+        
+        assert cache.get('k') is None
+        assert cache.stats()['expired'] == 1
+        assert not entry.exists()
+    
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        cache.put('probe', 'x' * 60)
+        entry_size = cache.stats()['bytes']
+        cache.clear()
+        cache.max_bytes = int(entry_size * 3.5)
+        
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, 'x' * 60)
+            past = time.time() - 100 + i
+            os.utime(tmp_path / f'{key}.json', (past, past))
+        
+        # Touch "a" so "b" becomes the oldest
+        assert cache.get('a')
+        cache.put('d', 'x' * 60)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') and cache.get('d')
+        assert cache.stats()['evictions'] >= 1
+        assert cache.stats()['bytes'] <= cache.max_bytes
+    
+    def test_bypass_skips_cache(self, tmp_path):
+        cache = ResponseCache(tmp_path, bypass=True)
+        cache.put('k', 'v')
+        assert cache.get('k') is None
+        assert cache.stats()['entries'] == 0
+    
+    def test_claude_handler_reuses_cached_plan(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        handler = make_handler(cache, '{"summary": "s", "files_to_modify": ["a.py"]}')
+        
+        assert handler.analyze_task('do it')['files_to_modify'] == ['a.py']
+        assert handler.analyze_task('do it')['summary'] == 's'
+        assert handler.client.messages.calls == 1
+    
+    def test_claude_handler_does_not_cache_bad_plans(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        handler = make_handler(cache, 'not json')
+        
+        assert handler.analyze_task('do it') is None
+        assert handler.analyze_task('do it') is None
+        assert handler.client.messages.calls == 2
@@ -0,0 +1,154 @@
+import json
+import threading
+
+import pytest
+
+from agent_core import slack_handler
+from agent_core.slack_events import EventCursor, FakeEventSource
+from agent_core.slack_handler import SlackHandler
+
+BOT_ID = 'UBOT'
+
+
+class FakeWebClient:
+    """Stands in for slack_sdk.WebClient with a fixed channel history"""
+    
+    def __init__(self, token=None, history=None, page_size=2):
+        self.history = history or []
+        self.page_size = page_size
+        self.calls = []
+    
+    def auth_test(self):
+        return {'user_id': BOT_ID}
+    
+    def conversations_history(self, channel, oldest=None, limit=100, cursor=None):
+        self.calls.append({'oldest': oldest, 'cursor': cursor})
+        newer = [m for m in self.history if float(m['ts']) > float(oldest or 0)]
+        newer.sort(key=lambda m: float(m['ts']), reverse=True)
+        start = int(cursor or 0)
+        page = newer[start:start + self.page_size]
+        has_more = start + self.page_size < len(newer)
+        return {
+            'messages': page,
+            'has_more': has_more,
+            'response_metadata': {'next_cursor': str(start + self.page_size) if has_more else ''},
+        }
+
+
+def mention(ts, task):
+    return {'type': 'message', 'channel': 'C1', 'ts': ts, 'text': f'<@{BOT_ID}> task: {task}'}
+
+
+@pytest.fixture
+def make_handler(monkeypatch):
+    def make(history=None):
+        client = FakeWebClient(history=history)
+        monkeypatch.setattr(slack_handler, 'WebClient', lambda token: client)
+        return SlackHandler('xoxb-test', 'LMNH')
+    return make
+
+
+def listen(handler, source, cursor):
+    received = []
+    thread = threading.Thread(
+        target=handler.listen_for_mentions,
+        args=('C1', lambda task_data, ts: received.append((task_data['task'], ts))),
+        kwargs={'source': source, 'cursor': cursor},
+    )
+    thread.start()
+    return thread, received
+
+
+class TestEventIngestion:
+    
+    def test_pushed_mentions_reach_callback_once(self, make_handler, tmp_path):
+        handler = make_handler()
+        source = FakeEventSource()
+        cursor = EventCursor(tmp_path / 'cursor.json')
+        cursor.last_ts = '100.0'
+        
+        thread, received = listen(handler, source, cursor)
+        source.push(mention('101.0', 'first'))
+        # Same message delivered again as an app_mention
+        source.push(dict(mention('101.0', 'first'), type='app_mention'))
+        source.push({'type': 'message', 'channel': 'C1', 'ts': '102.0', 'text': 'chatter'})
+        source.push(mention('103.0', 'other channel') | {'channel': 'C2'})
+        source.push(mention('104.0', 'second'))
+        source.close()
+        thread.join(5)
+        
+        assert received == [('first', '101.0'), ('second', '104.0')]
+        assert json.loads((tmp_path / 'cursor.json').read_text())['last_ts'] == '104.0'
+    
+    def test_catch_up_replays_missed_messages_in_order(self, make_handler, tmp_path):
+        history = [mention(f'{ts}.0', f'missed {ts}') for ts in (105, 101, 103, 99)]
+        handler = make_handler(history=history)
+        cursor_file = tmp_path / 'cursor.json'
+        cursor_file.write_text(json.dumps({'last_ts': '100.0', 'recent': ['101.0']}))
+        
+        source = FakeEventSource()
+        cursor = EventCursor(cursor_file)
+        thread, received = listen(handler, source, cursor)
+        source.close()
+        thread.join(5)
+        
+        # 99 is older than the cursor and 101 was already handled before the restart
+        assert received == [('missed 103', '103.0'), ('missed 105', '105.0')]
+        # Three messages at page size two means the history was paginated
+        assert len(handler.client.calls) == 2
+    
+    def test_unfinished_tasks_replay_after_restart(self, make_handler, tmp_path):
+        cursor_file = tmp_path / 'cursor.json'
+        history = [
+            mention('101.0', 'crashed'),
+            mention('102.0', 'finished'),
+            {'type': 'message', 'channel': 'C1', 'ts': '103.0', 'text': 'chatter'},
+        ]
+        
+        source = FakeEventSource()
+        cursor = EventCursor(cursor_file)
+        cursor.last_ts = '100.0'
+        thread, received = listen(make_handler(), source, cursor)
+        for message in history:
+            source.push(dict(message))
+        source.close()
+        thread.join(5)
+        assert [ts for _, ts in received] == ['101.0', '102.0']
+        cursor.finish('102.0')
+        
+        # Restart: only the task that never finished runs again
+        source = FakeEventSource()
+        thread, received = listen(make_handler(history=history), source, EventCursor(cursor_file))
+        source.close()
+        thread.join(5)
+        
+        assert received == [('crashed', '101.0')]
+    
+    def test_cursor_batches_saves_for_plain_messages(self, tmp_path):
+        cursor_file = tmp_path / 'cursor.json'
+        cursor = EventCursor(cursor_file, save_interval=60)
+        
+        cursor.advance('101.0')
+        assert not cursor_file.exists()
+        
+        # Mentions that become tasks are written straight away
+        cursor.begin('102.0')
+        assert json.loads(cursor_file.read_text())['pending'] == ['102.0']
+        
+        cursor.advance('103.0')
+        assert json.loads(cursor_file.read_text())['last_ts'] == '102.0'
+        cursor.flush()
+        assert json.loads(cursor_file.read_text())['last_ts'] == '103.0'
+    
+    def test_fake_source_loads_jsonl(self, tmp_path):
+        feed = tmp_path / 'events.jsonl'
+        feed.write_text('\n'.join(json.dumps(mention(f'{i}.0', f't{i}')) for i in range(3)))
+        
+        source = FakeEventSource()
+        source.load_file(feed)
+        source.close()
+        
+        events = []
+        while (event := source.get(timeout=0.1)) is not None:
+            events.append(event['ts'])
+        assert events == ['0.0', '1.0', '2.0']
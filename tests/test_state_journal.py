@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from agent_core import api_server, state_journal
+from agent_core.state_journal import StateJournal
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def log_event(i):
+    return {'type': 'log', 'level': 'info', 'message': f"event {i}"}
+
+
+class TestStateJournal:
+    
+    def test_events_survive_a_crash(self, tmp_path):
+        journal = StateJournal(tmp_path, fsync_interval=60)
+        journal.load()
+        journal.open()
+        for i in range(3):
+            journal.append(log_event(i))
+        journal.sync()
+        # No close() - as if the process died
+        
+        snapshot, events = StateJournal(tmp_path).load()
+        assert snapshot is None
+        assert [e['message'] for e in events] == ['event 0', 'event 1', 'event 2']
+    
+    def test_torn_last_line_is_skipped_and_not_reused(self, tmp_path):
+        journal = StateJournal(tmp_path, fsync_interval=60)
+        journal.load()
+        journal.open()
+        journal.append(log_event(0))
+        journal.close()
+        
+        segment = next(tmp_path.glob('journal-*.jsonl'))
+        with open(segment, 'a') as f:
+            f.write('{"n": 2, "event": {"type": "lo')
+        
+        journal = StateJournal(tmp_path, fsync_interval=60)
+        assert len(journal.load()[1]) == 1
+        journal.open()
+        journal.append(log_event(1))
+        journal.close()
+        
+        events = StateJournal(tmp_path).load()[1]
+        assert [e['message'] for e in events] == ['event 0', 'event 1']
+    
+    def test_snapshot_compacts_the_journal(self, tmp_path):
+        journal = StateJournal(tmp_path, fsync_interval=60)
+        journal.load()
+        journal.open()
+        for i in range(5):
+            journal.append(log_event(i))
+        
+        n = journal.rotate()
+        journal.write_snapshot({'count': 5}, n)
+        journal.append(log_event(5))
+        journal.close()
+        
+        assert len(list(tmp_path.glob('journal-*.jsonl'))) == 1
+        snapshot, events = StateJournal(tmp_path).load()
+        assert snapshot == {'count': 5}
+        assert [e['message'] for e in events] == ['event 5']
+
+
+    def test_appends_do_not_wait_for_an_fsync(self, tmp_path, monkeypatch):
+        journal = StateJournal(tmp_path, fsync_interval=60)
+        journal.load()
+        journal.open()
+        journal.append(log_event(0))
+        
+        in_fsync, release = threading.Event(), threading.Event()
+        real_fsync = os.fsync
+        def slow_fsync(fd):
+            in_fsync.set()
+            release.wait(5)
+            real_fsync(fd)
+        monkeypatch.setattr(state_journal.os, 'fsync', slow_fsync)
+        
+        syncing = threading.Thread(target=journal.sync)
+        syncing.start()
+        assert in_fsync.wait(5)
+        appending = threading.Thread(target=journal.append, args=(log_event(1),))
+        appending.start()
+        appending.join(1)
+        assert not appending.is_alive()
+        
+        release.set()
+        syncing.join()
+        monkeypatch.setattr(state_journal.os, 'fsync', real_fsync)
+        journal.close()
+        assert len(StateJournal(tmp_path).load()[1]) == 2
+
+
+def run_server_process(state_dir, script, **extra_env):
+    """Import the API server in a fresh interpreter (a 'restart') and run script"""
+    env = dict(os.environ, LMNH_STATE_MODE='persistent', LMNH_STATE_DIR=str(state_dir),
+               LMNH_STATE_SNAPSHOT_EVERY='50', LMNH_TASK_SPILL_FILE=str(state_dir / 'spill.jsonl'))
+    env.update(extra_env)
+    code = 'from agent_core import api_server as s\n' + script + '\ns.close_state()\n'
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_api_state_is_rebuilt_after_restart(tmp_path):
+    run_server_process(tmp_path, '''
+with s.state_lock:
+    for i in range(120):
+        s.record_event({"type": "task_add", "id": f"t{i}", "title": f"Task {i}"})
+    s.record_event({"type": "task_update", "id": "t119", "status": "completed"})
+    s.record_event({"type": "stats", "stats": {"tasks_completed": 1}})
+print("ok")
+''')
+    
+    out = run_server_process(tmp_path, '''
+import json
+with s.state_lock:
+    print(json.dumps({
+        "task": s.task_store.get("t119"),
+        "tasks": len(s.task_store),
+        "stats": s.agent_state["stats"],
+        "log_seq": s.log_store.last_seq,
+    }))
+''')
+    state = json.loads(out)
+    
+    assert state['task']['status'] == 'completed'
+    assert state['tasks'] == 120
+    assert state['stats'] == {'tasks_completed': 1}
+    # 2 boot logs + 120 "task added" + 1 status change + 2 boot logs on restart
+    assert state['log_seq'] == 2 + 120 + 1 + 2
+
+
+def test_replay_does_not_spill_evicted_tasks_again(tmp_path):
+    settings = {'LMNH_TASK_RETENTION': '5', 'LMNH_STATE_SNAPSHOT_EVERY': '100000'}
+    # Crash before any snapshot, so the restart replays every task_add
+    run_server_process(tmp_path, '''
+import os, sys
+with s.state_lock:
+    for i in range(20):
+        s.record_event({"type": "task_add", "id": f"t{i}", "title": f"Task {i}"})
+s.journal.sync()
+print("ok")
+sys.stdout.flush()
+os._exit(0)
+''', **settings)
+    spill = tmp_path / 'spill.jsonl'
+    assert len(spill.read_text().splitlines()) == 15
+    
+    out = run_server_process(tmp_path, 'print(len(s.task_store))', **settings)
+    
+    assert out == '5'
+    spilled = [json.loads(line)['id'] for line in spill.read_text().splitlines()]
+    assert spilled == [f"t{i}" for i in range(15)]
+
+
+def test_snapshot_is_exported_outside_the_state_lock(tmp_path, monkeypatch):
+    journal = StateJournal(tmp_path, fsync_interval=60)
+    journal.load()
+    journal.open()
+    monkeypatch.setattr(api_server, 'journal', journal)
+    with api_server.state_lock:
+        api_server.record_event({'type': 'task_add', 'id': 'snap', 'title': 'Snapshot me'})
+    
+    lock_free = []
+    real_export = api_server.export_state
+    
+    def take_lock():
+        if api_server.state_lock.acquire(timeout=1):
+            lock_free.append(True)
+            api_server.state_lock.release()
+    
+    def export_state(captured):
+        # Another thread can take state_lock while the snapshot is built
+        taker = threading.Thread(target=take_lock)
+        taker.start()
+        taker.join()
+        return real_export(captured)
+    monkeypatch.setattr(api_server, 'export_state', export_state)
+    
+    api_server.take_snapshot()
+    journal.close()
+    
+    assert lock_free == [True]
+    snapshot = StateJournal(tmp_path).load()[0]
+    assert 'snap' in [task['id'] for task in snapshot['tasks']['tasks']]
+
+
+def test_write_endpoints_run_off_the_event_loop():
+    for endpoint in (api_server.update_status, api_server.api_add_task, api_server.api_update_task,
+                     api_server.api_add_log, api_server.api_ingest):
+        assert not asyncio.iscoroutinefunction(endpoint)
@@ -0,0 +1,160 @@
+import json
+import os
+import stat
+
+import pytest
+
+from agent_core.claude_handler import ClaudeHandler, CodeStreamCleaner, PlanStreamParser, strip_code_fences
+from agent_core.github_handler import GitHubHandler
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def clean(chunks):
+    cleaner = CodeStreamCleaner()
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.finish()
+
+
+CODE = "def main():\n    print('hi')\n\n\nif __name__ == '__main__':\n    main()\n"
+
+SAMPLES = [
+    CODE,
+    "```python\n" + CODE + "```\n",
+    "```\n" + CODE + "```",
+    "  \n```js\nconst a = 1;\n```  \n\n",
+    "x = 1",
+    "```",
+    "``not a fence``\nstill code\n",
+    "",
+]
+
+PLAN = {
+    "summary": "Add a health check",
+    "files_to_modify": ["app/routes.py", "tests/test_routes.py"],
+    "steps": ["add the route", "test it"],
+}
+
+
+class TestCodeStreamCleaner:
+    
+    @pytest.mark.parametrize("text", SAMPLES)
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+    def test_matches_strip_code_fences(self, text, size):
+        assert clean(chunked(text, size)) == strip_code_fences(text)
+    
+    def test_emits_before_the_stream_ends(self):
+        cleaner = CodeStreamCleaner()
+        emitted = [cleaner.feed(chunk) for chunk in chunked("```python\n" + CODE * 20 + "```", 16)]
+        
+        # Most of the file goes out while streaming, not in finish()
+        assert len("".join(emitted)) > len(CODE) * 18
+        assert "```" not in "".join(emitted)
+
+
+class TestPlanStreamParser:
+    
+    def test_reports_files_once_the_list_is_complete(self):
+        text = json.dumps(PLAN)
+        list_end = text.index("]") + 1
+        parser = PlanStreamParser()
+        
+        reported = [(i, parser.feed(char)) for i, char in enumerate(text)]
+        hits = [(i, files) for i, files in reported if files is not None]
+        
+        assert hits == [(list_end - 1, PLAN["files_to_modify"])]
+        assert parser.finish() == PLAN
+    
+    def test_parses_fenced_plan(self):
+        parser = PlanStreamParser()
+        for chunk in chunked("```json\n" + json.dumps(PLAN, indent=2) + "\n```", 5):
+            parser.feed(chunk)
+        
+        assert parser.files == PLAN["files_to_modify"]
+        assert parser.finish() == PLAN
+    
+    def test_no_files_key(self):
+        parser = PlanStreamParser()
+        assert parser.feed('{"summary": "nothing to do"}') is None
+        assert parser.files is None
+
+
+class TestAnalyzeTaskStreaming:
+    
+    def make_handler(self, chunks, events):
+        handler = ClaudeHandler("test-key")
+        
+        def stream_plan(task_description, context=""):
+            for chunk in chunks:
+                events.append(("chunk", chunk))
+                yield chunk
+        
+        handler.stream_plan = stream_plan
+        return handler
+    
+    def test_calls_on_files_before_the_plan_finishes(self):
+        events = []
+        chunks = chunked(json.dumps(PLAN), 10)
+        handler = self.make_handler(chunks, events)
+        
+        plan = handler.analyze_task_streaming("task", on_files=lambda files: events.append(("files", files)))
+        
+        assert plan == PLAN
+        files_at = events.index(("files", PLAN["files_to_modify"]))
+        assert [event for event in events if event[0] == "files"] == [("files", PLAN["files_to_modify"])]
+        # Chunks kept streaming after the callback
+        assert any(kind == "chunk" for kind, _ in events[files_at + 1:])
+    
+    def test_invalid_plan_returns_none(self):
+        events = []
+        handler = self.make_handler(['{"files_to_modify": ["a.py"], "summ'], events)
+        
+        assert handler.analyze_task_streaming("task", on_files=lambda files: events.append(("files", files))) is None
+        assert ("files", ["a.py"]) in events
+
+
+class TestWriteFileStream:
+    
+    @pytest.fixture
+    def github(self, tmp_path):
+        return GitHubHandler("token", "user", tmp_path / "workspace")
+    
+    @pytest.fixture
+    def repo(self, tmp_path):
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        (repo / "script.sh").write_text("echo old\n")
+        os.chmod(repo / "script.sh", 0o755)
+        return repo
+    
+    def leftovers(self, repo):
+        return [path.name for path in repo.rglob("*.tmp")]
+    
+    def test_writes_chunks_and_keeps_permissions(self, github, repo):
+        assert github.write_file_stream(repo, "script.sh", iter(["echo ", "new", "\n"]))
+        
+        assert (repo / "script.sh").read_text() == "echo new\n"
+        assert stat.S_IMODE(os.stat(repo / "script.sh").st_mode) == 0o755
+        assert self.leftovers(repo) == []
+    
+    def test_creates_new_files_and_directories(self, github, repo):
+        assert github.write_file_stream(repo, "pkg/sub/new.py", ["x = 1\n"])
+        assert (repo / "pkg" / "sub" / "new.py").read_text() == "x = 1\n"
+    
+    def test_empty_stream_leaves_file_untouched(self, github, repo):
+        assert not github.write_file_stream(repo, "script.sh", iter([]))
+        assert not github.write_file_stream(repo, "script.sh", ["", ""])
+        
+        assert (repo / "script.sh").read_text() == "echo old\n"
+        assert self.leftovers(repo) == []
+    
+    def test_failed_stream_leaves_file_untouched(self, github, repo):
+        def chunks():
+            yield "echo half"
+            raise ConnectionError("stream dropped")
+        
+        assert not github.write_file_stream(repo, "script.sh", chunks())
+        
+        assert (repo / "script.sh").read_text() == "echo old\n"
+        assert self.leftovers(repo) == []
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import DateTime, create_engine, literal
+from sqlalchemy.orm import Session
+
+from backend.services.task_rollups import duration_seconds
+
+
+@pytest.fixture
+def session():
+    with Session(create_engine('sqlite://')) as session:
+        yield session
+
+
+def test_duration_seconds_averages_like_python(session):
+    # The /tasks/analytics average completion time is AVG(duration_seconds(...))
+    start = datetime(2026, 3, 1, 9, 0)
+    ends = [start + timedelta(hours=2), start + timedelta(days=3, seconds=30), start + timedelta(minutes=90)]
+    durations = [
+        session.query(duration_seconds(session, literal(start, DateTime), literal(end, DateTime))).scalar()
+        for end in ends
+    ]
+    
+    assert durations == pytest.approx([(end - start).total_seconds() for end in ends], abs=0.01)
+    
+    with pytest.raises(ValueError):
+        oracle = SimpleNamespace(dialect=SimpleNamespace(name='oracle'))
+        duration_seconds(SimpleNamespace(get_bind=lambda: oracle), start, start)
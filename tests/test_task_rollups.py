@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import DateTime, create_engine, literal
+from sqlalchemy.orm import Session
+
+from backend.models.task_rollup import TaskRollup
+from backend.services import task_rollups
+from backend.services.task_rollups import RollupDelta, contribution
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    TaskRollup.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def make_task(status='todo', created_at=datetime(2026, 3, 1, 9, 0), completed_at=None, **fields):
+    task = dict(project_id=1, assigned_to=7, priority='high', is_deleted=False)
+    task.update(fields)
+    return SimpleNamespace(status=status, created_at=created_at, completed_at=completed_at, **task)
+
+
+def rollups(session):
+    return {
+        (row.status, row.day): (row.task_count, row.completed_count, row.completion_seconds)
+        for row in session.query(TaskRollup)
+    }
+
+
+def test_contribution_keys_by_group_and_counts_completion_time():
+    key, counts = contribution(make_task('completed', completed_at=datetime(2026, 3, 1, 10, 0, 0, 600000)))
+    
+    assert key == (1, 7, 'completed', 'high', date(2026, 3, 1))
+    assert counts == (1, 1, 3601)
+    assert contribution(make_task(project_id=None, assigned_to=None))[0][:2] == (0, 0)
+
+
+def test_soft_deleted_tasks_still_count():
+    assert contribution(make_task(is_deleted=True)) == contribution(make_task())
+
+
+def test_move_cancels_out_within_a_group():
+    delta = RollupDelta()
+    before = contribution(make_task())
+    delta.move(before, before)
+    delta.move(before, contribution(make_task('in_progress')))
+    delta.move(contribution(make_task('in_progress')), before)
+    
+    assert not any(any(counts) for counts in delta._changes.values())
+
+
+def test_apply_upserts_and_drops_emptied_groups(session):
+    delta = RollupDelta()
+    delta.add(contribution(make_task()))
+    delta.add(contribution(make_task()))
+    delta.apply(session)
+    assert rollups(session) == {('todo', date(2026, 3, 1)): (2, 0, 0)}
+    
+    # One task moves on, then the other: the todo group goes once it is empty
+    done = make_task('completed', completed_at=datetime(2026, 3, 1, 9, 30))
+    delta.move(contribution(make_task()), contribution(done))
+    delta.apply(session)
+    assert rollups(session) == {
+        ('todo', date(2026, 3, 1)): (1, 0, 0),
+        ('completed', date(2026, 3, 1)): (1, 1, 1800),
+    }
+    
+    delta.move(contribution(make_task()), contribution(done))
+    delta.apply(session)
+    assert rollups(session) == {('completed', date(2026, 3, 1)): (2, 2, 3600)}
+
+
+@pytest.mark.parametrize('seconds', [0.4, 0.5, 1799.5, 1799.4996, 3600, 86399.999999, 2592000.5])
+def test_sql_and_python_round_completion_time_alike(session, seconds):
+    start = datetime(2026, 3, 1, 9, 0)
+    end = start + timedelta(seconds=seconds)
+    
+    in_sql = session.query(
+        task_rollups.completion_seconds(session, literal(start, DateTime), literal(end, DateTime))
+    ).scalar()
+    assert int(in_sql) == task_rollups.whole_seconds(end - start)
+
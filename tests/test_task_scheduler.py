@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from agent_core.task_scheduler import TaskScheduler, QueueFullError, repo_key
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestTaskScheduler:
+    
+    def test_runs_tasks_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        done = []
+        
+        def handler(task_data, thread_ts, worker_id):
+            barrier.wait()
+            done.append(task_data['task'])
+        
+        scheduler = TaskScheduler(handler, num_workers=3)
+        scheduler.start()
+        for i in range(3):
+            scheduler.submit({'task': f'task {i}', 'repo': f'https://github.com/u/repo{i}'})
+        
+        assert wait_until(lambda: len(done) == 3)
+        scheduler.shutdown()
+        assert scheduler.get_stats()['completed'] == 3
+    
+    def test_serializes_tasks_for_same_repo(self):
+        lock = threading.Lock()
+        active = {'count': 0, 'max': 0}
+        done = []
+        
+        def handler(task_data, thread_ts, worker_id):
+            with lock:
+                active['count'] += 1
+                active['max'] = max(active['max'], active['count'])
+            time.sleep(0.05)
+            with lock:
+                active['count'] -= 1
+            done.append(task_data['task'])
+        
+        scheduler = TaskScheduler(handler, num_workers=4)
+        scheduler.start()
+        for i in range(4):
+            # Same repo spelled differently
+            repo = 'https://github.com/u/repo.git' if i % 2 else 'https://github.com/u/repo/'
+            scheduler.submit({'task': f'task {i}', 'repo': repo})
+        
+        assert wait_until(lambda: len(done) == 4)
+        scheduler.shutdown()
+        assert active['max'] == 1
+        assert done == ['task 0', 'task 1', 'task 2', 'task 3']
+    
+    def test_rejects_when_queue_full(self):
+        release = threading.Event()
+        
+        def handler(task_data, thread_ts, worker_id):
+            release.wait(5)
+        
+        scheduler = TaskScheduler(handler, num_workers=1, max_queue_size=1)
+        scheduler.start()
+        scheduler.submit({'task': 'running', 'repo': 'a'})
+        assert wait_until(lambda: scheduler.get_stats()['running'] == 1)
+        scheduler.submit({'task': 'queued', 'repo': 'b'})
+        
+        with pytest.raises(QueueFullError):
+            scheduler.submit({'task': 'rejected', 'repo': 'c'})
+        
+        release.set()
+        scheduler.shutdown()
+    
+    def test_parked_tasks_count_towards_queue_size(self):
+        release = threading.Event()
+        
+        def handler(task_data, thread_ts, worker_id):
+            release.wait(5)
+        
+        scheduler = TaskScheduler(handler, num_workers=2, max_queue_size=2)
+        scheduler.start()
+        scheduler.submit({'task': 'running', 'repo': 'a'})
+        assert wait_until(lambda: scheduler.get_stats()['running'] == 1)
+        # The idle worker parks both behind the busy repo
+        scheduler.submit({'task': 'parked 1', 'repo': 'a'})
+        scheduler.submit({'task': 'parked 2', 'repo': 'a'})
+        assert wait_until(lambda: scheduler.get_stats()['parked'] == 2)
+        
+        with pytest.raises(QueueFullError):
+            scheduler.submit({'task': 'rejected', 'repo': 'b'})
+        
+        release.set()
+        scheduler.shutdown()
+        assert scheduler.get_stats()['completed'] == 3
+    
+    def test_shutdown_without_wait_does_not_block_on_full_queue(self):
+        release = threading.Event()
+        
+        def handler(task_data, thread_ts, worker_id):
+            release.wait(5)
+        
+        scheduler = TaskScheduler(handler, num_workers=1, max_queue_size=1)
+        scheduler.start()
+        scheduler.submit({'task': 'running', 'repo': 'a'})
+        assert wait_until(lambda: scheduler.get_stats()['running'] == 1)
+        scheduler.submit({'task': 'queued', 'repo': 'b'})
+        
+        stopper = threading.Thread(target=scheduler.shutdown, kwargs={'wait': False})
+        stopper.start()
+        stopper.join(1)
+        
+        assert not stopper.is_alive()
+        release.set()
+    
+    def test_stats_track_failures_and_wait(self):
+        def handler(task_data, thread_ts, worker_id):
+            if task_data['task'] == 'crash':
+                raise RuntimeError('boom')
+            return task_data['task'] != 'fail'
+        
+        scheduler = TaskScheduler(handler, num_workers=1)
+        scheduler.start()
+        for task in ['ok', 'fail', 'crash']:
+            scheduler.submit({'task': task})
+        scheduler.shutdown()
+        
+        stats = scheduler.get_stats()
+        assert stats['completed'] == 1
+        assert stats['failed'] == 2
+        assert stats['queue_depth'] == 0
+        assert stats['max_wait_seconds'] >= stats['avg_wait_seconds'] >= 0
+        assert 0 <= stats['utilization'] <= 100
+    
+    def test_repo_key_normalizes_urls(self):
+        assert repo_key('https://github.com/U/Repo.git') == repo_key('https://github.com/u/repo/')
+        assert repo_key('') is None
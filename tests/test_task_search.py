@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from backend.services import task_search
+from backend.services.task_search import fts5_query
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT, description TEXT)"))
+        conn.execute(text("INSERT INTO tasks VALUES (1, 'Fix login page', 'Users see \"NEAR\" errors'), "
+                          "(2, 'Billing export', 'CSV for finance')"))
+    with Session(engine) as session:
+        yield session
+
+
+def matching_ids(session, term):
+    return [row[0] for row in session.execute(
+        text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH :query ORDER BY rowid"),
+        {'query': fts5_query(term)}
+    )]
+
+
+def test_fts5_query_quotes_words_and_prefixes_the_last():
+    assert fts5_query('login pa') == '"login" "pa"*'
+    assert fts5_query('fix "login" NEAR(page') == '"fix" "login" "NEAR" "page"*'
+    assert fts5_query('  -- "" ') is None
+
+
+def test_fts5_syntax_in_a_term_is_matched_literally(session):
+    task_search.create_index(session)
+    
+    assert matching_ids(session, 'login OR billing') == []
+    assert matching_ids(session, 'near err') == [1]
+    assert matching_ids(session, 'fin*') == [2]
+
+
+def test_index_check_runs_once_per_engine(session):
+    statements = []
+    event.listen(session.get_bind(), 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    catalog_queries = lambda: sum('sqlite_master' in statement for statement in statements)
+    
+    assert not task_search.index_exists(session)
+    assert not task_search.index_exists(session)
+    assert catalog_queries() == 1
+    
+    # Building the index forgets the miss; a found index is never looked up again
+    task_search.create_index(session)
+    assert task_search.index_exists(session)
+    assert task_search.index_exists(session)
+    assert catalog_queries() == 2
+
+
+def test_missing_index_is_looked_for_again_after_the_ttl(session, monkeypatch):
+    assert not task_search.index_exists(session)
+    session.execute(text(task_search.SCHEMA['sqlite'][0]))
+    assert not task_search.index_exists(session)
+    
+    monkeypatch.setattr(task_search, 'MISSING_INDEX_TTL', 0)
+    assert task_search.index_exists(session)
@@ -0,0 +1,89 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from agent_core import api_server
+from agent_core.task_store import TaskStore
+
+
+def make_task(i, status='pending'):
+    return {'id': f"t{i}", 'title': f"Task {i}", 'status': status}
+
+
+class TestTaskStore:
+    
+    def test_update_by_id(self):
+        store = TaskStore()
+        for i in range(5):
+            store.add(make_task(i))
+        
+        assert store.update('t3', status='completed')['status'] == 'completed'
+        assert store.update('missing', status='completed') is None
+        assert store.get('t3')['status'] == 'completed'
+    
+    def test_readding_an_id_updates_in_place(self):
+        store = TaskStore()
+        store.add(make_task(1))
+        store.add(make_task(2))
+        store.add(make_task(1, status='in_progress'))
+        
+        assert len(store) == 2
+        assert [t['id'] for t in store.recent()] == ['t1', 't2']
+        assert store.get('t1')['status'] == 'in_progress'
+    
+    def test_retention_spills_oldest_to_disk(self, tmp_path):
+        spill = tmp_path / 'tasks.jsonl'
+        store = TaskStore(max_tasks=3, spill_path=spill)
+        for i in range(10):
+            store.add(make_task(i))
+        
+        assert len(store) == 3
+        assert store.get('t0') is None
+        assert [t['id'] for t in store.recent(10)] == ['t7', 't8', 't9']
+        
+        spilled = [json.loads(line)['id'] for line in spill.read_text().splitlines()]
+        assert spilled == [f"t{i}" for i in range(7)]
+        assert store.stats()['spilled'] == 7
+    
+    def test_cursor_pagination_walks_newest_to_oldest(self):
+        store = TaskStore(max_tasks=8)
+        for i in range(20):
+            store.add(make_task(i))
+        
+        seen, cursor = [], None
+        while True:
+            tasks, cursor = store.page(cursor, limit=3)
+            seen.extend(t['id'] for t in tasks)
+            if cursor is None:
+                break
+        
+        assert seen == [f"t{i}" for i in range(19, 11, -1)]
+    
+    def test_cursor_survives_eviction(self):
+        store = TaskStore(max_tasks=5)
+        for i in range(5):
+            store.add(make_task(i))
+        
+        first, cursor = store.page(limit=2)
+        for i in range(5, 7):
+            store.add(make_task(i))
+        
+        # t0 and t1 were evicted meanwhile, so only t2 is left past the cursor
+        rest, cursor = store.page(cursor, limit=10)
+        assert [t['id'] for t in first] == ['t4', 't3']
+        assert [t['id'] for t in rest] == ['t2']
+        assert cursor is None
+
+
+def test_tasks_endpoint_paginates():
+    client = TestClient(api_server.app)
+    for i in range(5):
+        client.post('/api/task/add', json={'id': f"page{i}", 'title': f"Page {i}"})
+    
+    body = client.get('/api/tasks', params={'limit': 2}).json()
+    assert [t['id'] for t in body['tasks']] == ['page4', 'page3']
+    
+    body = client.get('/api/tasks', params={'limit': 2, 'cursor': body['next_cursor']}).json()
+    assert [t['id'] for t in body['tasks']] == ['page2', 'page1']
+    
+    assert client.get('/api/tasks', params={'cursor': 'nope'}).status_code == 400
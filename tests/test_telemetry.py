@@ -0,0 +1,122 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent_core import api_server
+from agent_core.claude_handler import ClaudeHandler
+from agent_core.code_generator import ParallelCodeGenerator
+from agent_core.telemetry import Telemetry, estimate_cost, labels
+
+
+def usage(input_tokens=100, output_tokens=50, **kwargs):
+    return SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens, **kwargs)
+
+
+class TestTelemetry:
+    
+    def test_cost_uses_model_prices_and_cache_multipliers(self):
+        assert estimate_cost('claude-sonnet-4-20250514', 1_000_000, 1_000_000) == pytest.approx(18.0)
+        assert estimate_cost('claude-sonnet-4', cache_read_tokens=1_000_000) == pytest.approx(0.3)
+        assert estimate_cost('some-other-model', 1000, 1000) == 0.0
+    
+    def test_calls_are_labelled_and_grouped(self):
+        telemetry = Telemetry()
+        
+        with labels(task='t1', repo='https://github.com/x/y'):
+            telemetry.observe('claude-sonnet-4', 'plan', usage(), latency=1.0)
+            telemetry.observe('claude-sonnet-4', 'codegen', usage(200, 400), latency=3.0)
+            telemetry.observe('claude-sonnet-4', 'codegen', latency=0.5, ok=False)
+        telemetry.observe('claude-sonnet-4', 'chat', usage(10, 5), latency=0.2)
+        
+        by_stage = {row['stage']: row for row in telemetry.summary(['stage'])['groups']}
+        assert by_stage['codegen']['calls'] == 2
+        assert by_stage['codegen']['errors'] == 1
+        assert by_stage['codegen']['output_tokens'] == 400
+        assert by_stage['codegen']['max_latency_ms'] == 3000.0
+        assert telemetry.summary(['stage'])['groups'][0]['stage'] == 'codegen'
+        
+        by_task = {row['task']: row for row in telemetry.summary(['task'])['groups']}
+        assert by_task['t1']['calls'] == 3
+        assert by_task[None]['calls'] == 1
+        assert telemetry.summary()['totals']['input_tokens'] == 310
+    
+    def test_old_series_fold_into_other(self):
+        telemetry = Telemetry(max_series=2)
+        for task in ('a', 'b', 'c'):
+            with labels(task=task):
+                telemetry.observe('claude-sonnet-4', 'plan', usage())
+        
+        by_task = {row['task']: row['calls'] for row in telemetry.summary(['task'])['groups']}
+        assert by_task == {'other': 2, 'c': 1}
+        assert telemetry.summary(['stage'])['totals']['calls'] == 3
+    
+    def test_series_file_gets_one_line_per_call(self, tmp_path):
+        telemetry = Telemetry(tmp_path / 'calls.jsonl')
+        telemetry.observe('claude-sonnet-4', 'plan', usage(), latency=0.25, first_token=0.1)
+        
+        lines = (tmp_path / 'calls.jsonl').read_text().splitlines()
+        record = json.loads(lines[0])
+        assert len(lines) == 1
+        assert record['stage'] == 'plan'
+        assert record['latency_ms'] == 250.0
+        assert record['first_token_ms'] == 100.0
+    
+    def test_export_and_restore(self):
+        telemetry = Telemetry()
+        telemetry.observe('claude-sonnet-4', 'plan', usage())
+        
+        copy = Telemetry()
+        copy.restore(json.loads(json.dumps(telemetry.export())))
+        assert copy.summary() == telemetry.summary()
+
+
+class FakeMessages:
+    def __init__(self, text):
+        self.text = text
+    
+    def create(self, **kwargs):
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)], usage=usage(300, 120))
+
+
+class FakeGitHub:
+    def read_file(self, repo_path, file):
+        return ""
+    
+    def write_file(self, repo_path, file, content):
+        return True
+
+
+def test_codegen_calls_keep_task_labels_across_threads():
+    telemetry = Telemetry()
+    handler = ClaudeHandler('sk-test', telemetry=telemetry)
+    handler.client = SimpleNamespace(messages=FakeMessages('print("hi")'))
+    generator = ParallelCodeGenerator(handler, max_concurrency=3)
+    
+    with labels(task='t9', repo='repo'):
+        generator.run('task', '/tmp/repo', ['a.py', 'b.py', 'c.py'], FakeGitHub())
+    
+    rows = telemetry.summary(['task', 'stage', 'repo'])['groups']
+    assert rows == [dict(rows[0], task='t9', stage='codegen', repo='repo', calls=3, output_tokens=360)]
+
+
+def test_metrics_endpoint_aggregates_ingested_usage():
+    client = TestClient(api_server.app)
+    events = [
+        {'type': 'usage', 'task': 'm1', 'stage': 'plan', 'model': 'claude-sonnet-4', 'repo': 'r',
+         'input_tokens': 1000, 'output_tokens': 100, 'latency_ms': 1200.0, 'cost_usd': 0.0045, 'ok': True},
+        {'type': 'usage', 'task': 'm1', 'stage': 'codegen', 'model': 'claude-sonnet-4', 'repo': 'r',
+         'input_tokens': 2000, 'output_tokens': 3000, 'latency_ms': 9000.0, 'cost_usd': 0.051, 'ok': True},
+    ]
+    assert client.post('/api/ingest', json={'events': events}).json()['applied'] == 2
+    
+    response = client.get('/api/metrics', params={'group_by': 'task,stage'})
+    rows = {(row['task'], row['stage']): row for row in response.json()['groups']}
+    assert rows[('m1', 'codegen')]['output_tokens'] == 3000
+    assert rows[('m1', 'plan')]['avg_latency_ms'] == 1200.0
+    
+    cached = client.get('/api/metrics', params={'group_by': 'task,stage'},
+                        headers={'If-None-Match': response.headers['etag']})
+    assert cached.status_code == 304
+    assert client.get('/api/metrics', params={'group_by': 'color'}).status_code == 400
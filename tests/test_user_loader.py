@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, event
+from sqlalchemy.orm import Session, declarative_base
+
+from backend.services.user_loader import UserLoader
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50))
+    email = Column(String(100))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(User(id=i, username=f"user{i}", email=f"user{i}@example.com") for i in range(1, 11))
+        session.commit()
+        
+        queries = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+        session.queries = queries
+        yield session
+
+
+def test_rows_are_resolved_with_one_query(session):
+    loader = UserLoader(session, User)
+    activity = [3, 5, 3, None, 7, 5, 3]
+    
+    loader.load(activity)
+    summaries = [loader.summary(user_id) for user_id in activity]
+    
+    assert len(session.queries) == 1
+    assert summaries[0] == {'id': 3, 'username': 'user3', 'email': 'user3@example.com'}
+    assert summaries[3] is None
+
+
+def test_only_new_ids_are_fetched(session):
+    loader = UserLoader(session, User)
+    loader.load([1, 2])
+    loader.load([2, 1])
+    assert len(session.queries) == 1
+    
+    loader.load([2, 4, 404])
+    assert len(session.queries) == 2
+    assert loader.get(4).username == 'user4'
+    
+    # Missing users are remembered as missing
+    loader.load([404])
+    assert len(session.queries) == 2
+    assert loader.get(404) is None and loader.summary(404) is None
+
+
+def test_get_never_queries(session):
+    loader = UserLoader(session, User)
+    assert loader.get(1) is None
+    assert session.queries == []
@@ -0,0 +1,129 @@
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+from agent_core.github_handler import GitHubHandler
+from agent_core.worktrees import WorktreeManager
+
+
+def run_git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    """Bare repo with one commit on main, reachable over file://"""
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'LMNH')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'lmnh@example.com')
+    
+    seed = tmp_path / 'seed'
+    seed.mkdir()
+    (seed / 'app.py').write_text('print("hi")\n')
+    run_git(seed, 'init', '-q', '-b', 'main')
+    run_git(seed, 'add', '-A')
+    run_git(seed, 'commit', '-q', '-m', 'init')
+    
+    bare = tmp_path / 'origin.git'
+    run_git(tmp_path, 'clone', '-q', '--bare', str(seed), str(bare))
+    return f"file://{bare}"
+
+
+def commit_count(origin):
+    out = subprocess.run(
+        ['git', 'rev-list', '--count', 'main'],
+        cwd=origin[len('file://'):], check=True, capture_output=True, text=True
+    )
+    return int(out.stdout)
+
+
+class TestWorktrees:
+    
+    def test_task_worktree_is_isolated_and_cleaned_up(self, tmp_path, origin):
+        github = GitHubHandler('token', 'user', tmp_path / 'ws')
+        repo_path = github.clone_or_pull(origin, 'main')
+        
+        worktree = github.worktrees.create(repo_path, 'abc123', 'main')
+        github.write_file(worktree, 'app.py', 'print("changed")\n')
+        assert open(os.path.join(repo_path, 'app.py')).read() == 'print("hi")\n'
+        assert github.commit_and_push(worktree, 'change', 'main')
+        github.worktrees.remove(worktree)
+        
+        assert not os.path.exists(worktree)
+        assert os.listdir(github.worktrees.root) == []
+        assert commit_count(origin) == 2
+    
+    def test_concurrent_tasks_on_one_repo_all_push(self, tmp_path, origin):
+        github = GitHubHandler('token', 'user', tmp_path / 'ws')
+        repo_path = github.clone_or_pull(origin, 'main')
+        results = []
+        
+        def task(i):
+            worktree = github.worktrees.create(repo_path, f"task{i}", 'main')
+            try:
+                github.write_file(worktree, f"new_{i}.py", 'x = 1\n')
+                results.append(github.commit_and_push(worktree, f"task {i}", 'main'))
+            finally:
+                github.worktrees.remove(worktree)
+        
+        threads = [threading.Thread(target=task, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results == [True, True, True]
+        assert commit_count(origin) == 4
+    
+    def test_prune_skips_running_tasks(self, tmp_path, origin):
+        github = GitHubHandler('token', 'user', tmp_path / 'ws')
+        repo_path = github.clone_or_pull(origin, 'main')
+        
+        running = github.worktrees.create(repo_path, 'running', 'main')
+        stale = github.worktrees.create(repo_path, 'stale', 'main')
+        # Simulate a crashed task that never removed its worktree
+        github.worktrees._active.discard(Path(stale).resolve())
+        
+        assert github.worktrees.prune(max_age=0) == 1
+        assert os.path.exists(running)
+        assert not os.path.exists(stale)
+    
+    def test_prune_keeps_going_past_a_failed_removal(self, tmp_path, origin):
+        github = GitHubHandler('token', 'user', tmp_path / 'ws')
+        repo_path = github.clone_or_pull(origin, 'main')
+        
+        locked = github.worktrees.create(repo_path, 'locked', 'main')
+        stale = github.worktrees.create(repo_path, 'stale', 'main')
+        for path in (locked, stale):
+            github.worktrees._active.discard(Path(path).resolve())
+        # A locked worktree refuses `git worktree remove --force`
+        run_git(repo_path, 'worktree', 'lock', locked)
+        # And one whose directory is already gone
+        gone = github.worktrees.create(repo_path, 'gone', 'main')
+        github.worktrees._active.discard(Path(gone).resolve())
+        shutil.rmtree(gone)
+        
+        assert github.worktrees.prune(max_age=0) == 1
+        assert os.path.exists(locked)
+        assert not os.path.exists(stale)
+        # Stale metadata for the deleted one was pruned
+        assert 'gone' not in subprocess.run(
+            ['git', 'worktree', 'list'], cwd=repo_path, check=True, capture_output=True, text=True
+        ).stdout
+    
+    def test_pruner_runs_again_after_a_restart(self, tmp_path, monkeypatch):
+        manager = WorktreeManager(tmp_path / 'worktrees')
+        pruned = threading.Event()
+        monkeypatch.setattr(manager, 'prune', lambda max_age: pruned.set())
+        
+        manager.start_pruner(interval=60)
+        manager.stop_pruner()
+        manager.start_pruner(interval=0.01)
+        
+        assert pruned.wait(5)
+        manager.stop_pruner()